@@ -0,0 +1,229 @@
+"""
+附件5（AMS 工作量）列式数据：一次读取 H、I、L 三列，L 列转为 float 数组（空值或非数字为 NaN，valid 为有效掩码），
+H/I 列转为分类编码（codes 为 categories 的下标，空值为 -1）。总和、按 H/I 分组的合计/计数/百分位、离群值检测
+都在同一组数组上完成：第四步的总和与第九步的 H/I 内容来自同一次加载。
+
+安装了 NumPy 时使用向量化实现，否则退回纯 Python 实现，结果相同。
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from startup_profile import lazy_import
+
+# 附件5 中的列（0 起）：H 工作项、I 工作内容、L 工作量
+H_COLUMN = 7
+I_COLUMN = 8
+L_COLUMN = 11
+
+
+def _numpy():
+    """NumPy 为可选依赖，未安装时返回 None"""
+    try:
+        return lazy_import("numpy")
+    except ImportError:
+        return None
+
+
+def _to_float(value: object) -> float:
+    """与逐格 float() 求和一致：数字和可转为数字的文本计入，空值和其他内容为 NaN"""
+    if isinstance(value, float):
+        return value
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _label(value: object) -> str:
+    """与原先逐行读取 H/I 列一致：空值（含 0）为空串，其余转为去掉首尾空白的文本"""
+    return str(value).strip() if value else ""
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    """线性插值百分位数（与 numpy.percentile 默认方法一致），ordered 需已排序且非空"""
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class GroupStats:
+    """按 H 或 I 分组的工作量统计"""
+
+    __slots__ = ("name", "total", "count", "p50", "p95")
+
+    def __init__(self, name: str, total: float, count: int, p50: float, p95: float) -> None:
+        self.name = name
+        self.total = total
+        self.count = count
+        self.p50 = p50
+        self.p95 = p95
+
+    def __repr__(self) -> str:
+        return f"GroupStats({self.name!r}, total={self.total}, count={self.count}, p50={self.p50}, p95={self.p95})"
+
+
+class Attachment5Columns:
+    """附件5 第 2 行起的 H/I/L 列；first_row 为第一条数据的 Excel 行号"""
+
+    def __init__(self, h_values: Sequence[object], i_values: Sequence[object], l_values: Sequence[object],
+                 first_row: int = 2) -> None:
+        self.first_row = first_row
+        self.np = _numpy()
+        count = max(len(h_values), len(i_values), len(l_values))
+        self.row_count = count
+        self.h_codes, self.h_categories = self._encode(h_values, count)
+        self.i_codes, self.i_categories = self._encode(i_values, count)
+        floats = map(_to_float, _padded(l_values, count))
+        if self.np is not None:
+            self.workload = self.np.fromiter(floats, dtype=float, count=count)
+            self.valid = ~self.np.isnan(self.workload)
+        else:
+            self.workload = list(floats)
+            self.valid = [not math.isnan(value) for value in self.workload]
+
+    def _encode(self, values: Sequence[object], count: int):
+        categories: List[str] = []
+        index: Dict[str, int] = {}
+        codes = []
+        for value in _padded(values, count):
+            label = _label(value)
+            if not label:
+                codes.append(-1)
+                continue
+            code = index.get(label)
+            if code is None:
+                code = index[label] = len(categories)
+                categories.append(label)
+            codes.append(code)
+        if self.np is not None:
+            codes = self.np.asarray(codes, dtype=self.np.int64)
+        return codes, categories
+
+    def _sorted_valid(self) -> Sequence[float]:
+        if self.np is not None:
+            return self.np.sort(self.workload[self.valid])
+        return sorted(value for value, ok in zip(self.workload, self.valid) if ok)
+
+    def total(self) -> float:
+        """L 列有效值之和（第四步的总和）"""
+        if self.np is not None:
+            return float(self.workload[self.valid].sum())
+        return float(sum(value for value, ok in zip(self.workload, self.valid) if ok))
+
+    def labels(self, column: str) -> List[str]:
+        """H 或 I 列的非空内容（按行顺序，含重复）"""
+        codes, categories = self._column(column)
+        return [categories[code] for code in codes if code >= 0]
+
+    def _column(self, column: str):
+        if column == "H":
+            return self.h_codes, self.h_categories
+        if column == "I":
+            return self.i_codes, self.i_categories
+        raise ValueError(f"不支持的分组列：{column}")
+
+    def group_by(self, column: str) -> List[GroupStats]:
+        """按 H 或 I 分组的工作量合计、有效行数和 p50/p95，按合计从大到小排列；空分组不计"""
+        codes, categories = self._column(column)
+        if self.np is not None:
+            groups = self._group_by_numpy(codes, len(categories))
+        else:
+            groups = self._group_by_python(codes, len(categories))
+        stats = [GroupStats(categories[code], total, count, p50, p95) for code, (total, count, p50, p95) in groups]
+        stats.sort(key=lambda item: (-item.total, item.name))
+        return stats
+
+    def _group_by_numpy(self, codes, size: int) -> List[Tuple[int, Tuple[float, int, float, float]]]:
+        np = self.np
+        keep = self.valid & (codes >= 0)
+        keys, values = codes[keep], self.workload[keep]
+        totals = np.bincount(keys, weights=values, minlength=size)
+        counts = np.bincount(keys, minlength=size)
+        # 按 (分组, 值) 排序后每个分组是连续且有序的一段，一次排序即可算出所有分组的百分位
+        order = np.lexsort((values, keys))
+        values = values[order]
+        present = np.nonzero(counts)[0]
+        starts = np.concatenate(([0], np.cumsum(counts[present])[:-1]))
+        p50 = self._segment_percentile(values, starts, counts[present], 50)
+        p95 = self._segment_percentile(values, starts, counts[present], 95)
+        return [(int(code), (float(totals[code]), int(counts[code]), float(median), float(high)))
+                for code, median, high in zip(present, p50, p95)]
+
+    def _segment_percentile(self, ordered, starts, counts, q: float):
+        """各有序分段的线性插值百分位数（向量化的 _percentile）"""
+        np = self.np
+        position = (counts - 1) * q / 100
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        low_values, high_values = ordered[starts + lower], ordered[starts + upper]
+        return low_values + (high_values - low_values) * (position - lower)
+
+    def _group_by_python(self, codes, size: int) -> List[Tuple[int, Tuple[float, int, float, float]]]:
+        buckets: Dict[int, List[float]] = {}
+        for code, value, ok in zip(codes, self.workload, self.valid):
+            if ok and code >= 0:
+                buckets.setdefault(code, []).append(value)
+        result = []
+        for code in sorted(buckets):
+            ordered = sorted(buckets[code])
+            result.append((code, (float(sum(ordered)), len(ordered),
+                                  _percentile(ordered, 50), _percentile(ordered, 95))))
+        return result
+
+    def describe(self) -> Dict[str, float]:
+        """L 列整体统计：有效/缺失行数、合计、均值、最小/最大、p50/p95"""
+        values = self._sorted_valid()
+        stats = {"rows": self.row_count, "valid": len(values), "missing": self.row_count - len(values),
+                 "total": self.total()}
+        if len(values):
+            stats.update(mean=stats["total"] / len(values), min=float(values[0]), max=float(values[-1]),
+                         p50=float(_percentile(values, 50)), p95=float(_percentile(values, 95)))
+        return stats
+
+    def outliers(self, k: float = 1.5) -> List[Tuple[int, float, str]]:
+        """按四分位距（Q1 - k·IQR, Q3 + k·IQR 之外）检测离群工作量，返回 (Excel 行号, 工作量, H 列内容)"""
+        ordered = self._sorted_valid()
+        if len(ordered) < 4:
+            return []
+        q1, q3 = _percentile(ordered, 25), _percentile(ordered, 75)
+        low, high = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+        if self.np is not None:
+            np = self.np
+            with np.errstate(invalid="ignore"):
+                rows = np.nonzero(self.valid & ((self.workload < low) | (self.workload > high)))[0].tolist()
+        else:
+            rows = [i for i, (value, ok) in enumerate(zip(self.workload, self.valid))
+                    if ok and not low <= value <= high]
+        return [(self.first_row + i, float(self.workload[i]),
+                 self.h_categories[self.h_codes[i]] if self.h_codes[i] >= 0 else "") for i in rows]
+
+
+def _padded(values: Sequence[object], count: int) -> Iterable[object]:
+    yield from values
+    for _ in range(count - len(values)):
+        yield None
+
+
+def read_xls_columns(path: str) -> Attachment5Columns:
+    """用 xlrd 按列读取 .xls 第一个工作表"""
+    sheet = lazy_import("xlrd").open_workbook(path).sheet_by_index(0)
+
+    def column(index: int) -> List[object]:
+        return sheet.col_values(index, start_rowx=1) if index < sheet.ncols else []
+
+    return Attachment5Columns(column(H_COLUMN), column(I_COLUMN), column(L_COLUMN))
+
+
+def read_xlsx_columns(ws) -> Attachment5Columns:
+    """从 openpyxl 工作表（可为只读模式）读取 H-L 列"""
+    h_values: List[object] = []
+    i_values: List[object] = []
+    l_values: List[object] = []
+    for row in ws.iter_rows(min_row=2, min_col=H_COLUMN + 1, max_col=L_COLUMN + 1, values_only=True):
+        h_values.append(row[0])
+        i_values.append(row[1])
+        l_values.append(row[L_COLUMN - H_COLUMN])
+    return Attachment5Columns(h_values, i_values, l_values)
@@ -0,0 +1,76 @@
+"""
+待补全内容登记：大模型不可用（熔断、超时、接口错误）时，步骤使用默认值或未能生成的内容记录在
+附件目录下的 llm_backfill.json 中，运行结束时列出。之后用 `run --backfill` 只重新生成这些内容，
+重新生成成功的条目自动移除。
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+BACKFILL_FILE = "llm_backfill.json"
+
+
+class BackfillRegistry:
+    """按 (步骤, 行号) 登记；行号为 None 表示整个步骤的输出需要重新生成"""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._entries: Dict[Tuple[int, Optional[int]], Dict] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "BackfillRegistry":
+        registry = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for entry in json.load(f):
+                    registry._entries[(entry["step"], entry.get("row"))] = entry
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️  读取待补全记录失败，忽略：{e}")
+        return registry
+
+    def mark(self, step: int, description: str, reason: str, row: Optional[int] = None) -> None:
+        self._entries[(step, row)] = {
+            "step": step,
+            "row": row,
+            "description": description,
+            "reason": reason,
+            "marked_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def resolve(self, step: int, row: Optional[int] = None) -> None:
+        self._entries.pop((step, row), None)
+
+    def steps(self) -> List[int]:
+        return sorted({step for step, _row in self._entries})
+
+    def rows(self, step: int) -> Set[int]:
+        return {row for entry_step, row in self._entries if entry_step == step and row is not None}
+
+    def entries(self) -> List[Dict]:
+        return [self._entries[key] for key in sorted(self._entries, key=lambda k: (k[0], k[1] or 0))]
+
+    def save(self) -> None:
+        """写回登记文件；没有待补全内容时删除文件"""
+        if self.path is None:
+            return
+        try:
+            if not self._entries:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.entries(), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"⚠️  保存待补全记录失败：{e}")
+
+    def print_summary(self) -> None:
+        entries = self.entries()
+        if not entries:
+            return
+        print(f"\n📝 以下 {len(entries)} 项因大模型不可用使用了默认值或未生成，需要重新生成：")
+        for entry in entries:
+            print(f"   步骤{entry['step']} {entry['description']}（{entry['reason']}）")
+        print("   接口恢复后执行 `python process_attachments.py run --backfill` 只重新生成这些内容")
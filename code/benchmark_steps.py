@@ -0,0 +1,269 @@
+"""
+逐步骤基准测试：在合成附件包（或指定目录的副本）上计时每个步骤函数，
+大模型客户端的会话替换为本地桩，结果保存为 JSON 基线，并可与旧基线对比发现性能回退。
+
+用法：
+    python benchmark_steps.py --save-baseline benchmarks/baseline.json
+    python benchmark_steps.py --compare benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from synthetic_package import generate_package
+
+
+def _import_pipeline():
+    """导入主程序；没有 config.py 时注入一个占位配置（基准测试不访问真实接口）"""
+    try:
+        import config  # noqa: F401
+    except ImportError:
+        stub = types.ModuleType("config")
+        stub.DATA_DIR = "."
+        stub.DEEPSEEK_API_KEY = "benchmark"
+        stub.DEEPSEEK_API_URL = "http://localhost/benchmark"
+        sys.modules["config"] = stub
+    import process_attachments
+
+    return process_attachments
+
+
+class _StubResponse:
+    status_code = 200
+
+    def __init__(self, content: str) -> None:
+        self._content = content
+
+    def json(self) -> dict:
+        return {"choices": [{"message": {"content": self._content}}]}
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def stub_llm_reply(prompt: str) -> str:
+    """根据提示词类型返回格式正确的固定回复"""
+    if "功能点码值中选择" in prompt:
+        codes = re.findall(r"^\d+\. (.+?) -> (.+?) -> (.+)$", prompt, re.M)
+        items_block = prompt.split("具体需求功能点：", 1)[1].split("可用功能点码值：", 1)[0]
+        items = re.findall(r"^\d+\.\s*(.+)$", items_block, re.M)
+        lines = []
+        for i, item in enumerate(items):
+            level1, level2, level3 = codes[i % len(codes)]
+            lines.append(f"{i + 1}|{level1}|{level2}|{level3}|{item}|2.0")
+        return "\n".join(lines)
+    if "数据组" in prompt and "数据属性" in prompt and "COSMIC" in prompt:
+        return "数据组：桩数据组\n数据属性：编号、名称、状态"
+    # 项目文档提示词中也有“精简摘要”，手册摘要提示词中也有“项目文档”，按各自特有的句子区分
+    if "内容进行精简摘要" in prompt:
+        return "桩手册摘要"
+    if "生成完整的项目文档" in prompt:
+        return "\n\n".join(f"{name}：\n1. 桩内容一\n2. 桩内容二\n3. 桩内容三"
+                           for name in ("总体描述", "项目建设目标", "项目建设必要性", "存在问题"))
+    return "内容概述：\n" + "\n".join(f"{i}. 桩功能点{i}" for i in range(1, 9))
+
+
+class StubSession:
+    """替代 LLMClient 的 requests.Session，不发起网络请求"""
+
+    def post(self, url, headers=None, json=None, timeout=None, **kwargs) -> _StubResponse:
+        prompt = json["messages"][-1]["content"] if json else ""
+        return _StubResponse(stub_llm_reply(prompt))
+
+    def head(self, url, **kwargs) -> _StubResponse:
+        return _StubResponse("")
+
+
+STUB_PROJECT_DOCS = {
+    "总体描述": "1. 项目背景和概述：桩\n2. 主要功能模块：桩",
+    "项目建设目标": "1. 具体目标和预期效果：桩",
+    "项目建设必要性": "1. 现有系统的不足：桩",
+    "存在问题": "1. 当前系统存在的具体问题：桩",
+}
+
+
+def build_steps(pa) -> List[Tuple[str, Callable[[Dict], object]]]:
+    """按流水线顺序列出要计时的步骤；state 在步骤间传递中间结果"""
+    name = "合成压测需求"
+
+    def step4(state: Dict) -> float:
+        state["total"] = pa.sum_attachment5_col_L_from_L2()
+        return state["total"]
+
+    return [
+        ("initialize_attachment1", lambda state: pa.initialize_attachment1()),
+        ("initialize_attachment2", lambda state: pa.initialize_attachment2()),
+        ("write_attachment3_sheet2_cells", lambda state: pa.write_attachment3_sheet2_cells(name)),
+        ("write_attachment4_cells", lambda state: pa.write_attachment4_cells(name)),
+        ("sum_attachment5_col_L_from_L2", step4),
+        ("write_attachment4_with_sum", lambda state: pa.write_attachment4_with_sum(state["total"])),
+        ("write_attachment3_sheet2_F3_with_sum", lambda state: pa.write_attachment3_sheet2_F3_with_sum(state["total"])),
+        ("write_attachment4_C6_with_today", lambda state: pa.write_attachment4_C6_with_today()),
+        ("write_attachment4_B7_from_attachment3_E3", lambda state: pa.write_attachment4_B7_from_attachment3_E3()),
+        ("extract_attachment5_h_i_content", lambda state: pa.extract_attachment5_h_i_content()),
+        ("summarize_requirement_content_and_update_h4", lambda state: pa.summarize_requirement_content_and_update_h4()),
+        ("load_function_codes", lambda state: pa.load_function_codes()),
+        ("update_wbs_document", lambda state: pa.update_wbs_document()),
+        ("update_attachment1_with_project_docs", lambda state: pa.update_attachment1_with_project_docs(STUB_PROJECT_DOCS)),
+        ("update_attachment3_with_project_docs", lambda state: pa.update_attachment3_with_project_docs(STUB_PROJECT_DOCS)),
+        ("step12_enhance_cosmic_data_groups_and_attributes", lambda state: pa.step12_enhance_cosmic_data_groups_and_attributes()),
+    ]
+
+
+def _catalogue_in(work_dir: str, default: str) -> str:
+    """附件包中带了功能点码值（合成包会生成）就用它，否则用程序目录下的"""
+    path = os.path.join(work_dir, os.path.basename(default))
+    return path if os.path.exists(path) else default
+
+
+def run_benchmark(package_dir: str, repeat: int, only: Optional[List[str]] = None) -> Dict[str, dict]:
+    pa = _import_pipeline()
+    pa.LLM_CLIENT.session = StubSession()
+    steps = build_steps(pa)
+    if only:
+        steps = [(name, fn) for name, fn in steps if name in only]
+
+    original_paths = {attribute: getattr(pa, attribute)
+                      for attribute in ("CATALOGUE_FILE", "MANUAL_SUMMARY_CACHE", "PROJECT_DOCS_OUTPUT")}
+    timings: Dict[str, List[float]] = {name: [] for name, _ in steps}
+    save_timings: Dict[str, List[float]] = {name: [] for name, _ in steps}
+    for run in range(repeat):
+        work_dir = tempfile.mkdtemp(prefix="cosmic_bench_")
+        try:
+            for fname in os.listdir(package_dir):
+                shutil.copy2(os.path.join(package_dir, fname), work_dir)
+            pa.DATA_DIR = work_dir
+            # 程序目录下的文件（功能点码值、手册摘要缓存、项目文档输出）也改用工作目录中的，不覆盖已提交的文件
+            pa.CATALOGUE_FILE = _catalogue_in(work_dir, original_paths["CATALOGUE_FILE"])
+            pa.MANUAL_SUMMARY_CACHE = os.path.join(work_dir, "manual_summary_cache.txt")
+            pa.PROJECT_DOCS_OUTPUT = os.path.join(work_dir, "项目文档更新内容.txt")
+            state: Dict = {"total": 0.0}
+            for name, fn in steps:
+                with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    fn(state)
+                    elapsed = time.perf_counter() - start
+                    # 保存在后台进行，单独统计等待落盘的时间
+                    start = time.perf_counter()
+                    pa.SAVE_SERVICE.flush_and_report()
+                    saved = time.perf_counter() - start
+                timings[name].append(elapsed)
+                save_timings[name].append(saved)
+                print(f"  [{run + 1}/{repeat}] {name}: {elapsed * 1000:.1f} ms（落盘 {saved * 1000:.1f} ms）")
+        finally:
+            pa.clear_document_sessions()
+            for attribute, path in original_paths.items():
+                setattr(pa, attribute, path)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        name: {
+            "min_s": min(values),
+            "median_s": statistics.median(values),
+            "save_median_s": statistics.median(save_timings[name]),
+            "runs": len(values),
+        }
+        for name, values in timings.items()
+    }
+
+
+def compare_with_baseline(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """返回比基线慢超过 tolerance 比例的步骤"""
+    regressions = []
+    print(f"\n{'步骤':<50}{'基线(ms)':>12}{'本次(ms)':>12}{'变化':>10}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["median_s"]
+        new = result["median_s"]
+        change = (new - old) / old if old > 0 else 0.0
+        flag = ""
+        # 1ms 以内的步骤抖动较大，不参与判定
+        if change > tolerance and new - old > 0.001:
+            regressions.append(name)
+            flag = "  ⚠️ 回退"
+        print(f"{name:<50}{old * 1000:>12.1f}{new * 1000:>12.1f}{change:>+10.0%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="逐步骤基准测试（大模型调用使用本地桩）")
+    parser.add_argument("--package", help="使用已有附件目录（会复制后再测试）；不提供则生成合成包")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取中位数")
+    parser.add_argument("--steps", nargs="*", help="只测试指定的步骤函数")
+    parser.add_argument("--cosmic-rows", type=int, default=10000)
+    parser.add_argument("--ams-rows", type=int, default=50000)
+    parser.add_argument("--doc-paragraphs", type=int, default=2000)
+    parser.add_argument("--doc-images", type=int, default=20)
+    parser.add_argument("--catalogue-size", type=int, default=5000)
+    parser.add_argument("--save-baseline", help="将结果保存为 JSON 基线")
+    parser.add_argument("--compare", help="与指定的 JSON 基线对比")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的变慢比例，默认 20%%")
+    args = parser.parse_args()
+
+    package_dir = args.package
+    generated_dir = None
+    if not package_dir:
+        generated_dir = tempfile.mkdtemp(prefix="cosmic_synthetic_")
+        print(f"生成合成附件包：{generated_dir}")
+        generate_package(generated_dir, cosmic_rows=args.cosmic_rows, ams_rows=args.ams_rows,
+                         doc_paragraphs=args.doc_paragraphs, doc_images=args.doc_images,
+                         catalogue_size=args.catalogue_size)
+        package_dir = generated_dir
+
+    try:
+        results = run_benchmark(package_dir, args.repeat, args.steps)
+    finally:
+        if generated_dir:
+            shutil.rmtree(generated_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "package": args.package or "synthetic",
+            "scale": {
+                "cosmic_rows": args.cosmic_rows,
+                "ams_rows": args.ams_rows,
+                "doc_paragraphs": args.doc_paragraphs,
+                "doc_images": args.doc_images,
+                "catalogue_size": args.catalogue_size,
+            },
+            "repeat": args.repeat,
+        },
+        "steps": results,
+    }
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 基线已保存：{args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline["steps"], args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} 个步骤性能回退：{', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ 未发现性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+大型 Word 文档的流式处理：用 lxml iterparse 逐个读取正文（w:body）下的段落和表格，
+由回调决定删除段落或在其后插入新段落，边解析边写出新的 word/document.xml。
+已处理的元素立即释放，内存占用取决于最大的单个段落/表格，而不是整个文档。
+其余 zip 成员（图片、样式、页眉等）按原始压缩字节复制。
+"""
+import posixpath
+import re
+import tempfile
+import zipfile
+from typing import BinaryIO, Callable, Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+from startup_profile import lazy_import
+from zip_patch import rewrite_zip
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W_BODY = f"{{{W_NS}}}body"
+_W_P = f"{{{W_NS}}}p"
+_W_T = f"{{{W_NS}}}t"
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+# 新的 document.xml 超过该大小时写入临时文件而不是留在内存
+_SPOOL_SIZE = 16 * 1024 * 1024
+
+# 回调：接收段落文本，返回 (是否保留该段落, 在其后插入的段落文本列表)
+ParagraphCallback = Callable[[str], Tuple[bool, List[str]]]
+
+
+def main_document_member(zf: zipfile.ZipFile) -> str:
+    """根据包关系找到正文部件（通常为 word/document.xml）"""
+    etree = lazy_import("lxml.etree")
+    rels = etree.fromstring(zf.read("_rels/.rels"))
+    for rel in rels:
+        if rel.get("Type") == _OFFICE_DOCUMENT_REL:
+            return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    return "word/document.xml"
+
+
+def document_xml_size(source: BinaryIO) -> int:
+    """正文 XML 解压后的大小，用于判断是否改用流式处理"""
+    with zipfile.ZipFile(source) as zf:
+        return zf.getinfo(main_document_member(zf)).file_size
+
+
+def paragraph_text(element) -> str:
+    """与 python-docx 的 paragraph.text 一致：只拼接各 w:t 的文本"""
+    return "".join(t.text or "" for t in element.iter(_W_T))
+
+
+class _Writer:
+    """按根元素的前缀映射输出起止标签，并去掉子树中与根元素重复的命名空间声明"""
+
+    _DECLARATIONS = re.compile(rb'(?:\s+xmlns(?::[A-Za-z0-9_.-]+)?="[^"]*")+')
+    _DECLARATION = re.compile(rb'\s+xmlns(?::([A-Za-z0-9_.-]+))?="([^"]*)"')
+
+    def __init__(self, out: BinaryIO, nsmap: Dict[str, str]) -> None:
+        self.out = out
+        self.nsmap = nsmap
+        self.prefixes = {uri: prefix for prefix, uri in nsmap.items()}
+        self._etree = lazy_import("lxml.etree")
+        # lxml 为每个子树输出的命名空间声明基本相同，按原文缓存去重结果
+        self._stripped: Dict[bytes, bytes] = {}
+
+    def _strip_declarations(self, declarations: bytes) -> bytes:
+        stripped = self._stripped.get(declarations)
+        if stripped is None:
+            def strip(match) -> bytes:
+                prefix = match.group(1).decode() if match.group(1) else None
+                return b"" if self.nsmap.get(prefix) == match.group(2).decode() else match.group(0)
+
+            stripped = self._stripped[declarations] = self._DECLARATION.sub(strip, declarations)
+        return stripped
+
+    def qname(self, tag: str) -> str:
+        uri, local = tag[1:].split("}", 1)
+        prefix = self.prefixes[uri]
+        return f"{prefix}:{local}" if prefix else local
+
+    def start_tag(self, element, declare: bool) -> None:
+        parts = [self.qname(element.tag)]
+        if declare:
+            for prefix, uri in self.nsmap.items():
+                parts.append(f'xmlns:{prefix}="{escape(uri)}"' if prefix else f'xmlns="{escape(uri)}"')
+        for key, value in element.attrib.items():
+            name = self.qname(key) if key.startswith("{") else key
+            parts.append(f'{name}="{escape(value, {chr(34): "&quot;"})}"')
+        self.out.write(("<" + " ".join(parts) + ">").encode("utf-8"))
+
+    def end_tag(self, element) -> None:
+        self.out.write(f"</{self.qname(element.tag)}>".encode("utf-8"))
+
+    def element(self, element) -> None:
+        data = self._etree.tostring(element, encoding="UTF-8", with_tail=False)
+        match = self._DECLARATIONS.search(data, 0, data.index(b">"))
+        if match is None:
+            self.out.write(data)
+            return
+        self.out.write(data[:match.start()] + self._strip_declarations(match.group(0)) + data[match.end():])
+
+    def paragraph(self, text: str) -> None:
+        p, r, t = (self.qname(f"{{{W_NS}}}{name}") for name in ("p", "r", "t"))
+        space = ' xml:space="preserve"' if text != text.strip() else ""
+        self.out.write(f"<{p}><{r}><{t}{space}>{escape(text)}</{t}></{r}></{p}>".encode("utf-8"))
+
+
+def stream_document_xml(xml_in: BinaryIO, out: BinaryIO, on_paragraph: ParagraphCallback) -> Dict[str, int]:
+    """流式改写正文 XML，返回统计（段落数、删除数、插入数）"""
+    etree = lazy_import("lxml.etree")
+    stats = {"paragraphs": 0, "removed": 0, "inserted": 0}
+    writer = None
+    root = body = None
+    depth = 0
+    out.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n')
+    for event, element in etree.iterparse(xml_in, events=("start", "end"), huge_tree=True):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root = element
+                writer = _Writer(out, dict(element.nsmap))
+                writer.start_tag(element, declare=True)
+            elif depth == 2 and element.tag == _W_BODY:
+                body = element
+                writer.start_tag(element, declare=False)
+            continue
+
+        depth -= 1
+        if depth == 2 and body is not None and element.getparent() is body:
+            if element.tag == _W_P:
+                stats["paragraphs"] += 1
+                keep, inserts = on_paragraph(paragraph_text(element).strip())
+                if keep:
+                    writer.element(element)
+                else:
+                    stats["removed"] += 1
+                for text in inserts:
+                    writer.paragraph(text)
+                    stats["inserted"] += 1
+            else:
+                writer.element(element)
+            body.remove(element)
+        elif depth == 1:
+            if element is body:
+                writer.end_tag(element)
+            else:
+                writer.element(element)
+            root.remove(element)
+        elif depth == 0:
+            writer.end_tag(element)
+    return stats
+
+
+def stream_patch_docx(src: BinaryIO, dst: BinaryIO, on_paragraph: ParagraphCallback) -> Dict[str, int]:
+    """流式改写 src 的正文并写入 dst（需支持 seek），其余成员原样复制"""
+    with zipfile.ZipFile(src) as zf:
+        member = main_document_member(zf)
+        with zf.open(member) as xml_in, tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE) as xml_out:
+            stats = stream_document_xml(xml_in, xml_out, on_paragraph)
+            xml_out.seek(0)
+            src.seek(0)
+            rewrite_zip(src, dst, {member: xml_out})
+    return stats
@@ -0,0 +1,157 @@
+import difflib
+import os
+import threading
+from io import BytesIO
+from typing import BinaryIO, Callable, Dict, List, Tuple
+
+
+class DryRunStore:
+    """
+    试运行存储：附件首次加载时读入内存，之后的加载和保存都只作用于内存副本，
+    磁盘上的文件保持不变。运行结束后可对比原始内容与最终内容生成差异报告。
+    """
+
+    def __init__(self) -> None:
+        self._original: Dict[str, bytes] = {}
+        self._current: Dict[str, bytes] = {}
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self, path: str) -> str:
+        key = os.path.abspath(path)
+        with self._lock:
+            if key not in self._current:
+                with open(path, "rb") as f:
+                    data = f.read()
+                self._original[key] = data
+                self._current[key] = data
+                self._names[key] = os.path.basename(path)
+        return key
+
+    def open(self, path: str) -> BinaryIO:
+        """返回该文件当前内容的内存副本"""
+        key = self._ensure_loaded(path)
+        return BytesIO(self._current[key])
+
+    def read_bytes(self, path: str) -> bytes:
+        key = self._ensure_loaded(path)
+        return self._current[key]
+
+    def write(self, path: str, writer: Callable[[BinaryIO], None]) -> None:
+        """拦截保存：writer 写入内存缓冲区，结果替换该文件的当前内容"""
+        key = self._ensure_loaded(path)
+        buffer = BytesIO()
+        writer(buffer)
+        with self._lock:
+            self._current[key] = buffer.getvalue()
+
+    def changed_files(self) -> List[str]:
+        return [key for key in self._current if self._current[key] != self._original[key]]
+
+    def diff(self, max_items: int = 50) -> Dict[str, dict]:
+        """按文件生成差异：xlsx 为逐单元格的新旧值，docx 为插入/删除的段落"""
+        result: Dict[str, dict] = {}
+        for key in self.changed_files():
+            ext = os.path.splitext(key)[1].lower()
+            name = self._names[key]
+            try:
+                if ext == ".xlsx":
+                    result[name] = diff_workbooks(self._original[key], self._current[key], max_items)
+                elif ext == ".docx":
+                    result[name] = diff_documents(self._original[key], self._current[key])
+                else:
+                    result[name] = {"note": "二进制内容已变化"}
+            except Exception as e:
+                result[name] = {"error": f"生成差异失败：{e}"}
+        return result
+
+    def print_report(self, max_items: int = 50) -> None:
+        print("==== 试运行差异报告（磁盘文件未修改） ====")
+        report = self.diff(max_items)
+        if not report:
+            print("没有文件内容发生变化")
+            return
+        for name, file_diff in report.items():
+            print(f"\n📄 {name}")
+            if "error" in file_diff or "note" in file_diff:
+                print(f"  {file_diff.get('error') or file_diff.get('note')}")
+                continue
+            for sheet, sheet_diff in file_diff.get("sheets", {}).items():
+                print(f"  [{sheet}] 变化单元格 {sheet_diff['count']} 个")
+                for coord, old, new in sheet_diff["cells"]:
+                    print(f"    {coord}: {_preview(old)} -> {_preview(new)}")
+                if sheet_diff["count"] > len(sheet_diff["cells"]):
+                    print(f"    ...（其余 {sheet_diff['count'] - len(sheet_diff['cells'])} 个省略）")
+            for sheet in file_diff.get("added_sheets", []):
+                print(f"  新增工作表：{sheet}")
+            for sheet in file_diff.get("removed_sheets", []):
+                print(f"  删除工作表：{sheet}")
+            if "inserted" in file_diff:
+                print(f"  插入段落 {len(file_diff['inserted'])} 个，删除段落 {len(file_diff['removed'])} 个")
+                for index, text in file_diff["removed"][:max_items]:
+                    print(f"    - [{index}] {_preview(text)}")
+                for index, text in file_diff["inserted"][:max_items]:
+                    print(f"    + [{index}] {_preview(text)}")
+
+
+def _preview(value, limit: int = 40) -> str:
+    if value is None:
+        return "(空)"
+    text = str(value).replace("\n", "\\n")
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _cell_values(ws) -> Dict[str, object]:
+    values = {}
+    for row in ws.iter_rows():
+        for cell in row:
+            if cell.value is not None:
+                values[cell.coordinate] = cell.value
+    return values
+
+
+def diff_workbooks(old: bytes, new: bytes, max_items: int = 50) -> dict:
+    from openpyxl import load_workbook
+
+    wb_old = load_workbook(BytesIO(old))
+    wb_new = load_workbook(BytesIO(new))
+    sheets: Dict[str, dict] = {}
+    for sheet_name in wb_new.sheetnames:
+        if sheet_name not in wb_old.sheetnames:
+            continue
+        old_values = _cell_values(wb_old[sheet_name])
+        new_values = _cell_values(wb_new[sheet_name])
+        changed: List[Tuple[str, object, object]] = []
+        for coord in sorted(set(old_values) | set(new_values), key=_coordinate_sort_key):
+            if old_values.get(coord) != new_values.get(coord):
+                changed.append((coord, old_values.get(coord), new_values.get(coord)))
+        if changed:
+            sheets[sheet_name] = {"count": len(changed), "cells": changed[:max_items]}
+    return {
+        "sheets": sheets,
+        "added_sheets": [s for s in wb_new.sheetnames if s not in wb_old.sheetnames],
+        "removed_sheets": [s for s in wb_old.sheetnames if s not in wb_new.sheetnames],
+    }
+
+
+def _coordinate_sort_key(coord: str) -> Tuple[int, int]:
+    from openpyxl.utils.cell import coordinate_to_tuple
+
+    return coordinate_to_tuple(coord)
+
+
+def diff_documents(old: bytes, new: bytes) -> dict:
+    from docx import Document
+
+    old_texts = [p.text for p in Document(BytesIO(old)).paragraphs]
+    new_texts = [p.text for p in Document(BytesIO(new)).paragraphs]
+    inserted: List[Tuple[int, str]] = []
+    removed: List[Tuple[int, str]] = []
+    matcher = difflib.SequenceMatcher(a=old_texts, b=new_texts, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("delete", "replace"):
+            removed.extend((i, old_texts[i]) for i in range(i1, i2))
+        if tag in ("insert", "replace"):
+            inserted.extend((j, new_texts[j]) for j in range(j1, j2))
+    return {"inserted": inserted, "removed": removed}
+
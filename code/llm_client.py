@@ -0,0 +1,374 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Deque, Dict, List, Optional, Tuple
+
+from startup_profile import lazy_import
+from telemetry import TelemetryStore, current_step, percentile
+
+# 响应缓存（常驻服务模式开启）：只缓存温度不高于该值的请求，最多保留的条数，超出时淘汰最久未用的
+CACHE_MAX_TEMPERATURE = 0.3
+CACHE_MAX_ENTRIES = 2000
+
+# 连接池大小：覆盖第九步分块提炼的并发数与对冲请求
+POOL_MAXSIZE = 16
+
+
+class LLMError(Exception):
+    """大模型接口返回非 200 或响应格式错误"""
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(LLMError):
+    """熔断期间直接失败，没有发出请求"""
+
+
+class HedgeCancelled(Exception):
+    """对冲请求中落败的一方，结果已被丢弃"""
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """判断是否为 requests 的超时异常（requests 未加载时不可能是超时）"""
+    requests = sys.modules.get("requests")
+    return requests is not None and isinstance(error, requests.exceptions.Timeout)
+
+
+class CircuitBreaker:
+    """
+    所有调用点共用的熔断器：连续 failure_threshold 次失败（网络异常、超时、5xx、429）后打开，
+    打开期间调用立即失败；cooldown 秒后半开，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_failure(error: BaseException) -> bool:
+        """接口不可用才计为失败；400 等请求本身的问题说明接口可达"""
+        if isinstance(error, LLMError):
+            return error.status is not None and (error.status >= 500 or error.status == 429)
+        return True
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                print("🔌 熔断冷却结束，发出探测请求")
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                print("🔌 探测请求成功，恢复调用大模型")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                print(f"🔌 大模型接口连续 {self.failures} 次失败，熔断 {self.cooldown:g} 秒，期间的调用直接失败")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class AdaptiveTimeouts:
+    """
+    按步骤保存最近成功调用的耗时，给出自适应超时（p95 × multiplier，限制在 floor 与调用处给定的超时之间）
+    和对冲阈值（p95）。样本少于 min_samples 的步骤沿用调用处给定的超时，也不对冲。
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, multiplier: float = 3.0, floor: float = 10.0) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self.floor = floor
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, latencies_ms: Dict[str, List[float]]) -> None:
+        """载入历史耗时（毫秒，按时间先后）"""
+        with self._lock:
+            for step, values in latencies_ms.items():
+                samples = self._latencies.setdefault(step, deque(maxlen=self.window))
+                samples.extend(value / 1000 for value in values)
+
+    def observe(self, step: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(step, deque(maxlen=self.window)).append(seconds)
+
+    def p95(self, step: str) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latencies.get(step, ()))
+        return percentile(samples, 95) if len(samples) >= self.min_samples else None
+
+    def timeout(self, step: str, ceiling: float) -> float:
+        p95 = self.p95(step)
+        if p95 is None:
+            return ceiling
+        return min(ceiling, max(self.floor, p95 * self.multiplier))
+
+    def hedge_delay(self, step: str) -> Optional[float]:
+        return self.p95(step)
+
+
+class HedgeBudget:
+    """对冲请求的预算：额外发出的请求数不超过 burst + ratio × 远程调用数"""
+
+    def __init__(self, ratio: float = 0.05, burst: int = 2) -> None:
+        self.ratio = ratio
+        self.burst = burst
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def count_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.burst + self.ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+
+class LLMClient:
+    """
+    DeepSeek 接口客户端：各线程的 requests.Session 共用一个连接池（连接、TLS 会话），
+    可选地按请求内容缓存低温度请求的响应（LRU，有条数上限），供常驻服务在多次作业间复用。
+    设置 telemetry 后每次调用（包括命中缓存和失败的调用）都记录到遥测库，并用其中的历史耗时计算自适应超时；
+    设置 hedge_budget 后，请求超过所属步骤的 p95 仍未返回时在预算内再发一次相同请求，取先成功的结果并取消另一个。
+    接口连续失败时由 breaker 熔断，之后的调用不再等待超时而是立即抛出 CircuitOpenError。
+    """
+
+    def __init__(self, api_url: str, api_key: str, model: str = "deepseek-chat") -> None:
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.cache_enabled = False
+        # 生成类（高温度）请求每次应得到新的回复，不缓存
+        self.cache_max_temperature = CACHE_MAX_TEMPERATURE
+        self.cache_max_entries = CACHE_MAX_ENTRIES
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # requests.Session 不保证线程安全：每个线程使用自己的 Session，共用同一个（线程安全的）连接池适配器
+        self._session = None
+        self._adapter = None
+        self._local = threading.local()
+        self._session_lock = threading.Lock()
+        self.telemetry: Optional[TelemetryStore] = None
+        self.latency = AdaptiveTimeouts()
+        self.hedge_budget: Optional[HedgeBudget] = None
+        self.breaker = CircuitBreaker()
+        self._history_loaded = False
+
+    @property
+    def session(self):
+        """当前线程的 Session；通过赋值替换时（如基准测试的桩）所有线程共用替换后的对象"""
+        if self._session is not None:
+            return self._session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            requests = lazy_import("requests")
+            with self._session_lock:
+                if self._adapter is None:
+                    self._adapter = requests.adapters.HTTPAdapter(pool_maxsize=POOL_MAXSIZE)
+            session = self._local.session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+        return session
+
+    @session.setter
+    def session(self, value) -> None:
+        self._session = value
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+    @staticmethod
+    def _cache_key(payload: dict) -> str:
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def chat(self, prompt: str, temperature: float = 0.7, max_tokens: Optional[int] = None, timeout: float = 30) -> str:
+        """
+        发送单轮对话并返回回复文本。timeout 为上限，所属步骤有足够历史耗时时按 p95 自适应缩短。
+        非 200 状态码或响应格式错误抛出 LLMError；网络异常（如超时）原样抛出。
+        """
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+        }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+
+        started = time.perf_counter()
+        cacheable = self.cache_enabled and temperature <= self.cache_max_temperature
+        key = self._cache_key(payload) if cacheable else None
+        if key is not None:
+            with self._cache_lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+            if cached is not None:
+                self._record(prompt, started, cache_hit=True)
+                return cached
+
+        if not self.breaker.allow():
+            self._record(prompt, started, error=CircuitOpenError.__name__)
+            raise CircuitOpenError("大模型接口连续失败，熔断中，未发出请求")
+
+        self._load_history()
+        step = current_step()
+        try:
+            content, usage, hedges = self._send(payload, step, self.latency.timeout(step, timeout))
+        except Exception as e:
+            if self.breaker.is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            self._record(prompt, started, getattr(e, "status", None), retries=getattr(e, "hedges", 0),
+                         error=type(e).__name__)
+            raise
+        self.breaker.record_success()
+        self.latency.observe(step, time.perf_counter() - started)
+        self._record(prompt, started, 200, retries=hedges, usage=usage)
+
+        if key is not None:
+            with self._cache_lock:
+                self._cache[key] = content
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_max_entries:
+                    self._cache.popitem(last=False)
+        return content
+
+    def _load_history(self) -> None:
+        """第一次远程调用前从遥测库载入各步骤最近的耗时"""
+        if self._history_loaded or self.telemetry is None:
+            return
+        with self._session_lock:
+            if not self._history_loaded:
+                self.latency.load(self.telemetry.recent_latencies(self.latency.window))
+                self._history_loaded = True
+
+    def _post(self, payload: dict, timeout: float,
+              cancelled: Optional[threading.Event] = None) -> Tuple[str, Optional[dict]]:
+        """
+        发送一次请求，返回 (回复文本, usage)。cancelled 不为 None 时（对冲请求）流式接收：
+        响应头到达时已被取消则直接关闭连接，不再下载响应体，抛出 HedgeCancelled。
+        """
+        response = self.session.post(self.api_url, headers=self._headers(), json=payload, timeout=timeout,
+                                     stream=cancelled is not None)
+        try:
+            if cancelled is not None and cancelled.is_set():
+                raise HedgeCancelled("对冲中落败的请求已取消")
+            if response.status_code != 200:
+                raise LLMError(f"API调用失败，状态码: {response.status_code}", response.status_code)
+            result = response.json()
+        finally:
+            # 未读完的流式响应会断开连接而不是放回连接池
+            response.close()
+        if not result.get("choices"):
+            raise LLMError("API响应格式错误", response.status_code)
+        return result["choices"][0]["message"]["content"].strip(), result.get("usage")
+
+    def _post_in_background(self, payload: dict, timeout: float) -> Tuple[Future, threading.Event]:
+        future: Future = Future()
+        cancelled = threading.Event()
+
+        def run() -> None:
+            try:
+                future.set_result(self._post(payload, timeout, cancelled))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="llm-request", daemon=True).start()
+        return future, cancelled
+
+    def _send(self, payload: dict, step: str, timeout: float) -> Tuple[str, Optional[dict], int]:
+        """
+        返回 (回复文本, usage, 对冲请求数)。未开启对冲或该步骤样本不足时直接在当前线程请求；
+        否则请求超过 p95 后在预算内发出对冲请求，先成功的结果胜出，另一个请求被取消。
+        requests 无法中断正在等待响应头的请求，落败的请求在响应头到达时（或自己的超时内）关闭连接，
+        不下载响应体；服务端已开始的生成无法撤回。
+        """
+        if self.hedge_budget is None:
+            return self._post(payload, timeout) + (0,)
+        self.hedge_budget.count_call()
+        delay = self.latency.hedge_delay(step)
+        if delay is None or delay >= timeout:
+            return self._post(payload, timeout) + (0,)
+
+        primary, primary_cancelled = self._post_in_background(payload, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.hedge_budget.try_acquire():
+            return primary.result() + (0,)
+
+        print(f"⏱️  请求已超过本步骤 p95（{delay:.1f}s），发出对冲请求")
+        hedge, hedge_cancelled = self._post_in_background(payload, timeout - delay)
+        cancel_events = {primary: primary_cancelled, hedge: hedge_cancelled}
+        pending = {primary, hedge}
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        cancel_events[other].set()
+                    return future.result() + (1,)
+                first_error = first_error or future.exception()
+        first_error.hedges = 1
+        raise first_error
+
+    def _record(self, prompt: str, started: float, status: Optional[int] = None, retries: int = 0,
+                cache_hit: bool = False, usage: Optional[dict] = None, error: Optional[str] = None) -> None:
+        if self.telemetry is None:
+            return
+        self.telemetry.record(current_step(), self.model, prompt, (time.perf_counter() - started) * 1000,
+                              http_status=status, retries=retries, cache_hit=cache_hit, usage=usage, error=error)
+
+    def warm_up(self, timeout: float = 5) -> bool:
+        """提前建立到接口主机的连接（TCP + TLS），之后的请求直接复用连接池"""
+        try:
+            self.session.head(self.api_url, timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    def cache_size(self) -> int:
+        with self._cache_lock:
+            return len(self._cache)
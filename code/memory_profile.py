@@ -0,0 +1,115 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+def current_rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（RSS），优先 psutil，其次 /proc；都不可用时返回 None"""
+    try:
+        import psutil  # type: ignore
+
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def _mb(value: Optional[int]) -> str:
+    return "-" if value is None else f"{value / 1024 / 1024:.1f}"
+
+
+class MemoryProfiler:
+    """
+    基于 tracemalloc 的逐步骤内存统计：每个步骤记录峰值和净分配以及主要分配位置，
+    每次 load_workbook / Document() 记录调用前后的 RSS。
+    """
+
+    def __init__(self, top_n: int = 5) -> None:
+        self.top_n = top_n
+        self.steps: List[Dict] = []
+        self.loads: List[Dict] = []
+        self._current_step: Optional[str] = None
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before_snapshot = tracemalloc.take_snapshot()
+        before_current, _ = tracemalloc.get_traced_memory()
+        rss_before = current_rss_bytes()
+        self._current_step = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            after_current, peak = tracemalloc.get_traced_memory()
+            after_snapshot = tracemalloc.take_snapshot()
+            self._current_step = None
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            stats = after_snapshot.filter_traces(filters).compare_to(before_snapshot.filter_traces(filters), "lineno")
+            top_sites = [
+                {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in sorted(stats, key=lambda s: s.size_diff, reverse=True)[:self.top_n]
+                if stat.size_diff > 0
+            ]
+            self.steps.append({
+                "step": name,
+                "seconds": round(elapsed, 4),
+                "peak_bytes": max(0, peak - before_current),
+                "net_bytes": after_current - before_current,
+                "rss_before": rss_before,
+                "rss_after": current_rss_bytes(),
+                "top_sites": top_sites,
+            })
+
+    @contextmanager
+    def loader(self, kind: str, path: str) -> Iterator[None]:
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            rss_after = current_rss_bytes()
+            self.loads.append({
+                "step": self._current_step,
+                "loader": kind,
+                "file": os.path.basename(str(path)),
+                "seconds": round(time.perf_counter() - start, 4),
+                "rss_before": rss_before,
+                "rss_after": rss_after,
+                "rss_delta": None if rss_before is None or rss_after is None else rss_after - rss_before,
+            })
+
+    def to_dict(self) -> Dict:
+        return {"steps": self.steps, "loads": self.loads}
+
+    def save_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"✅ 内存统计已保存：{path}")
+
+    def print_table(self) -> None:
+        print("==== 逐步骤内存统计（MB） ====")
+        print(f"{'步骤':<40}{'耗时(s)':>9}{'峰值':>9}{'净分配':>9}{'RSS前':>9}{'RSS后':>9}")
+        for item in self.steps:
+            print(f"{item['step']:<40}{item['seconds']:>9.2f}{_mb(item['peak_bytes']):>9}"
+                  f"{_mb(item['net_bytes']):>9}{_mb(item['rss_before']):>9}{_mb(item['rss_after']):>9}")
+            for site in item["top_sites"]:
+                print(f"    +{_mb(site['size_diff'])} MB  {site['site']}")
+        if self.loads:
+            print("\n==== 文件加载 RSS（MB） ====")
+            print(f"{'加载器':<16}{'RSS前':>9}{'RSS后':>9}{'增量':>9}  文件")
+            for item in self.loads:
+                print(f"{item['loader']:<16}{_mb(item['rss_before']):>9}{_mb(item['rss_after']):>9}"
+                      f"{_mb(item['rss_delta']):>9}  {item['file']}（{item['step'] or '-'}）")
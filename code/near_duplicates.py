@@ -0,0 +1,180 @@
+"""
+近似重复文本聚类：去掉编号、标点和空白后按字符二元组（shingle）计算 Jaccard 相似度，
+相似度不低于阈值的条目归入同一类，每类保留第一次出现的原文作为代表并记录条数。
+
+采用“代表”聚类：新条目只与已有代表比较（取最相似的一个），避免 A≈B、B≈C 把不相似的 A、C 串成一类。
+正文中的数字必须完全相同才能归为一类：“接口1”“接口2”这类只差数字的条目是不同的功能点，
+因此先按数字序列分组，只在组内聚类。
+候选代表由索引给出，再逐个计算精确 Jaccard：
+- 前缀过滤（默认）：各集合的 shingle 按全局出现次数从少到多排序，Jaccard ≥ t 的两个集合必然在各自
+  前 |s| - ⌈t·|s|⌉ + 1 个 shingle 中有交集，不会漏掉相似对，结果确定。
+- MinHash/LSH（安装了 NumPy 且同一数字序列的条目较多时）：64 个哈希分 16 段，任一段相同即为候选，
+  向量化计算签名；候选按相同段数从多到少校验，归入第一个达到阈值的代表（不再找最相似的一个）。
+  Jaccard 为 0.7 的一对被漏掉的概率约 1%。
+"""
+import math
+import re
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Set, Tuple
+
+from startup_profile import lazy_import
+
+# 行首编号：1. 1、 (1) （1） 一、 ① 等
+_NUMBERING = re.compile(r"^\s*(?:[（(]?\d+[)）.．、]|[一二三四五六七八九十]+[、.．]|[①-⑳])\s*")
+_NOISE = re.compile(r"[\s\W_]+", re.UNICODE)
+_DIGITS = re.compile(r"\d+")
+
+DEFAULT_THRESHOLD = 0.7
+
+# 去重后的条目数不少于该值且安装了 NumPy 时使用 MinHash/LSH
+LSH_MIN_ITEMS = 2000
+_LSH_BANDS = 16
+_LSH_ROWS = 4
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text: str) -> str:
+    """去掉行首编号、标点和空白，英文转小写"""
+    return _NOISE.sub("", _NUMBERING.sub("", str(text))).lower()
+
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class _PrefixIndex:
+    """前缀过滤：只索引代表的前缀 shingle"""
+
+    # 候选无序，需校验全部候选取最相似的代表
+    ordered = False
+
+    def __init__(self, token_sets: List[Set[str]], threshold: float) -> None:
+        frequency: Dict[str, int] = {}
+        for tokens in token_sets:
+            for token in tokens:
+                frequency[token] = frequency.get(token, 0) + 1
+        self._prefixes = []
+        for tokens in token_sets:
+            ordered = sorted(tokens, key=lambda token: (frequency[token], token))
+            length = len(ordered) - math.ceil(threshold * len(ordered) - 1e-9) + 1
+            self._prefixes.append(ordered[:length])
+        self._index: Dict[str, List[int]] = {}
+
+    def candidates(self, item: int) -> Iterable[int]:
+        postings = [self._index[token] for token in self._prefixes[item] if token in self._index]
+        return set().union(*postings) if postings else ()
+
+    def add(self, item: int, rep: int) -> None:
+        for token in self._prefixes[item]:
+            self._index.setdefault(token, []).append(rep)
+
+
+class _MinHashIndex:
+    """MinHash/LSH：按签名分段建桶，同桶的代表为候选"""
+
+    # 候选按相同段数（近似相似度）从高到低给出，第一个达到阈值的即可采用
+    ordered = True
+
+    def __init__(self, token_sets: List[Set[str]], np) -> None:
+        vocabulary: Dict[str, int] = {}
+        ids = [vocabulary.setdefault(token, len(vocabulary)) for tokens in token_sets for token in tokens]
+        ids = np.asarray(ids, dtype=np.int64)
+        lengths = np.fromiter((len(tokens) for tokens in token_sets), dtype=np.int64, count=len(token_sets))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        rng = np.random.default_rng(20240531)
+        count = _LSH_BANDS * _LSH_ROWS
+        a = rng.integers(1, _MERSENNE_PRIME, size=count, dtype=np.int64)
+        b = rng.integers(0, _MERSENNE_PRIME, size=count, dtype=np.int64)
+        signature = np.empty((len(token_sets), count), dtype=np.int64)
+        for k in range(count):
+            signature[:, k] = np.minimum.reduceat((a[k] * ids + b[k]) % _MERSENNE_PRIME, offsets)
+
+        # 每段 _LSH_ROWS 个值合成一个桶键（整数溢出回绕不影响：同段签名相同则键相同，冲突只多出候选）
+        mix = rng.integers(1, _MERSENNE_PRIME, size=_LSH_ROWS, dtype=np.int64)
+        with np.errstate(over="ignore"):
+            self._keys = [(signature[:, band * _LSH_ROWS:(band + 1) * _LSH_ROWS] * mix).sum(axis=1).tolist()
+                          for band in range(_LSH_BANDS)]
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(_LSH_BANDS)]
+
+    def candidates(self, item: int) -> Iterable[int]:
+        postings = [bucket[keys[item]] for bucket, keys in zip(self._buckets, self._keys) if keys[item] in bucket]
+        if not postings:
+            return ()
+        return [rep for rep, _bands in Counter(chain.from_iterable(postings)).most_common()]
+
+    def add(self, item: int, rep: int) -> None:
+        for bucket, keys in zip(self._buckets, self._keys):
+            bucket.setdefault(keys[item], []).append(rep)
+
+
+def _numpy():
+    try:
+        return lazy_import("numpy")
+    except ImportError:
+        return None
+
+
+def _cluster(token_sets: List[Set[str]], threshold: float) -> List[Tuple[int, List[int]]]:
+    """对一组条目做代表聚类，返回 [(代表序号, 该类条目序号)]，按代表出现的顺序"""
+    np = _numpy() if len(token_sets) >= LSH_MIN_ITEMS else None
+    index = _MinHashIndex(token_sets, np) if np is not None else _PrefixIndex(token_sets, threshold)
+
+    rep_sets: List[Set[str]] = []
+    clusters: List[Tuple[int, List[int]]] = []
+    for item, tokens in enumerate(token_sets):
+        best, best_similarity = -1, 0.0
+        # 长度过滤：Jaccard ≥ t 要求 ⌈t·|A|⌉ ≤ |B| ≤ ⌊|A|/t⌋（取整前减去浮点误差，恰好等于阈值的不会被滤掉）
+        low = math.ceil(threshold * len(tokens) - 1e-9)
+        high = math.floor(len(tokens) / threshold + 1e-9)
+        for rep in index.candidates(item):
+            rep_size = len(rep_sets[rep])
+            if not low <= rep_size <= high:
+                continue
+            common = len(tokens & rep_sets[rep])
+            similarity = common / (len(tokens) + rep_size - common)
+            if similarity < threshold - 1e-9:
+                continue
+            if best < 0 or similarity > best_similarity or (similarity == best_similarity and rep < best):
+                best, best_similarity = rep, similarity
+                if index.ordered:
+                    break
+        if best >= 0:
+            clusters[best][1].append(item)
+            continue
+        index.add(item, len(rep_sets))
+        rep_sets.append(tokens)
+        clusters.append((item, [item]))
+    return clusters
+
+
+def cluster_near_duplicates(items: List[str], threshold: float = DEFAULT_THRESHOLD,
+                            size: int = 2) -> List[Tuple[str, int]]:
+    """返回 [(代表原文, 该类条数)]，按代表第一次出现的顺序；规范化后为空的条目忽略"""
+    # 规范化后完全相同的条目先直接合并
+    first_text: Dict[str, str] = {}
+    counts: Dict[str, int] = {}
+    for item in items:
+        key = normalize_text(item)
+        if not key:
+            continue
+        if key not in first_text:
+            first_text[key] = str(item).strip()
+        counts[key] = counts.get(key, 0) + 1
+
+    # 按正文中的数字序列分组，只在组内聚类：数字不同的条目不会合并，也不必互相比较
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for key in first_text:
+        groups.setdefault(tuple(_DIGITS.findall(key)), []).append(key)
+
+    order = {key: position for position, key in enumerate(first_text)}
+    representatives: List[Tuple[int, str, int]] = []
+    for keys in groups.values():
+        for rep, members in _cluster([shingles(key, size) for key in keys], threshold):
+            representatives.append((order[keys[rep]], first_text[keys[rep]],
+                                    sum(counts[keys[member]] for member in members)))
+    representatives.sort()
+    return [(text, count) for _position, text, count in representatives]
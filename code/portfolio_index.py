@@ -0,0 +1,212 @@
+"""
+跨需求包的功能点与工作量索引：每个附件目录处理完成后，把附件2 的 WBS 行、附件3 COSMIC功能点拆分表的行
+以及附件4 的 D7（工作量总和）、B7（功能点个数）写入本地 SQLite，按 (需求名, 版本) 唯一。
+版本取附件2/3/4 中最新的修改时间：附件未变化时重复索引直接跳过，附件更新后新增一个版本，旧版本保留。
+
+`index` 子命令批量索引已有目录；之后“本季度各一级模块的工作量”之类的问题直接查库即可：
+
+    SELECT level1, SUM(workload) FROM wbs_rows JOIN latest_runs ON wbs_rows.run_id = latest_runs.id
+    WHERE run_at >= '2024-04-01' GROUP BY level1;
+"""
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from startup_profile import lazy_import
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    requirement TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    package_dir TEXT NOT NULL,
+    indexed_at TEXT NOT NULL,
+    total_workload REAL,
+    function_points REAL,
+    UNIQUE (requirement, run_at)
+);
+CREATE INDEX IF NOT EXISTS runs_run_at ON runs (run_at);
+CREATE TABLE IF NOT EXISTS wbs_rows (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    level1 TEXT,
+    level2 TEXT,
+    level3 TEXT,
+    description TEXT,
+    workload REAL
+);
+CREATE INDEX IF NOT EXISTS wbs_rows_run_id ON wbs_rows (run_id);
+CREATE TABLE IF NOT EXISTS cosmic_rows (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    level1 TEXT,
+    level2 TEXT,
+    level3 TEXT,
+    trigger_event TEXT,
+    function_process TEXT,
+    subprocess TEXT,
+    movement_type TEXT,
+    data_group TEXT,
+    data_attributes TEXT
+);
+CREATE INDEX IF NOT EXISTS cosmic_rows_run_id ON cosmic_rows (run_id);
+CREATE VIEW IF NOT EXISTS latest_runs AS
+    SELECT * FROM runs AS r WHERE run_at = (SELECT MAX(run_at) FROM runs WHERE requirement = r.requirement);
+"""
+
+COSMIC_SHEET = "COSMIC功能点拆分表"
+
+
+def _text(value: object) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _number(value: object) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_wbs_rows(path: str) -> List[Tuple]:
+    """附件2：第 2 行起 B-D 列为一至三级功能点、E 列描述、F 列工作量，遇到“合计”行结束"""
+    wb = lazy_import("openpyxl").load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = []
+        for row, values in enumerate(wb.active.iter_rows(min_row=2, max_col=6, values_only=True), 2):
+            values = tuple(values) + (None,) * (6 - len(values))
+            if _text(values[1]) == "合计":
+                break
+            if not any(_text(value) for value in values[1:5]):
+                continue
+            rows.append((row, _text(values[1]), _text(values[2]), _text(values[3]), _text(values[4]),
+                         _number(values[5])))
+        return rows
+    finally:
+        wb.close()
+
+
+def read_cosmic_rows(path: str) -> List[Tuple]:
+    """附件3 COSMIC功能点拆分表：第 4 行起，B-D 列一至三级模块（空白沿用上一行），F-K 列子过程信息"""
+    wb = lazy_import("openpyxl").load_workbook(path, read_only=True, data_only=True)
+    try:
+        if COSMIC_SHEET not in wb.sheetnames:
+            return []
+        rows = []
+        level1 = level2 = level3 = None
+        for row, values in enumerate(wb[COSMIC_SHEET].iter_rows(min_row=4, max_col=11, values_only=True), 4):
+            values = tuple(values) + (None,) * (11 - len(values))
+            level1 = _text(values[1]) or level1
+            level2 = _text(values[2]) or level2
+            level3 = _text(values[3]) or level3
+            fields = tuple(_text(value) for value in values[5:11])
+            if not fields[2]:
+                continue
+            rows.append((row, level1, level2, level3) + fields)
+        return rows
+    finally:
+        wb.close()
+
+
+def read_attachment4_totals(path: str) -> Tuple[Optional[float], Optional[float]]:
+    """附件4 的 D7（工作量总和）与 B7（功能点个数）"""
+    wb = lazy_import("openpyxl").load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        return _number(ws["D7"].value), _number(ws["B7"].value)
+    finally:
+        wb.close()
+
+
+def package_version(attachments: Dict[int, str]) -> Optional[str]:
+    """附件2/3/4 中最新的修改时间，作为该需求包的版本"""
+    mtimes = [os.path.getmtime(attachments[number]) for number in (2, 3, 4) if number in attachments]
+    if not mtimes:
+        return None
+    return datetime.fromtimestamp(max(mtimes)).isoformat(timespec="microseconds")
+
+
+class PortfolioIndex:
+    """SQLite 中的跨需求包索引"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            sqlite3 = lazy_import("sqlite3")
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def has_run(self, requirement: str, run_at: str) -> bool:
+        with self._lock:
+            cursor = self._connection().execute(
+                "SELECT 1 FROM runs WHERE requirement = ? AND run_at = ?", (requirement, run_at))
+            return cursor.fetchone() is not None
+
+    def index_package(self, requirement: str, package_dir: str, attachments: Dict[int, str],
+                      force: bool = False) -> Optional[int]:
+        """
+        索引一个附件目录，attachments 为 {附件编号: 路径}。返回写入的 WBS + COSMIC 行数；
+        该版本已索引过（且 force 为 False）或没有附件2/3/4 时返回 None。
+        """
+        run_at = package_version(attachments)
+        if run_at is None or not force and self.has_run(requirement, run_at):
+            return None
+        wbs_rows = read_wbs_rows(attachments[2]) if 2 in attachments else []
+        cosmic_rows = read_cosmic_rows(attachments[3]) if 3 in attachments else []
+        total_workload, function_points = read_attachment4_totals(attachments[4]) if 4 in attachments else (None, None)
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO runs (requirement, run_at, package_dir, indexed_at, total_workload, function_points) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (requirement, run_at) DO UPDATE SET "
+                    "package_dir = excluded.package_dir, indexed_at = excluded.indexed_at, "
+                    "total_workload = excluded.total_workload, function_points = excluded.function_points",
+                    (requirement, run_at, os.path.abspath(package_dir), datetime.now().isoformat(timespec="seconds"),
+                     total_workload, function_points))
+                run_id = conn.execute("SELECT id FROM runs WHERE requirement = ? AND run_at = ?",
+                                      (requirement, run_at)).fetchone()[0]
+                conn.execute("DELETE FROM wbs_rows WHERE run_id = ?", (run_id,))
+                conn.execute("DELETE FROM cosmic_rows WHERE run_id = ?", (run_id,))
+                conn.executemany("INSERT INTO wbs_rows VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 [(run_id,) + row for row in wbs_rows])
+                conn.executemany("INSERT INTO cosmic_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(run_id,) + row for row in cosmic_rows])
+        return len(wbs_rows) + len(cosmic_rows)
+
+    def workload_by_module(self, since: date, until: date) -> List[Tuple[str, int, float]]:
+        """[since, until] 内各需求最新版本的 WBS 工作量按一级模块汇总：[(一级模块, 需求数, 工作量)]"""
+        with self._lock:
+            cursor = self._connection().execute(
+                "SELECT COALESCE(w.level1, '(未填)'), COUNT(DISTINCT r.requirement), SUM(w.workload) "
+                "FROM wbs_rows AS w JOIN latest_runs AS r ON w.run_id = r.id "
+                "WHERE r.run_at >= ? AND r.run_at < ? GROUP BY 1 ORDER BY 3 DESC",
+                (since.isoformat(), (until + timedelta(days=1)).isoformat()))
+            return [(level1, count, total or 0.0) for level1, count, total in cursor]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def print_workload_by_module(index: PortfolioIndex, since: date, until: date) -> None:
+    rows = index.workload_by_module(since, until)
+    print(f"📈 各一级模块工作量 {since.isoformat()} ~ {until.isoformat()}（{index.path}）")
+    if not rows:
+        print("   该时间段内没有已索引的需求")
+        return
+    for level1, count, total in rows:
+        print(f"   {level1}：{total:g} 人天（{count} 个需求）")
@@ -0,0 +1,107 @@
+"""
+后台预热：main() 一开始就在后台线程中准备后续步骤要用的结果（手册摘要、功能点码值、到接口主机的连接），
+与输入需求名、执行第 1-8 步并行；后续步骤通过 wait()/take() 等待结果，不再承担这部分延迟。
+
+预热任务的输出先缓存在各自的缓冲区中，被等待时再按顺序打印，不会与交互输入交错。
+"""
+import io
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+_local = threading.local()
+
+# take() 在没有对应预热任务时的返回值
+MISSING = object()
+
+
+class _ThreadAwareStdout:
+    """预热线程的输出写入各自的缓冲区，其他线程照常输出到原 stdout"""
+
+    def __init__(self, target) -> None:
+        self._target = target
+
+    def write(self, text: str) -> int:
+        buffer = getattr(_local, "buffer", None)
+        return (buffer if buffer is not None else self._target).write(text)
+
+    def flush(self) -> None:
+        if getattr(_local, "buffer", None) is None:
+            self._target.flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._target, name)
+
+
+class Prewarmer:
+    def __init__(self, max_workers: int = 3) -> None:
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_workers = max_workers
+        self._futures: Dict[str, Future] = {}
+        self._logs: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stdout = None
+
+    def start(self, name: str, fn: Callable[[], Any]) -> None:
+        """在后台启动名为 name 的预热任务"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="prewarm")
+                self._stdout = sys.stdout
+                sys.stdout = _ThreadAwareStdout(sys.stdout)
+            self._futures[name] = self._executor.submit(self._run, name, fn)
+
+    def _run(self, name: str, fn: Callable[[], Any]) -> Any:
+        _local.buffer = io.StringIO()
+        _local.in_prewarm = True
+        try:
+            return fn()
+        finally:
+            self._logs[name] = _local.buffer.getvalue()
+            _local.buffer = None
+
+    def wait(self, name: str) -> Any:
+        """等待预热任务完成并打印它的输出；没有该任务或在预热线程内调用时返回 MISSING"""
+        if getattr(_local, "in_prewarm", False):
+            return MISSING
+        with self._lock:
+            future = self._futures.get(name)
+        if future is None:
+            return MISSING
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"⚠️  预热任务 {name} 失败：{e}")
+            result = MISSING
+        log = self._logs.pop(name, "")
+        if log:
+            print(f"[预热 {name}]\n{log.rstrip()}")
+        return result
+
+    def take(self, name: str) -> Any:
+        """等待并取走预热结果，之后同名调用返回 MISSING（重新读取最新内容）"""
+        result = self.wait(name)
+        if not getattr(_local, "in_prewarm", False):
+            with self._lock:
+                self._futures.pop(name, None)
+        return result
+
+    def shutdown(self) -> None:
+        """等待全部预热任务结束并恢复 stdout"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            names = list(self._futures)
+        if executor is None:
+            return
+        executor.shutdown(wait=True)
+        for name in names:
+            self.wait(name)
+        with self._lock:
+            self._futures.clear()
+            if self._stdout is not None:
+                sys.stdout = self._stdout
+                self._stdout = None
+
+
+PREWARMER = Prewarmer()
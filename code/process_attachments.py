@@ -1,18 +1,63 @@
+import time
+
+_MODULE_IMPORT_START = time.perf_counter()
+
+import argparse
+import io
+import math
 import os
 import re
-from datetime import datetime
-from typing import Optional, Tuple, List
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, Callable, Dict, Optional, Set, Tuple, List
 import json
-
-from openpyxl import load_workbook
-import requests
+import zipfile
+import xml.etree.ElementTree as ET
+
+# openpyxl、python-docx、xlrd、requests 均在步骤真正需要时才导入（见 lazy_import）
+from attachment5 import Attachment5Columns, read_xls_columns, read_xlsx_columns
+from backfill import BACKFILL_FILE, BackfillRegistry
+from dry_run import DryRunStore
+from llm_client import HedgeBudget, LLMClient, is_timeout_error
+from memory_profile import MemoryProfiler
+from near_duplicates import cluster_near_duplicates
+from portfolio_index import PortfolioIndex, print_workload_by_module
+from prewarm import MISSING, PREWARMER
+from row_state import CHECKPOINT_FILE, RowState, Step12Checkpoint, pop_legacy_state_sheet, row_fingerprint
+from save_service import SAVE_SERVICE
+from startup_profile import lazy_import, print_startup_report, process_uptime
+from telemetry import TelemetryStore, print_report, step_scope
+from template_store import TEMPLATE_DIR, TemplateStore, clone_into
+from zip_patch import rewrite_zip
 
 try:
     from config import DATA_DIR, DEEPSEEK_API_KEY, DEEPSEEK_API_URL
+    CONFIG_LOADED = True
 except ImportError:
-    print("错误：未找到配置文件 config.py")
-    print("请复制 config_template.py 为 config.py 并填入正确的配置信息")
-    exit(1)
+    # 没有 config.py 时仍可执行不调用大模型的步骤（如第四步 L 列求和）
+    DATA_DIR = "../data_file"
+    DEEPSEEK_API_KEY = ""
+    DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+    CONFIG_LOADED = False
+
+
+# 所有大模型调用共用的客户端（连接池；常驻服务模式下开启响应缓存）
+LLM_CLIENT = LLMClient(DEEPSEEK_API_URL, DEEPSEEK_API_KEY)
+
+# 程序目录下的资源与输出文件（基准测试等场景可改指到临时目录）
+PROGRAM_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOGUE_FILE = os.path.join(PROGRAM_DIR, "一二三级功能点.xlsx")
+MANUAL_FILE = os.path.join(PROGRAM_DIR, "沙盘操作手册.md")
+MANUAL_SUMMARY_CACHE = os.path.join(PROGRAM_DIR, "manual_summary_cache.txt")
+PROJECT_DOCS_OUTPUT = os.path.join(PROGRAM_DIR, "项目文档更新内容.txt")
+
+# 大模型调用遥测库（按步骤记录耗时与 token 用量，report 子命令汇总）
+TELEMETRY_DB = os.path.join(PROGRAM_DIR, "llm_telemetry.db")
+
+# 跨需求包的功能点与工作量索引库（每次运行成功后更新，index 子命令批量补建）
+PORTFOLIO_DB = os.path.join(PROGRAM_DIR, "portfolio_index.db")
 
 
 def print_step(title: str) -> None:
@@ -22,6 +67,172 @@ def print_step(title: str) -> None:
 # 已删除 move_paragraph_after_index 函数，使用更简单的直接插入方法
 
 
+# 试运行模式下的内存存储；为 None 时直接读写磁盘
+DRY_RUN_STORE: Optional[DryRunStore] = None
+
+# 逐步骤内存统计；为 None 时不统计
+MEMORY_PROFILER: Optional[MemoryProfiler] = None
+
+# 大模型不可用时降级的内容，run_steps 开始时从附件目录载入，结束时列出并写回
+BACKFILL = BackfillRegistry()
+
+# 附件模板库，run_steps 开始时从附件目录下的 .templates 载入
+TEMPLATES: Optional[TemplateStore] = None
+
+# 跨需求包索引；为 None 时运行结束后不更新索引
+PORTFOLIO_INDEX: Optional[PortfolioIndex] = None
+
+
+def _track_load(kind: str, path: str):
+    """开启内存统计时记录加载前后的 RSS"""
+    return MEMORY_PROFILER.loader(kind, path) if MEMORY_PROFILER is not None else nullcontext()
+
+
+def run_step(label: str, fn, *args):
+    """执行一个步骤；期间的大模型调用记到该步骤名下，开启内存统计时记录该步骤的峰值/净分配"""
+    with step_scope(label):
+        if MEMORY_PROFILER is None:
+            return fn(*args)
+        with MEMORY_PROFILER.step(label):
+            return fn(*args)
+
+
+def open_workbook(path: str, **kwargs):
+    """加载工作簿；先等待该文件在后台的保存完成，保证读到最新内容"""
+    load_workbook = lazy_import("openpyxl").load_workbook
+    with _track_load("load_workbook", path):
+        if DRY_RUN_STORE is not None:
+            return load_workbook(DRY_RUN_STORE.open(path), **kwargs)
+        SAVE_SERVICE.wait_for(path)
+        return load_workbook(path, **kwargs)
+
+
+def save_workbook(wb, path: str) -> Optional[Future]:
+    """将工作簿交给后台保存服务，原子写入（临时文件 + fsync + 重命名）；试运行时返回 None"""
+    if DRY_RUN_STORE is not None:
+        DRY_RUN_STORE.write(path, wb.save)
+        return None
+    return SAVE_SERVICE.submit(path, wb.save)
+
+
+def wait_saved(future: Optional[Future]) -> bool:
+    """
+    等待一次后台保存完成，成功（或试运行）时返回 True。
+    失败信息仍由保存服务在运行结束时统一输出，调用方只需不再报告成功。
+    """
+    if future is None:
+        return True
+    try:
+        future.result()
+    except Exception:
+        return False
+    return True
+
+
+def write_cells(path: str, cells: Dict[str, object], sheet_index: Optional[int] = None) -> str:
+    """
+    写入少量单元格并保存，返回工作表名；sheet_index 为 None 或超出范围时写活动工作表。
+    直接改写 xlsx 中目标工作表的 XML，其余内容原样保留；无法直接改写时回退到 openpyxl。
+    """
+    xlsx_patch = lazy_import("xlsx_patch")
+    try:
+        if DRY_RUN_STORE is not None:
+            source = DRY_RUN_STORE.read_bytes(path)
+        else:
+            SAVE_SERVICE.wait_for(path)
+            with open(path, "rb") as f:
+                source = f.read()
+        data, title = xlsx_patch.patch_xlsx_cells(source, cells, sheet_index)
+    except (xlsx_patch.XlsxPatchUnsupported, zipfile.BadZipFile, KeyError, ValueError, ET.ParseError) as e:
+        print(f"💡 无法直接改写单元格（{e}），改用 openpyxl 保存")
+        wb = open_workbook(path)
+        ws = wb[wb.sheetnames[sheet_index]] if sheet_index is not None and sheet_index < len(wb.sheetnames) else wb.active
+        for ref, value in cells.items():
+            ws[ref] = value
+        save_workbook(wb, path)
+        return ws.title
+
+    writer = lambda f: f.write(data)
+    if DRY_RUN_STORE is not None:
+        DRY_RUN_STORE.write(path, writer)
+    else:
+        SAVE_SERVICE.submit(path, writer)
+    return title
+
+
+# 本次运行中已打开的Word文档（绝对路径 -> (Document, 打开时的原始字节)）。
+# 初始化附件1与更新附件1共用同一个 Document，只加载一次；run_steps 开始和结束时清空
+_DOCUMENT_SESSIONS: Dict[str, Tuple[object, bytes]] = {}
+
+
+def clear_document_sessions() -> None:
+    _DOCUMENT_SESSIONS.clear()
+
+
+def _rename_document_session(src: str, dst: str) -> None:
+    session = _DOCUMENT_SESSIONS.pop(os.path.abspath(src), None)
+    if session is not None:
+        _DOCUMENT_SESSIONS[os.path.abspath(dst)] = session
+
+
+def open_document(path: str):
+    """加载Word文档（本次运行已打开过则直接复用）；先等待该文件在后台的保存完成"""
+    session = _DOCUMENT_SESSIONS.get(os.path.abspath(path))
+    if session is not None:
+        return session[0]
+
+    Document = lazy_import("docx").Document
+
+    with _track_load("Document", path):
+        if DRY_RUN_STORE is not None:
+            source = DRY_RUN_STORE.read_bytes(path)
+        else:
+            SAVE_SERVICE.wait_for(path)
+            with open(path, "rb") as f:
+                source = f.read()
+        doc = Document(io.BytesIO(source))
+    _DOCUMENT_SESSIONS[os.path.abspath(path)] = (doc, source)
+    return doc
+
+
+def _only_main_part_changed(doc, source: bytes) -> bool:
+    """没有新增部件、正文的关系（图片、超链接等）也没有增加时，其余部件可以原样复制"""
+    rels_name = doc.part.partname.rels_uri.lstrip("/")
+    with zipfile.ZipFile(io.BytesIO(source)) as zf:
+        names = set(zf.namelist())
+        if rels_name not in names:
+            return False
+        source_rels = len(ET.fromstring(zf.read(rels_name)))
+    parts = {part.partname.lstrip("/") for part in doc.part.package.iter_parts()}
+    return parts <= names and len(doc.part.rels) == source_rels
+
+
+def _document_writer(doc, path: str) -> Callable[[BinaryIO], None]:
+    """
+    在调用线程中完成序列化，之后的步骤可以继续修改同一个 Document。
+    通常只重写 word/document.xml，图片、样式、页眉等部件直接复制原始压缩字节。
+    """
+    session = _DOCUMENT_SESSIONS.get(os.path.abspath(path))
+    if session is not None and session[0] is doc and _only_main_part_changed(doc, session[1]):
+        source = session[1]
+        replacements = {doc.part.partname.lstrip("/"): doc.part.blob}
+        return lambda f: rewrite_zip(io.BytesIO(source), f, replacements)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    data = buffer.getvalue()
+    return lambda f: f.write(data)
+
+
+def save_document(doc, path: str) -> Optional[Future]:
+    """将Word文档交给后台保存服务，原子写入；试运行时返回 None"""
+    writer = _document_writer(doc, path)
+    if DRY_RUN_STORE is not None:
+        DRY_RUN_STORE.write(path, writer)
+        return None
+    return SAVE_SERVICE.submit(path, writer)
+
+
 def parse_attachment_filename(filename: str) -> Optional[Tuple[str, str, str, str]]:
     """
     Parse filenames like: 附件x-需求名@属性.扩展名
@@ -48,6 +259,10 @@ def batch_rename(requirement_name: str) -> None:
         print(f"目录不存在：{DATA_DIR}")
         return
 
+    # 重命名前等待所有后台保存完成，避免写入旧路径；预加载功能点码值时正在读取附件3，也要等它结束
+    SAVE_SERVICE.flush_and_report()
+    PREWARMER.wait("function_codes")
+
     files = os.listdir(DATA_DIR)
     rename_count = 0
     for fname in files:
@@ -59,15 +274,83 @@ def batch_rename(requirement_name: str) -> None:
         if new_name == fname:
             print(f"跳过（已是目标名）：{fname}")
             continue
+        if DRY_RUN_STORE is not None:
+            print(f"试运行（未执行）重命名：{fname} -> {new_name}")
+            continue
         src = os.path.join(DATA_DIR, fname)
         dst = os.path.join(DATA_DIR, new_name)
         os.rename(src, dst)
+        _rename_document_session(src, dst)
         rename_count += 1
         print(f"重命名：{fname} -> {new_name}")
 
     print(f"重命名完成，共处理 {rename_count} 个文件。")
 
 
+def package_attachments(directory: str) -> Tuple[Optional[str], Dict[int, str]]:
+    """目录中的附件：(需求名, {附件编号: 路径})；需求名优先取附件4 的文件名"""
+    requirement = None
+    attachments: Dict[int, str] = {}
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return None, {}
+    for fname in names:
+        parsed = parse_attachment_filename(fname)
+        if not parsed:
+            continue
+        prefix, req_name, _attr, _ext = parsed
+        number = int(prefix[len("附件"):])
+        attachments.setdefault(number, os.path.join(directory, fname))
+        if requirement is None or number == 4:
+            requirement = req_name
+    return requirement, attachments
+
+
+def index_package(index: PortfolioIndex, directory: str, force: bool = False) -> Optional[int]:
+    """把一个附件目录写入跨需求包索引；返回写入行数，未变化或不是需求包时返回 None"""
+    requirement, attachments = package_attachments(directory)
+    if requirement is None or not {2, 3, 4} & set(attachments):
+        return None
+    return index.index_package(requirement, directory, attachments, force)
+
+
+def update_portfolio_index() -> None:
+    """运行成功后更新当前附件目录的索引；失败只提示"""
+    try:
+        count = index_package(PORTFOLIO_INDEX, DATA_DIR)
+    except Exception as e:
+        print(f"⚠️  更新跨需求包索引失败：{e}")
+        return
+    if count is not None:
+        print(f"📈 已更新跨需求包索引：{count} 行（{PORTFOLIO_INDEX.path}）")
+
+
+def index_directories(index: PortfolioIndex, roots: List[str], force: bool = False) -> None:
+    """index 子命令：递归查找 roots 下的附件目录并逐个索引"""
+    indexed = unchanged = failed = 0
+    started = time.perf_counter()
+    for root in roots:
+        for directory, dirnames, _filenames in os.walk(root):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+            requirement, attachments = package_attachments(directory)
+            if requirement is None or not {2, 3, 4} & set(attachments):
+                continue
+            try:
+                count = index.index_package(requirement, directory, attachments, force)
+            except Exception as e:
+                failed += 1
+                print(f"⚠️  索引失败：{directory} - {e}")
+                continue
+            if count is None:
+                unchanged += 1
+                continue
+            indexed += 1
+            print(f"✅ {directory}：{count} 行")
+    print(f"📈 索引完成：新增/更新 {indexed} 个需求包，未变化 {unchanged} 个，失败 {failed} 个，"
+          f"用时 {time.perf_counter() - started:.1f}s（{index.path}）")
+
+
 def find_attachment_by_number(number: int) -> Optional[str]:
     """Find file path for '附件{number}-...@....xlsx' in DATA_DIR."""
     if not os.path.isdir(DATA_DIR):
@@ -88,17 +371,8 @@ def write_attachment3_sheet2_cells(requirement_name: str) -> None:
     if not path:
         print("未找到附件3 文件。")
         return
-    wb = load_workbook(path)
-    sheet_name = None
     # Prefer explicit 'sheet2' by index (second worksheet)
-    if len(wb.sheetnames) >= 2:
-        sheet_name = wb.sheetnames[1]
-    else:
-        sheet_name = wb.active.title
-    ws = wb[sheet_name]
-    ws["A3"] = requirement_name
-    ws["B3"] = requirement_name
-    wb.save(path)
+    sheet_name = write_cells(path, {"A3": requirement_name, "B3": requirement_name}, sheet_index=1)
     print(f"已更新 {os.path.basename(path)} -> {sheet_name} 的 A3, B3 为：{requirement_name}")
 
 
@@ -108,13 +382,49 @@ def write_attachment4_cells(requirement_name: str) -> None:
     if not path:
         print("未找到附件4 文件。")
         return
-    wb = load_workbook(path)
-    ws = wb.active
-    ws["B2"] = requirement_name
-    wb.save(path)
+    write_cells(path, {"B2": requirement_name})
     print(f"已更新 {os.path.basename(path)} -> B2 为：{requirement_name}")
 
 
+# 附件5 列数据缓存：{(路径, 修改时间, 大小): 列数据}，第四步与第九步共用同一次加载
+_ATTACHMENT5_CACHE: Dict[Tuple[str, int, int], Attachment5Columns] = {}
+
+
+def load_attachment5_columns(path: str) -> Attachment5Columns:
+    """读取附件5 的 H/I/L 列（.xls 用 xlrd，.xlsx 用 openpyxl 只读模式），文件未变化时复用"""
+    cache_key = _file_cache_key(path)
+    if cache_key in _ATTACHMENT5_CACHE:
+        return _ATTACHMENT5_CACHE[cache_key]
+    if os.path.splitext(path)[1].lower() == ".xls":
+        columns = read_xls_columns(path)
+    else:
+        wb = open_workbook(path, read_only=True, data_only=True)
+        try:
+            columns = read_xlsx_columns(wb.active)
+        finally:
+            wb.close()
+    if cache_key is not None:
+        _ATTACHMENT5_CACHE[cache_key] = columns
+    return columns
+
+
+def print_attachment5_stats(columns: Attachment5Columns, top: int = 5) -> None:
+    stats = columns.describe()
+    if not stats["valid"]:
+        return
+    print(f"📈 有效 {stats['valid']} 行，空值/非数字 {stats['missing']} 行；"
+          f"均值 {stats['mean']:.2f}，p50 {stats['p50']:.2f}，p95 {stats['p95']:.2f}，最大 {stats['max']:.2f}")
+    groups = columns.group_by("H")
+    if groups:
+        print(f"   H列工作项 {len(groups)} 个，工作量最多的：" +
+              "；".join(f"{group.name[:20]} {group.total:g}（{group.count} 行）" for group in groups[:top]))
+    outliers = columns.outliers()
+    if outliers:
+        print(f"⚠️  {len(outliers)} 行工作量明显偏离（四分位距判断），请核对：" +
+              "；".join(f"L{row}={value:g}" for row, value, _name in outliers[:top]) +
+              ("……" if len(outliers) > top else ""))
+
+
 def sum_attachment5_col_L_from_L2() -> float:
     print_step("第四步：计算附件5 L列(L2开始)总和")
     path = find_attachment_by_number(5)
@@ -122,56 +432,20 @@ def sum_attachment5_col_L_from_L2() -> float:
         print("未找到附件5 文件。返回 0。")
         return 0.0
 
-    ext = os.path.splitext(path)[1].lower()
-
-    # Handle legacy .xls via xlrd
-    if ext == ".xls":
-        try:
-            import xlrd  # type: ignore
-        except Exception:
-            print("未安装 xlrd，无法读取 .xls 文件，请先安装 xlrd。返回 0。")
-            return 0.0
-        try:
-            wb = xlrd.open_workbook(path)
-            sheet = wb.sheet_by_index(0)
-            total: float = 0.0
-            col_index_for_L = 11  # 0-based index for column 'L'
-            for row_idx in range(1, sheet.nrows):  # start from row 2 -> index 1
-                value = sheet.cell_value(row_idx, col_index_for_L)
-                if value in (None, ""):
-                    continue
-                try:
-                    total += float(value)
-                except Exception:
-                    # skip non-numeric cells
-                    continue
-            print(f"L列合计：{total}")
-            return total
-        except Exception as e:
-            print(f"读取 .xls 失败：{e}")
-            return 0.0
-
-    # Default: .xlsx via openpyxl
     try:
-        wb = load_workbook(path, data_only=True)
-        ws = wb.active
-        total = 0.0
-        max_row = ws.max_row if ws.max_row and ws.max_row > 1 else 1
-        for row in range(2, max_row + 1):
-            cell = ws[f"L{row}"]
-            value = cell.value
-            if value is None or (isinstance(value, str) and value.strip() == ""):
-                continue
-            try:
-                total += float(value)
-            except Exception:
-                continue
-        print(f"L列合计：{total}")
-        return total
+        columns = load_attachment5_columns(path)
+    except ImportError:
+        print("未安装 xlrd，无法读取 .xls 文件，请先安装 xlrd。返回 0。")
+        return 0.0
     except Exception as e:
-        print(f"读取 .xlsx 失败：{e}")
+        print(f"读取附件5失败：{e}")
         return 0.0
 
+    total = columns.total()
+    print(f"L列合计：{total}")
+    print_attachment5_stats(columns)
+    return total
+
 
 def write_attachment4_with_sum(total: float) -> None:
     print_step("第五步：将总和写入附件4 D7")
@@ -179,10 +453,7 @@ def write_attachment4_with_sum(total: float) -> None:
     if not path:
         print("未找到附件4 文件。")
         return
-    wb = load_workbook(path)
-    ws = wb.active
-    ws["D7"] = total
-    wb.save(path)
+    write_cells(path, {"D7": total})
     print(f"已更新 {os.path.basename(path)} -> D7 为：{total}")
 
 
@@ -192,15 +463,9 @@ def write_attachment3_sheet2_F3_with_sum(total: float) -> None:
     if not path:
         print("未找到附件3 文件。")
         return
-    wb = load_workbook(path)
     # second sheet or active
-    if len(wb.sheetnames) >= 2:
-        ws = wb[wb.sheetnames[1]]
-    else:
-        ws = wb.active
-    ws["F3"] = total
-    wb.save(path)
-    print(f"已更新 {os.path.basename(path)} -> {ws.title} 的 F3 为：{total}")
+    sheet_name = write_cells(path, {"F3": total}, sheet_index=1)
+    print(f"已更新 {os.path.basename(path)} -> {sheet_name} 的 F3 为：{total}")
 
 
 def write_attachment4_C6_with_today() -> None:
@@ -212,10 +477,7 @@ def write_attachment4_C6_with_today() -> None:
     today = datetime.now()
     # Remove leading zeros in month/day
     date_str = f"{today.year}年{today.month}月{today.day}日"
-    wb = load_workbook(path)
-    ws = wb.active
-    ws["C6"] = date_str
-    wb.save(path)
+    write_cells(path, {"C6": date_str})
     print(f"已更新 {os.path.basename(path)} -> C6 为：{date_str}")
 
 
@@ -226,7 +488,7 @@ def calculate_attachment3_e3_formula() -> int:
     if not path3:
         return 0
     
-    wb3 = load_workbook(path3, data_only=True)
+    wb3 = open_workbook(path3, data_only=True)
     
     # 找到COSMIC功能点拆分表工作表
     cosmic_sheet = None
@@ -262,7 +524,7 @@ def write_attachment4_B7_from_attachment3_E3() -> None:
         return
     
     # 首先尝试直接读取E3的值
-    wb3 = load_workbook(path3, data_only=True)
+    wb3 = open_workbook(path3, data_only=True)
     if len(wb3.sheetnames) >= 2:
         ws3 = wb3[wb3.sheetnames[1]]
     else:
@@ -275,10 +537,7 @@ def write_attachment4_B7_from_attachment3_E3() -> None:
         e3_value = calculate_attachment3_e3_formula()
         print(f"计算得到E3公式结果: {e3_value}")
 
-    wb4 = load_workbook(path4)
-    ws4 = wb4.active
-    ws4["B7"] = e3_value
-    wb4.save(path4)
+    write_cells(path4, {"B7": e3_value})
     print(f"已更新 {os.path.basename(path4)} -> B7 为：{e3_value}")
 
 
@@ -287,45 +546,20 @@ def extract_attachment5_h_i_content() -> Tuple[List[str], List[str]]:
     path = find_attachment_by_number(5)
     if not path:
         return [], []
-    
+
     try:
-        import xlrd
-    except Exception:
+        columns = load_attachment5_columns(path)
+    except ImportError:
         print("未安装 xlrd，无法读取 .xls 文件")
         return [], []
-    
-    try:
-        wb = xlrd.open_workbook(path)
-        sheet = wb.sheet_by_index(0)
-        
-        h_contents = []
-        i_contents = []
-        h_col_index = 7  # H列索引
-        i_col_index = 8  # I列索引
-        
-        # 从第2行开始读取（跳过标题行）
-        for row_idx in range(1, sheet.nrows):
-            h_value = sheet.cell_value(row_idx, h_col_index) if h_col_index < sheet.ncols else ''
-            i_value = sheet.cell_value(row_idx, i_col_index) if i_col_index < sheet.ncols else ''
-            
-            if h_value and str(h_value).strip():
-                h_contents.append(str(h_value).strip())
-            if i_value and str(i_value).strip():
-                i_contents.append(str(i_value).strip())
-        
-        return h_contents, i_contents
     except Exception as e:
         print(f"读取附件5失败：{e}")
         return [], []
+    return columns.labels("H"), columns.labels("I")
 
 
 def call_deepseek_api(content: str) -> str:
     """调用DeepSeek API生成内容概述"""
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-    }
-    
     prompt = f"""基于以下工作项内容，请生成一个精简的需求内容概述。要求：
 1. 以"内容概述："开头
 2. 总结的内容为有序列表
@@ -338,38 +572,11 @@ def call_deepseek_api(content: str) -> str:
 
 请生成概述："""
 
-    data = {
-        "model": "deepseek-chat",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "max_tokens": 1000,
-        "temperature": 0.7
-    }
-    
     try:
         print(f"正在调用DeepSeek API生成概述...")
-        
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=30)
-        
-        if response.status_code != 200:
-            error_msg = f"API调用失败，状态码: {response.status_code}"
-            print(error_msg)
-            raise Exception(error_msg)
-        
-        result = response.json()
-        
-        if 'choices' in result and len(result['choices']) > 0:
-            api_summary = result['choices'][0]['message']['content'].strip()
-            print("✅ API调用成功，已生成概述")
-            return api_summary
-        else:
-            error_msg = "API响应格式错误"
-            print(error_msg)
-            raise Exception(error_msg)
+        api_summary = LLM_CLIENT.chat(prompt, temperature=0.7, max_tokens=1000, timeout=30)
+        print("✅ API调用成功，已生成概述")
+        return api_summary
             
     except Exception as e:
         error_msg = f"调用DeepSeek API失败：{e}"
@@ -377,6 +584,80 @@ def call_deepseek_api(content: str) -> str:
         raise Exception(error_msg)
 
 
+# 工作项超过该估算 token 数时分块：各块并行提炼要点（map），要点合并后再生成概述（reduce）
+SUMMARY_CHUNK_TOKENS = 4000
+SUMMARY_MAP_WORKERS = 8
+SUMMARY_CHUNK_MAX_ITEMS = 15
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文等全角字符按 1 个，其余字符 4 个算 1 个"""
+    wide = sum(1 for char in text if ord(char) > 0x2E7F)
+    return wide + (len(text) - wide + 3) // 4
+
+
+def chunk_lines(lines: List[str], budget: int) -> List[List[str]]:
+    """按顺序把 lines 分成估算 token 数不超过 budget 的若干块；单行超出时独占一块"""
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _numbered(lines: List[str]) -> str:
+    return "\n".join(f"{i}. {line}" for i, line in enumerate(lines, 1))
+
+
+def summarize_chunk(lines: List[str], index: int, total: int) -> List[str]:
+    """map：提炼一块工作项的主要功能点，返回要点列表"""
+    prompt = f"""以下是全部工作项中的第{index}/{total}批，请提炼其中的主要功能点。要求：
+1. 输出有序列表，每行以"序号. "开头，不要其他说明
+2. 合并相似的功能点，保留关键的业务对象和操作
+3. 不超过{SUMMARY_CHUNK_MAX_ITEMS}项
+
+工作项内容：
+{_numbered(lines)}"""
+    response = LLM_CLIENT.chat(prompt, temperature=0.3, max_tokens=800, timeout=30)
+    items = parse_requirement_items(response)
+    # 未按编号格式返回时退回按行拆分
+    return items or [line.strip(" -*•\t") for line in response.splitlines() if line.strip(" -*•\t")]
+
+
+def summarize_work_items(lines: List[str]) -> str:
+    """
+    生成需求概述。工作项在 SUMMARY_CHUNK_TOKENS 以内时一次调用；否则分块并行提炼要点，
+    要点仍超出时继续分块，直到能放进一次 reduce 调用（call_deepseek_api，输出格式不变）。
+    """
+    chunks = chunk_lines(lines, SUMMARY_CHUNK_TOKENS)
+    round_number = 1
+    while len(chunks) > 1:
+        print(f"📄 工作项较多（约 {sum(estimate_tokens(line) for line in lines)} tokens），"
+              f"第{round_number}轮分 {len(chunks)} 块并行提炼要点...")
+        started = time.perf_counter()
+        futures = []
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_MAP_WORKERS, len(chunks)),
+                                thread_name_prefix="summary") as executor:
+            for i, chunk in enumerate(chunks, 1):
+                futures.append(executor.submit(summarize_chunk, chunk, i, len(chunks)))
+        lines = [item for future in futures for item in future.result()]
+        print(f"✅ 第{round_number}轮提炼出 {len(lines)} 条要点，用时 {time.perf_counter() - started:.1f}s")
+        merged = chunk_lines(lines, SUMMARY_CHUNK_TOKENS)
+        if len(merged) >= len(chunks):
+            raise Exception("分块提炼的要点没有减少，无法合并为一次概述")
+        chunks = merged
+        round_number += 1
+    return call_deepseek_api(_numbered(chunks[0]) if chunks else "")
+
+
 def summarize_requirement_content_and_update_h4() -> None:
     print_step("第九步：基于附件5 H和I列内容生成需求概述并更新附件4 A4")
     
@@ -390,18 +671,19 @@ def summarize_requirement_content_and_update_h4() -> None:
         
         print(f"提取到H列内容 {len(h_contents)} 项，I列内容 {len(i_contents)} 项")
         
-        # 合并H和I列内容（去重）
-        all_contents = []
-        all_contents.extend(h_contents)
-        for content in i_contents:
-            if content not in all_contents:
-                all_contents.append(content)
+        # 合并H和I列内容，近似重复（只差编号、标点或个别字词）的条目只保留一条并注明条数
+        clusters = cluster_near_duplicates(h_contents + i_contents)
+        print(f"🧹 {len(h_contents) + len(i_contents)} 条工作项合并近似重复后剩 {len(clusters)} 条")
         
-        # 将内容合并为一个字符串
-        content_text = "\n".join([f"{i+1}. {content}" for i, content in enumerate(all_contents)])
+        lines = [content + (f"（{count}条相似）" if count > 1 else "") for content, count in clusters]
         
         print("正在调用DeepSeek API生成需求概述...")
-        summary = call_deepseek_api(content_text)
+        BACKFILL.resolve(9)
+        try:
+            summary = summarize_work_items(lines)
+        except Exception as e:
+            BACKFILL.mark(9, "附件4 A4 需求概述未生成", str(e))
+            raise
         
         print(f"生成的概述：\n{summary}")
         
@@ -411,10 +693,10 @@ def summarize_requirement_content_and_update_h4() -> None:
             print("未找到附件4文件")
             return
         
-        wb4 = load_workbook(path4)
+        wb4 = open_workbook(path4)
         ws4 = wb4.active
         ws4["A4"] = summary
-        wb4.save(path4)
+        save_workbook(wb4, path4)
         
         print(f"已更新 {os.path.basename(path4)} -> A4 为概述内容")
         
@@ -424,14 +706,41 @@ def summarize_requirement_content_and_update_h4() -> None:
         raise
 
 
+# 功能点码值索引缓存：{(路径, 修改时间, 大小): 码值列表}，文件未变化时直接复用
+_FUNCTION_CODES_CACHE: Dict[Tuple[str, int, int], List[Tuple[str, str, str]]] = {}
+
+
+def _file_cache_key(path: str) -> Optional[Tuple[str, int, int]]:
+    """试运行时磁盘内容与内存副本可能不同，不使用缓存"""
+    if DRY_RUN_STORE is not None:
+        return None
+    try:
+        SAVE_SERVICE.wait_for(path)
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
 def load_function_codes() -> List[Tuple[str, str, str]]:
     """从附件3的COSMIC功能点拆分表中加载一二三级功能点码值"""
     
+    # 本次运行已在后台预加载（见 start_prewarm）
+    prewarmed = PREWARMER.take("function_codes")
+    if prewarmed is not MISSING:
+        print(f"✅ 使用后台预加载的功能点码值：{len(prewarmed)} 个")
+        return prewarmed
+
     # 首先尝试从附件3的sheet4加载
     path3 = find_attachment_by_number(3)
     if path3:
+        cache_key = _file_cache_key(path3)
+        if cache_key in _FUNCTION_CODES_CACHE:
+            codes = _FUNCTION_CODES_CACHE[cache_key]
+            print(f"✅ 使用缓存的功能点码值：{len(codes)} 个")
+            return codes
         try:
-            wb3 = load_workbook(path3, data_only=True)
+            wb3 = open_workbook(path3, data_only=True)
             
             # 查找COSMIC功能点拆分表工作表
             sheet_name = "COSMIC功能点拆分表"
@@ -460,6 +769,8 @@ def load_function_codes() -> List[Tuple[str, str, str]]:
                 
                 if codes:
                     print(f"✅ 从附件3加载了 {len(codes)} 个功能点码值")
+                    if cache_key is not None:
+                        _FUNCTION_CODES_CACHE[cache_key] = codes
                     return codes
                 else:
                     print("⚠️  附件3的COSMIC功能点拆分表中未找到有效数据")
@@ -471,13 +782,24 @@ def load_function_codes() -> List[Tuple[str, str, str]]:
     
     # 备用方案：从独立的一二三级功能点.xlsx文件加载
     print("🔄 尝试从备用文件加载功能点码值...")
-    codes_path = os.path.join(os.path.dirname(__file__), "一二三级功能点.xlsx")
+    return load_catalogue_function_codes()
+
+
+def load_catalogue_function_codes() -> List[Tuple[str, str, str]]:
+    """从独立的一二三级功能点.xlsx文件加载功能点码值"""
+    codes_path = CATALOGUE_FILE
     if not os.path.exists(codes_path):
         print(f"❌ 未找到备用功能点码值文件：{codes_path}")
         return []
+
+    cache_key = _file_cache_key(codes_path)
+    if cache_key in _FUNCTION_CODES_CACHE:
+        codes = _FUNCTION_CODES_CACHE[cache_key]
+        print(f"📁 使用缓存的备用功能点码值：{len(codes)} 个")
+        return codes
     
     try:
-        wb = load_workbook(codes_path, data_only=True)
+        wb = open_workbook(codes_path, data_only=True)
         ws = wb.active
         
         codes = []
@@ -499,6 +821,8 @@ def load_function_codes() -> List[Tuple[str, str, str]]:
                 codes.append((current_level1, current_level2, str(level3).strip()))
         
         print(f"📁 从备用文件加载了 {len(codes)} 个功能点码值")
+        if cache_key is not None:
+            _FUNCTION_CODES_CACHE[cache_key] = codes
         return codes
         
     except Exception as e:
@@ -506,9 +830,11 @@ def load_function_codes() -> List[Tuple[str, str, str]]:
         return []
 
 
-def parse_ai_function_matches(ai_response: str, function_codes: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str, str, float]]:
-    """解析AI返回的功能点匹配结果"""
+def parse_ai_function_matches(ai_response: str, function_codes: List[Tuple[str, str, str]],
+                              dropped: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str, str, str, float]]:
+    """解析AI返回的功能点匹配结果；dropped 不为 None 时记录被丢弃的行及原因"""
     matches = []
+    valid_codes = set(function_codes)
     lines = ai_response.split('\n')
     
     for line in lines:
@@ -525,10 +851,17 @@ def parse_ai_function_matches(ai_response: str, function_codes: List[Tuple[str,
                     workload = float(parts[5].strip())
                     
                     # 验证功能点是否在码值中存在
-                    if (level1, level2, level3) in function_codes:
+                    if (level1, level2, level3) in valid_codes:
                         matches.append((level1, level2, level3, description, workload))
+                    elif dropped is not None:
+                        dropped.append((line, "功能点不在码值中"))
+                elif dropped is not None:
+                    dropped.append((line, "字段数不足"))
             except Exception as e:
-                print(f"解析行失败：{line} - {e}")
+                if dropped is not None:
+                    dropped.append((line, f"工作量无法解析：{e}"))
+                else:
+                    print(f"解析行失败：{line} - {e}")
                 continue
     
     return matches
@@ -583,141 +916,392 @@ def match_functions_with_ai(requirement_items: List[str], function_codes: List[T
 2|客户管控|客户视角|客户查询|调整过程表记录规则，仅保留创建、提交工单和审批环节|7.0
 3|...|...|...|...|...|..."""
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-    }
-    
-    data = {
-        "model": "deepseek-chat",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "max_tokens": 1500,
-        "temperature": 0.7
-    }
-    
     try:
         print("正在调用DeepSeek API进行功能点匹配...")
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=30)
-        
-        if response.status_code != 200:
-            error_msg = f"API调用失败，状态码: {response.status_code}"
-            print(error_msg)
-            raise Exception(error_msg)
-        
-        result = response.json()
-        
-        if 'choices' in result and len(result['choices']) > 0:
-            api_response = result['choices'][0]['message']['content'].strip()
-            print("✅ AI匹配成功")
-            return parse_ai_function_matches(api_response, function_codes)
-        else:
-            error_msg = "API响应格式错误"
-            print(error_msg)
-            raise Exception(error_msg)
-            
+        api_response = LLM_CLIENT.chat(prompt, temperature=0.7, max_tokens=1500, timeout=30)
+        print("✅ AI匹配成功")
     except Exception as e:
         error_msg = f"调用AI匹配失败：{e}"
         print(error_msg)
         raise Exception(error_msg)
 
+    dropped: List[Tuple[str, str]] = []
+    matches = parse_ai_function_matches(api_response, function_codes, dropped)
+    for line, reason in dropped:
+        print(f"⚠️  丢弃匹配行（{reason}）：{line}")
+    return matches + reask_unmatched_items(requirement_items, matches, function_codes, total_workload)
+
+
+# 补充匹配：每轮为每个未匹配功能点提供的候选码值数量、最多补问轮数
+WBS_REASK_CANDIDATES = 20
+WBS_REASK_MAX_RETRIES = 2
+
+
+def _normalize_item_text(text: str) -> str:
+    return re.sub(r"[\s，。；;,.、]+", "", str(text))
+
+
+def find_unmatched_items(requirement_items: List[str], matches: List[Tuple[str, str, str, str, float]]) -> List[str]:
+    """没有任何有效匹配的需求功能点（匹配描述与原文互相包含即视为已覆盖）"""
+    descriptions = [_normalize_item_text(match[3]) for match in matches]
+    descriptions = [d for d in descriptions if d]
+    unmatched = []
+    for item in requirement_items:
+        normalized = _normalize_item_text(item)
+        if not any(normalized in d or d in normalized for d in descriptions):
+            unmatched.append(item)
+    return unmatched
+
+
+def shortlist_function_codes(items: List[str], function_codes: List[Tuple[str, str, str]],
+                             per_item: int = WBS_REASK_CANDIDATES) -> List[Tuple[str, str, str]]:
+    """按字符二元组重合度为每个功能点挑选候选码值，返回并集（保持码值原有顺序）"""
+    if len(function_codes) <= per_item:
+        return list(function_codes)
+
+    def bigrams(text: str) -> set:
+        text = _normalize_item_text(text)
+        return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+    code_grams = [bigrams("".join(code)) for code in function_codes]
+    chosen = set()
+    for item in items:
+        item_grams = bigrams(item)
+        scores = sorted(range(len(function_codes)), key=lambda i: -len(item_grams & code_grams[i]))
+        chosen.update(scores[:per_item])
+    return [code for i, code in enumerate(function_codes) if i in chosen]
+
+
+def reask_unmatched_items(requirement_items: List[str], matches: List[Tuple[str, str, str, str, float]],
+                          function_codes: List[Tuple[str, str, str]], total_workload: float) -> List[Tuple[str, str, str, str, float]]:
+    """只针对未获得有效匹配的功能点补充提问（限定候选码值、最多 WBS_REASK_MAX_RETRIES 轮），返回新增匹配"""
+    added: List[Tuple[str, str, str, str, float]] = []
+    unmatched = find_unmatched_items(requirement_items, matches)
+    per_item_workload = round(total_workload / len(requirement_items), 1) if requirement_items else 1.0
+    last_error: Optional[Exception] = None
+
+    for attempt in range(1, WBS_REASK_MAX_RETRIES + 1):
+        if not unmatched:
+            break
+        candidates = shortlist_function_codes(unmatched, function_codes)
+        print(f"🔁 {len(unmatched)} 个功能点未获得有效匹配，第 {attempt} 次补充匹配（候选码值 {len(candidates)} 个）")
+        codes_text = "\n".join([f"{i+1}. {l1} -> {l2} -> {l3}" for i, (l1, l2, l3) in enumerate(candidates)])
+        items_text = "\n".join([f"{i+1}. {item}" for i, item in enumerate(unmatched)])
+        prompt = f"""为以下每个具体需求功能点，从功能点码值中选择最恰当的一个功能点进行匹配。
+
+具体需求功能点：
+{items_text}
+
+可用功能点码值：
+{codes_text}
+
+请按照以下格式返回，每个需求功能点一行：
+功能点编号|一级功能点|二级功能点|三级功能点|对应的需求功能点描述|工作量估计
+
+要求：
+1. 一级、二级、三级功能点必须与上面的码值完全一致
+2. "对应的需求功能点描述"原样填入需求功能点内容
+3. 工作量估计为人天数字，参考每项约{per_item_workload}人天"""
+        try:
+            response = LLM_CLIENT.chat(prompt, temperature=0.3, max_tokens=600, timeout=30)
+        except Exception as e:
+            print(f"⚠️  补充匹配调用失败：{e}")
+            last_error = e
+            continue
+        new_matches = parse_ai_function_matches(response, candidates)
+        # 只保留确实覆盖了未匹配功能点的结果，避免重复
+        added.extend(match for match in new_matches
+                     if len(find_unmatched_items(unmatched, [match])) < len(unmatched))
+        unmatched = find_unmatched_items(unmatched, new_matches)
+
+    if unmatched:
+        print(f"⚠️  仍有 {len(unmatched)} 个功能点未匹配：{'；'.join(unmatched)}")
+        # 只有调用失败导致的未匹配才需要在接口恢复后重新生成；后续轮次成功补齐时不登记
+        if last_error is not None:
+            BACKFILL.mark(10, "附件2 WBS 部分功能点未补充匹配", str(last_error))
+    elif added:
+        print(f"✅ 补充匹配完成，新增 {len(added)} 个匹配")
+    return added
+
+
+# WBS 工作量分配：最小单位（人天）与每行下限
+WBS_WORKLOAD_STEP = 0.5
+WBS_MIN_ROW_WORKLOAD = 0.5
+
+
+def allocate_workload(weights: List[float], total: float, step: float = WBS_WORKLOAD_STEP,
+                      minimum: float = WBS_MIN_ROW_WORKLOAD) -> List[float]:
+    """
+    按 weights 的比例把 total 分配到各行，每行为 step 的整数倍且不少于 minimum，合计恰好等于 total。
+    最大余数法：先按比例取整，剩余单位按小数部分从大到小补齐；按比例低于下限的行固定为下限，其余行重新按比例分配。
+    total 不是 step 的整数倍时，零头计入分配最多的一行。结果只取决于输入，不含随机性。
+    """
+    count = len(weights)
+    if count == 0:
+        return []
+    units = math.floor(total / step + 1e-9)
+    min_units = math.ceil(minimum / step - 1e-9)
+    weights = [w if isinstance(w, (int, float)) and math.isfinite(w) and w > 0 else 0.0 for w in weights]
+    if not any(weights):
+        weights = [1.0] * count
+    if min_units * count > units:
+        # 总量不足以满足每行下限，只按比例分配
+        min_units = 0
+
+    fixed: Set[int] = set()
+    while True:
+        free = [i for i in range(count) if i not in fixed]
+        remaining = units - min_units * len(fixed)
+        free_weight = sum(weights[i] for i in free)
+        quotas = {i: remaining * weights[i] / free_weight if free_weight else 0.0 for i in free}
+        below = {i for i in free if quotas[i] < min_units}
+        if not below:
+            break
+        fixed |= below
+
+    allocated = [min_units if i in fixed else math.floor(quotas[i]) for i in range(count)]
+    leftover = units - sum(allocated)
+    by_remainder = sorted(quotas, key=lambda i: (-(quotas[i] - math.floor(quotas[i])), -weights[i], i))
+    for i in by_remainder[:leftover]:
+        allocated[i] += 1
+
+    result = [value * step for value in allocated]
+    residual = round(total - units * step, 10)
+    if residual:
+        largest = max(range(count), key=lambda i: (result[i], -i))
+        result[largest] = round(result[largest] + residual, 10)
+    return result
+
+
+def normalize_match_workloads(matches: List[Tuple[str, str, str, str, float]],
+                              total_workload: float) -> List[Tuple[str, str, str, str, float]]:
+    """把大模型给出的工作量当作相对权重，在本地重新分配为合计恰好等于 total_workload 的值"""
+    if len(matches) * WBS_MIN_ROW_WORKLOAD > total_workload:
+        print(f"⚠️  {len(matches)} 个功能点无法每项至少分配 {WBS_MIN_ROW_WORKLOAD:g} 人天，只按比例分配")
+    workloads = allocate_workload([match[4] for match in matches], total_workload)
+    original = sum(match[4] for match in matches)
+    if any(abs(old - new) > 1e-9 for old, new in zip((match[4] for match in matches), workloads)):
+        print(f"⚖️  按大模型给出的比例重新分配工作量：{original:g} -> {total_workload:g} 人天"
+              f"（以 {WBS_WORKLOAD_STEP:g} 人天为单位，每项不少于 {WBS_MIN_ROW_WORKLOAD:g} 人天）")
+    return [match[:4] + (workload,) for match, workload in zip(matches, workloads)]
+
+
+# 第十一步生成内容的特征，初始化附件1时据此识别并清理
+GENERATED_CONTENT_PATTERNS = [
+    "项目背景和概述：",
+    "主要功能模块：",
+    "技术架构特点：",
+    "具体目标和预期效果：",
+    "业务价值和意义：",
+    "用户体验提升：",
+    "现有系统的不足：",
+    "业务发展需要：",
+    "技术升级必要性：",
+    "当前系统存在的具体问题：",
+    "用户使用痛点：",
+    "技术或流程缺陷："
+]
+
+# 所有特征编译为一个交替模式，每段文本只扫描一遍
+GENERATED_CONTENT_RE = re.compile("|".join(map(re.escape, GENERATED_CONTENT_PATTERNS)))
+
+
+def is_generated_content(text: str) -> bool:
+    """段落是否包含之前生成的项目文档内容特征"""
+    return GENERATED_CONTENT_RE.search(text) is not None
+
+# 附件1中需要插入项目文档的章节：章节号 -> 章节名
+SECTION_MAPPINGS = {
+    "1.1": "总体描述",
+    "1.2": "项目建设目标",
+    "1.3": "项目建设必要性",
+    "2.3": "存在问题"
+}
+
+# 正文 XML 超过该大小（字节）时改用流式处理，不构建 python-docx 对象树
+STREAMING_DOCX_THRESHOLD = 8 * 1024 * 1024
+
+
+def _is_section_annotation(text: str, section_num: str, section_name: str) -> bool:
+    """初始化时检查的章节标识格式"""
+    return (text == f"{section_name}（添加标识）" or
+            text.startswith(f"{section_name}（") and "标识" in text or
+            text == f"{section_num} {section_name}（添加标识）" or
+            text.startswith(f"{section_num} {section_name}（") and "标识" in text)
+
+
+def _match_update_anchor(text: str) -> Optional[Tuple[str, str]]:
+    """第十一步插入内容的位置：返回段落匹配的 (章节号, 章节名)"""
+    for section_num, section_name in SECTION_MAPPINGS.items():
+        # 格式1: "1.1 总体描述（添加标识）"
+        # 格式2: "总体描述（添加标识）"
+        if ((text.startswith(section_num) and section_name in text and ('添加标识' in text or '标识' in text or '（' in text)) or
+            (text == f"{section_name}（添加标识）" or text.startswith(f"{section_name}（") and "标识" in text)):
+            return section_num, section_name
+    return None
+
+
+def _use_streaming_docx(path: str) -> bool:
+    """正文 XML 很大时改用流式处理"""
+    try:
+        # docx_stream、xlsx_patch 用到的 xml.sax.saxutils 会连带导入 urllib.request/http.client，都在用到时才导入
+        document_xml_size = lazy_import("docx_stream").document_xml_size
+        if DRY_RUN_STORE is not None:
+            return document_xml_size(DRY_RUN_STORE.open(path)) > STREAMING_DOCX_THRESHOLD
+        SAVE_SERVICE.wait_for(path)
+        with open(path, "rb") as f:
+            return document_xml_size(f) > STREAMING_DOCX_THRESHOLD
+    except Exception:
+        return False
+
 
-def initialize_attachment1() -> None:
-    """初始化附件1，清除之前生成的项目文档内容，并重新添加标注"""
+def stream_patch_document(path: str, on_paragraph: Callable[[str], Tuple[bool, List[str]]]) -> Dict[str, int]:
+    """
+    流式改写Word文档正文：on_paragraph 接收段落文本，返回 (是否保留, 在其后插入的段落文本)。
+    等待保存完成后返回统计（段落数、删除数、插入数）。
+    """
+    # 流式改写后，本次运行中已打开的 Document 不再是最新内容
+    _DOCUMENT_SESSIONS.pop(os.path.abspath(path), None)
+    stream_patch_docx = lazy_import("docx_stream").stream_patch_docx
+    stats: Dict[str, int] = {}
+
+    def writer(f: BinaryIO) -> None:
+        if DRY_RUN_STORE is not None:
+            stats.update(stream_patch_docx(DRY_RUN_STORE.open(path), f, on_paragraph))
+            return
+        with open(path, "rb") as src:
+            stats.update(stream_patch_docx(src, f, on_paragraph))
+
+    if DRY_RUN_STORE is not None:
+        DRY_RUN_STORE.write(path, writer)
+    else:
+        SAVE_SERVICE.submit(path, writer).result()
+    return stats
+
+
+def _initialize_attachment1_streaming(path1: str) -> None:
+    """initialize_attachment1 的流式版本：一遍扫描中删除生成内容并检查章节标识"""
+    print("📄 附件1正文较大，使用流式处理")
+    removed: List[str] = []
+    found: List[str] = []
+
+    def on_paragraph(text: str) -> Tuple[bool, List[str]]:
+        if is_generated_content(text):
+            removed.append(text[:50] + "...")
+            return False, []
+        for section_num, section_name in SECTION_MAPPINGS.items():
+            if section_num not in found and _is_section_annotation(text, section_num, section_name):
+                found.append(section_num)
+        return True, []
+
+    stats = stream_patch_document(path1, on_paragraph)
+    print(f"文档总段落数: {stats.get('paragraphs', 0)}")
+    for text_preview in removed:
+        print(f"删除: {text_preview}")
+    if removed:
+        print(f"✅ 已清理附件1中的 {len(removed)} 个生成内容段落")
+    else:
+        print("✅ 附件1中没有找到需要清理的内容")
+    for section_num, section_name in SECTION_MAPPINGS.items():
+        if section_num in found:
+            print(f"✅ 找到 {section_num} {section_name} 标识")
+        else:
+            print(f"⚠️  未找到 {section_num} {section_name} 标识")
+    if len(found) < 4:
+        print(f"⚠️  只找到 {len(found)} 个章节标识，应该有4个")
+        print("💡 请确保正文中包含所有必需的章节标识")
+    else:
+        print(f"✅ 所有 {len(found)} 个章节标识都已就绪")
+    print("✅ 附件1初始化完成，已准备好接收新内容")
+
+
+def _update_attachment1_streaming(path1: str, project_docs: dict) -> None:
+    """update_attachment1_with_project_docs 中自动更新Word文档的流式版本"""
+    print("📄 附件1正文较大，使用流式处理")
+    updated_sections: List[str] = []
+
+    def on_paragraph(text: str) -> Tuple[bool, List[str]]:
+        anchor = _match_update_anchor(text)
+        if anchor is None:
+            return True, []
+        section_num, section_name = anchor
+        print(f"找到带标识的章节：{text}")
+        content = str(project_docs.get(section_name, "")).strip()
+        if not content:
+            return True, []
+        lines = [line.strip() for line in content.split('\n') if line.strip()]
+        updated_sections.append(section_name)
+        print(f"✅ 已在章节 {section_num} 后添加 {len(lines)} 行内容")
+        return True, lines
+
+    stream_patch_document(path1, on_paragraph)
+    if updated_sections:
+        print(f"✅ Word文档自动更新成功，已替换标注：{', '.join(updated_sections)}")
+        print("💡 内容已精确插入到您标注的位置")
+    else:
+        print("❌ 未找到任何用户标注位置")
+        print("💡 请确保文档中包含“章节名（添加标识）”格式的章节标识")
+
+
+def initialize_attachment1() -> bool:
+    """初始化附件1，清除之前生成的项目文档内容，并重新添加标注；清理结果已保存时返回 True"""
     print_step("初始化：清理附件1中之前生成的项目文档内容，并重新添加标注")
     
     path1 = find_attachment_by_number(1)
     if not path1:
         print("未找到附件1文件")
-        return
+        return False
     
     try:
-        from docx import Document
-        
-        doc = Document(path1)
-        print(f"文档总段落数: {len(doc.paragraphs)}")
-        
-        # 识别需要清理的内容模式
-        content_patterns = [
-            "项目背景和概述：",
-            "主要功能模块：", 
-            "技术架构特点：",
-            "具体目标和预期效果：",
-            "业务价值和意义：",
-            "用户体验提升：",
-            "现有系统的不足：",
-            "业务发展需要：",
-            "技术升级必要性：",
-            "当前系统存在的具体问题：",
-            "用户使用痛点：",
-            "技术或流程缺陷："
-        ]
-        
-        # 查找需要删除的段落
-        paragraphs_to_remove = []
+        if _use_streaming_docx(path1):
+            _initialize_attachment1_streaming(path1)
+            return True
+
+        doc = open_document(path1)
+        # doc.paragraphs 每次访问都会重建段落列表，只取一次
+        paragraphs = doc.paragraphs
+        print(f"文档总段落数: {len(paragraphs)}")
         
-        for i, paragraph in enumerate(doc.paragraphs):
+        # 一遍扫描：收集需要删除的段落元素，其余段落的文本留给章节标识检查
+        paragraphs_to_remove = []
+        kept_texts = []
+        for i, paragraph in enumerate(paragraphs):
             text = paragraph.text.strip()
-            
-            # 检查是否包含我们生成的内容特征
-            for pattern in content_patterns:
-                if pattern in text:
-                    paragraphs_to_remove.append((i, text[:50] + "..."))
-                    break
+            if is_generated_content(text):
+                paragraphs_to_remove.append((i, text[:50] + "...", paragraph._element))
+            else:
+                kept_texts.append(text)
         
         print(f"找到 {len(paragraphs_to_remove)} 个需要清理的段落")
         
-        # 从后往前删除，避免索引偏移
-        for i, text_preview in reversed(paragraphs_to_remove):
+        # 直接按元素引用摘除，不依赖下标
+        for i, text_preview, element in paragraphs_to_remove:
             print(f"删除第{i}行: {text_preview}")
-            p = doc.paragraphs[i]
-            p._element.getparent().remove(p._element)
+            element.getparent().remove(element)
         
         if paragraphs_to_remove:
-            try:
-                print(f"✅ 已清理附件1中的 {len(paragraphs_to_remove)} 个生成内容段落")
-                cleaned = True
-            except PermissionError:
-                print("⚠️  文件被占用，无法保存。请关闭Word文档后重试")
-                print(f"💡 已识别到 {len(paragraphs_to_remove)} 个需要清理的段落，但无法自动清理")
-                print("💡 建议：关闭Word文档后重新运行程序")
-                return
+            print(f"✅ 已清理附件1中的 {len(paragraphs_to_remove)} 个生成内容段落")
         else:
             print("✅ 附件1中没有找到需要清理的内容")
-            cleaned = False
         
         # 重新添加标注，确保第十一步能找到插入位置
         # 注意：只在正文章节添加标注，不在目录中添加
         print("重新添加章节标注...")
-        section_mappings = {
-            "1.1": "总体描述",
-            "1.2": "项目建设目标", 
-            "1.3": "项目建设必要性",
-            "2.3": "存在问题"
-        }
+        section_mappings = SECTION_MAPPINGS
+        
+        # 检查现有的章节标识（与清理共用同一遍扫描得到的文本）
+        found_sections = set()
+        for text in kept_texts:
+            for section_num, section_name in section_mappings.items():
+                if section_num not in found_sections and _is_section_annotation(text, section_num, section_name):
+                    found_sections.add(section_num)
         
-        # 检查现有的章节标识
         annotations_found = 0
         for section_num, section_name in section_mappings.items():
-            found = False
-            for i, paragraph in enumerate(doc.paragraphs):
-                text = paragraph.text.strip()
-                
-                # 直接查找章节标识格式
-                if (text == f"{section_name}（添加标识）" or 
-                    text.startswith(f"{section_name}（") and "标识" in text or
-                    text == f"{section_num} {section_name}（添加标识）" or
-                    text.startswith(f"{section_num} {section_name}（") and "标识" in text):
-                    print(f"✅ 找到 {section_num} {section_name} 标识")
-                    annotations_found += 1
-                    found = True
-                    break
-            
-            if not found:
+            if section_num in found_sections:
+                print(f"✅ 找到 {section_num} {section_name} 标识")
+                annotations_found += 1
+            else:
                 print(f"⚠️  未找到 {section_num} {section_name} 标识")
         
         # 检查是否所有章节都有标识
@@ -727,14 +1311,14 @@ def initialize_attachment1() -> None:
         else:
             print(f"✅ 所有 {annotations_found} 个章节标识都已就绪")
         
-        # 保存文档
-        try:
-            doc.save(path1)
-            if annotations_found > 0:
-                print(f"✅ 已检查 {annotations_found} 个章节标识")
-            print("✅ 附件1初始化完成，已准备好接收新内容")
-        except PermissionError:
-            print("⚠️  文件被占用，无法保存标注。请关闭Word文档后重试")
+        # 保存文档：第〇步根据是否保存成功决定是否更新模板，这里等待落盘
+        if not wait_saved(save_document(doc, path1)):
+            print("⚠️  附件1未能保存，初始化未完成")
+            return False
+        if annotations_found > 0:
+            print(f"✅ 已检查 {annotations_found} 个章节标识")
+        print("✅ 附件1初始化完成，已准备好接收新内容")
+        return True
         
     except ImportError:
         print("⚠️  未安装python-docx，跳过附件1初始化")
@@ -742,19 +1326,20 @@ def initialize_attachment1() -> None:
         print("⚠️  文件被占用，无法访问附件1。请关闭Word文档后重试")
     except Exception as e:
         print(f"⚠️  附件1初始化失败：{e}")
+    return False
 
 
-def initialize_attachment2() -> None:
-    """初始化附件2，清空数据仅保留标题行"""
+def initialize_attachment2() -> bool:
+    """初始化附件2，清空数据仅保留标题行；找不到附件2时返回 False"""
     print_step("初始化：清空附件2数据，仅保留标题行")
     
     path2 = find_attachment_by_number(2)
     if not path2:
         print("未找到附件2文件")
-        return
+        return False
     
     try:
-        wb2 = load_workbook(path2)
+        wb2 = open_workbook(path2)
         ws2 = wb2.active
         
         # 取消所有合并的单元格
@@ -779,19 +1364,101 @@ def initialize_attachment2() -> None:
         for col in range(1, max_col + 1):
             ws2.cell(1, col).border = None
         
-        wb2.save(path2)
+        if not wait_saved(save_workbook(wb2, path2)):
+            print("⚠️  附件2未能保存，初始化未完成")
+            return False
         print(f"已清空 {os.path.basename(path2)}，保留标题行")
+        return True
         
     except Exception as e:
         print(f"初始化附件2失败：{e}")
         raise
 
 
+def restore_from_template(template: str, target: str) -> None:
+    """用模板覆盖（或新建）附件：原子写入，能写时复制就不复制数据块"""
+    writer = lambda f: clone_into(f, template)
+    if DRY_RUN_STORE is not None:
+        DRY_RUN_STORE.write(target, writer)
+    else:
+        SAVE_SERVICE.submit(target, writer).result()
+
+
+def capture_template(number: int, path: str) -> bool:
+    """等待 path 落盘后存为附件 number 的模板，两者都成功时返回 True；试运行不保存，直接返回 True"""
+    if DRY_RUN_STORE is not None:
+        return True
+    if SAVE_SERVICE.settle(path) is not None:
+        # 附件本身没能保存：失败信息由保存服务在运行结束时统一输出
+        print(f"⚠️  {os.path.basename(path)} 未能保存，不更新附件{number}模板")
+        return False
+    try:
+        TEMPLATES.capture(number, path, parse_attachment_filename(os.path.basename(path))[2])
+    except Exception as e:
+        print(f"⚠️  保存附件{number}模板失败：{e}")
+        return False
+    print(f"📄 已将 {os.path.basename(path)} 保存为附件{number}模板")
+    return True
+
+
+def initialize_attachments() -> None:
+    """
+    第〇步：附件1、2 仍是上次运行写出的版本时直接用模板覆盖；否则照旧清理，并把清理结果存为模板。
+    附件3、4 首次遇到时存为模板，之后只在文件缺失时从模板补回。
+    """
+    requirement, attachments = package_attachments(DATA_DIR)
+    restored = set()
+    for number in (1, 2, 3, 4):
+        if number in attachments:
+            if number in (3, 4) and TEMPLATES.template_path(number) is None:
+                capture_template(number, attachments[number])
+            continue
+        template = TEMPLATES.template_path(number)
+        if template is None or requirement is None:
+            continue
+        if DRY_RUN_STORE is not None:
+            print(f"💡 附件{number}缺失，正式运行时将从模板补回")
+            continue
+        attribute, ext = TEMPLATES.template_attribute(number)
+        target = os.path.join(DATA_DIR, f"附件{number}-{requirement}@{attribute}{ext}")
+        restore_from_template(template, target)
+        restored.add(number)
+        print(f"📄 附件{number}缺失，已从模板补回：{os.path.basename(target)}")
+
+    for number, initialize in ((1, initialize_attachment1), (2, initialize_attachment2)):
+        path = find_attachment_by_number(number)
+        if number in restored:
+            TEMPLATES.take_custody(number)
+            continue
+        if path is not None and TEMPLATES.can_restore(number):
+            print_step(f"初始化：用模板覆盖附件{number}")
+            restore_from_template(TEMPLATES.template_path(number), path)
+            print(f"✅ 已从模板恢复 {os.path.basename(path)}，无需逐项清理")
+        elif not (initialize() and capture_template(number, path)):
+            # 清理结果没能保存或没能存为模板时，本次运行不掌握该附件，下次照旧清理
+            continue
+        TEMPLATES.take_custody(number)
+
+
+# 进程内的手册摘要：(手册修改时间, 摘要)，常驻服务模式下避免每次作业重新读取
+_MANUAL_SUMMARY_MEMO: Optional[Tuple[float, str]] = None
+
+
 def get_manual_summary() -> str:
     """获取沙盘操作手册的精简摘要，使用缓存机制"""
+    global _MANUAL_SUMMARY_MEMO
     
-    manual_path = os.path.join(os.path.dirname(__file__), "沙盘操作手册.md")
-    cache_path = os.path.join(os.path.dirname(__file__), "manual_summary_cache.txt")
+    prewarmed = PREWARMER.take("manual_summary")
+    if prewarmed is not MISSING:
+        return prewarmed
+
+    manual_path = MANUAL_FILE
+    cache_path = MANUAL_SUMMARY_CACHE
+
+    manual_mtime = os.path.getmtime(manual_path) if os.path.exists(manual_path) else 0.0
+    if _MANUAL_SUMMARY_MEMO is not None and _MANUAL_SUMMARY_MEMO[0] == manual_mtime:
+        print(f"✅ 使用内存中的手册摘要，长度：{len(_MANUAL_SUMMARY_MEMO[1])} 字符")
+        return _MANUAL_SUMMARY_MEMO[1]
     
     # 检查缓存是否存在且有效
     if os.path.exists(cache_path) and os.path.exists(manual_path):
@@ -806,6 +1473,7 @@ def get_manual_summary() -> str:
                     cached_summary = f.read().strip()
                 if cached_summary:
                     print(f"✅ 使用缓存的手册摘要，长度：{len(cached_summary)} 字符")
+                    _MANUAL_SUMMARY_MEMO = (manual_mtime, cached_summary)
                     return cached_summary
         except Exception as e:
             print(f"⚠️  读取缓存失败：{e}")
@@ -838,26 +1506,13 @@ def get_manual_summary() -> str:
 请直接返回摘要内容，不要其他说明。"""
 
     try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-        }
-        
-        data = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "user", "content": summary_prompt}
-            ],
-            "temperature": 0.2
-        }
-        
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
-        
-        result = response.json()
-        summary = result['choices'][0]['message']['content'].strip()
+        summary = LLM_CLIENT.chat(summary_prompt, temperature=0.2, timeout=60)
         
-        # 保存摘要到缓存
+        _MANUAL_SUMMARY_MEMO = (manual_mtime, summary)
+
+        # 保存摘要到缓存（试运行不写磁盘）
+        if DRY_RUN_STORE is not None:
+            return summary
         try:
             with open(cache_path, 'w', encoding='utf-8') as f:
                 f.write(summary)
@@ -874,7 +1529,10 @@ def get_manual_summary() -> str:
 
 def clear_manual_cache() -> None:
     """清理手册摘要缓存，强制重新生成"""
-    cache_path = os.path.join(os.path.dirname(__file__), "manual_summary_cache.txt")
+    global _MANUAL_SUMMARY_MEMO
+
+    cache_path = MANUAL_SUMMARY_CACHE
+    _MANUAL_SUMMARY_MEMO = None
     
     try:
         if os.path.exists(cache_path):
@@ -1004,66 +1662,35 @@ def generate_project_documentation(requirement_content: str) -> dict:
 2. ...
 3. ..."""
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-    }
-    
-    data = {
-        "model": "deepseek-chat",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "max_tokens": 2000,
-        "temperature": 0.7
-    }
-    
     try:
         print("正在调用DeepSeek API生成项目文档...")
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=60)
-        
-        if response.status_code != 200:
-            error_msg = f"API调用失败，状态码: {response.status_code}"
-            print(error_msg)
-            raise Exception(error_msg)
+        ai_response = LLM_CLIENT.chat(prompt, temperature=0.7, max_tokens=2000, timeout=60)
+        print("✅ 项目文档生成成功")
+        
+        # 解析AI响应为字典
+        sections = {
+            "总体描述": "",
+            "项目建设目标": "",
+            "项目建设必要性": "",
+            "存在问题": ""
+        }
         
-        result = response.json()
+        current_section = None
+        lines = ai_response.split('\n')
         
-        if 'choices' in result and len(result['choices']) > 0:
-            ai_response = result['choices'][0]['message']['content'].strip()
-            print("✅ 项目文档生成成功")
-            
-            # 解析AI响应为字典
-            sections = {
-                "总体描述": "",
-                "项目建设目标": "",
-                "项目建设必要性": "",
-                "存在问题": ""
-            }
-            
-            current_section = None
-            lines = ai_response.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if line.endswith('：') and line[:-1] in sections:
-                    current_section = line[:-1]
-                    sections[current_section] = ""
-                elif current_section and line:
-                    if sections[current_section]:
-                        sections[current_section] += '\n' + line
-                    else:
-                        sections[current_section] = line
-            
-            return sections
-        else:
-            error_msg = "API响应格式错误"
-            print(error_msg)
-            raise Exception(error_msg)
-            
+        for line in lines:
+            line = line.strip()
+            if line.endswith('：') and line[:-1] in sections:
+                current_section = line[:-1]
+                sections[current_section] = ""
+            elif current_section and line:
+                if sections[current_section]:
+                    sections[current_section] += '\n' + line
+                else:
+                    sections[current_section] = line
+
+        return sections
+
     except Exception as e:
         error_msg = f"生成项目文档失败：{e}"
         print(error_msg)
@@ -1083,7 +1710,9 @@ def update_attachment1_with_project_docs(project_docs: dict) -> None:
         # 由于Word文档更新比较复杂且容易出错，我们采用备选方案
         # 直接生成格式化的文本文件供用户手动复制
         
-        output_file = os.path.join(os.path.dirname(__file__), "项目文档更新内容.txt")
+        output_file = PROJECT_DOCS_OUTPUT
+        if DRY_RUN_STORE is not None:
+            output_file = os.devnull
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write("附件1项目文档更新内容\n")
             f.write("="*60 + "\n\n")
@@ -1121,10 +1750,11 @@ def update_attachment1_with_project_docs(project_docs: dict) -> None:
         
         # 同时尝试自动更新（如果可能的话）
         try:
-            from docx import Document
-            
             print("\n尝试自动更新Word文档...")
-            doc = Document(path1)
+            if _use_streaming_docx(path1):
+                _update_attachment1_streaming(path1, project_docs)
+                return
+            doc = open_document(path1)
             
             section_mappings = {
                 "1.1": "总体描述",
@@ -1135,14 +1765,6 @@ def update_attachment1_with_project_docs(project_docs: dict) -> None:
             
             updated_sections = []
             
-            # 只支持章节标识格式
-            section_title_mappings = {
-                "1.1": "总体描述",
-                "1.2": "项目建设目标", 
-                "1.3": "项目建设必要性",
-                "2.3": "存在问题"
-            }
-            
             print("查找章节标识...")
             
             # 直接查找章节标识
@@ -1150,48 +1772,41 @@ def update_attachment1_with_project_docs(project_docs: dict) -> None:
                 text = paragraph.text.strip()
                 
                 # 查找带有标识的章节标题（支持两种格式）
-                for section_num, section_name in section_title_mappings.items():
-                    # 格式1: "1.1 总体描述（添加标识）"
-                    # 格式2: "总体描述（添加标识）"  
-                    if ((text.startswith(section_num) and section_name in text and ('添加标识' in text or '标识' in text or '（' in text)) or
-                        (text == f"{section_name}（添加标识）" or text.startswith(f"{section_name}（") and "标识" in text)):
+                anchor = _match_update_anchor(text)
+                if anchor is not None:
+                    section_num, section_name = anchor
+                    print(f"找到带标识的章节：第{i}行 - {text}")
+                
+                    if section_name in project_docs:
+                        content = project_docs[section_name].strip()
+                    
+                        if content:
+                            # 在章节标题后添加内容
+                            lines = [line.strip() for line in content.split('\n') if line.strip()]
                         
-                        print(f"找到带标识的章节：第{i}行 - {text}")
+                            # 使用更简单可靠的方法：直接在目标段落后面依次插入
+                            target_para = paragraph
+                            parent = target_para._element.getparent()
+                            target_element = target_para._element
                         
-                        if section_name in project_docs:
-                            content = project_docs[section_name].strip()
+                            # 正序插入每一行内容
+                            insert_position = list(parent).index(target_element) + 1
+                        
+                            for line_idx, line in enumerate(lines):
+                                # 创建新的段落元素
+                                new_p = doc._body._element.makeelement('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p')
+                                # 创建文本运行
+                                new_r = doc._body._element.makeelement('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
+                                new_t = doc._body._element.makeelement('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+                                new_t.text = line
+                                new_r.append(new_t)
+                                new_p.append(new_r)
                             
-                            if content:
-                                # 在章节标题后添加内容
-                                lines = [line.strip() for line in content.split('\n') if line.strip()]
-                                
-                                # 使用更简单可靠的方法：直接在目标段落后面依次插入
-                                target_para = paragraph
-                                parent = target_para._element.getparent()
-                                target_element = target_para._element
-                                
-                                # 正序插入每一行内容
-                                insert_position = list(parent).index(target_element) + 1
-                                
-                                for line_idx, line in enumerate(lines):
-                                    # 创建新的段落元素
-                                    new_p = doc._body._element.makeelement('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p')
-                                    # 创建文本运行
-                                    new_r = doc._body._element.makeelement('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-                                    new_t = doc._body._element.makeelement('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
-                                    new_t.text = line
-                                    new_r.append(new_t)
-                                    new_p.append(new_r)
-                                    
-                                    # 插入到正确位置
-                                    parent.insert(insert_position + line_idx, new_p)
-                                
-                                updated_sections.append(section_name)
-                                print(f"✅ 已在章节 {section_num} 后添加 {len(lines)} 行内容")
-                                
-                                # 提前退出，避免重复处理
-                                break
-                        break
+                                # 插入到正确位置
+                                parent.insert(insert_position + line_idx, new_p)
+                        
+                            updated_sections.append(section_name)
+                            print(f"✅ 已在章节 {section_num} 后添加 {len(lines)} 行内容")
             
             # 禁用末尾添加功能，要求必须找到标注位置
             if not updated_sections:
@@ -1209,9 +1824,11 @@ def update_attachment1_with_project_docs(project_docs: dict) -> None:
                 return
             
             if updated_sections:
-                doc.save(path1)
-                print(f"✅ Word文档自动更新成功，已替换标注：{', '.join(updated_sections)}")
-                print("💡 内容已精确插入到您标注的位置")
+                if wait_saved(save_document(doc, path1)):
+                    print(f"✅ Word文档自动更新成功，已替换标注：{', '.join(updated_sections)}")
+                    print("💡 内容已精确插入到您标注的位置")
+                else:
+                    print("⚠️  附件1未能保存，请关闭Word文档后重新执行第十一步")
             else:
                 print("⚠️  未找到用户标注位置，请检查标注格式")
                 print("💡 建议使用格式：总体描述（添加标识）、项目建设目标（添加标识）等")
@@ -1236,7 +1853,7 @@ def update_attachment3_with_project_docs(project_docs: dict) -> None:
         return
     
     try:
-        wb3 = load_workbook(path3)
+        wb3 = open_workbook(path3)
         # 使用第一个工作表（系统功能架构图）
         ws3 = wb3.active
         
@@ -1258,13 +1875,13 @@ def update_attachment3_with_project_docs(project_docs: dict) -> None:
         
         if updated_cells:
             # 保存文件
-            wb3.save(path3)
-            print(f"✅ 附件3更新成功，已更新：{', '.join(updated_cells)}")
+            if wait_saved(save_workbook(wb3, path3)):
+                print(f"✅ 附件3更新成功，已更新：{', '.join(updated_cells)}")
+            else:
+                print("⚠️  附件3未能保存，请关闭Excel文档后重新执行第十一步")
         else:
             print("⚠️  没有找到可更新的内容")
         
-    except PermissionError:
-        print("⚠️  附件3文件被占用，无法保存。请关闭Excel文档后重试")
     except Exception as e:
         print(f"⚠️  附件3更新失败：{e}")
         import traceback
@@ -1282,7 +1899,7 @@ def step11_generate_and_update_project_docs() -> None:
             print("未找到附件4文件")
             return
         
-        wb4 = load_workbook(path4, data_only=True)
+        wb4 = open_workbook(path4, data_only=True)
         ws4 = wb4.active
         a4_content = ws4['A4'].value
         
@@ -1293,7 +1910,12 @@ def step11_generate_and_update_project_docs() -> None:
         print(f"提取到需求内容：{len(str(a4_content))} 字符")
         
         # 生成项目文档
-        project_docs = generate_project_documentation(str(a4_content))
+        BACKFILL.resolve(11)
+        try:
+            project_docs = generate_project_documentation(str(a4_content))
+        except Exception as e:
+            BACKFILL.mark(11, "附件1 项目文档章节未生成", str(e))
+            raise
         
         # 显示生成的内容
         print("\n" + "="*80)
@@ -1337,10 +1959,15 @@ def update_wbs_document() -> None:
             print("未找到附件4文件")
             return
         
-        wb4 = load_workbook(path4, data_only=True)
+        wb4 = open_workbook(path4, data_only=True)
         ws4 = wb4.active
         a4_content = ws4['A4'].value  # A4包含需求内容，也用作功能描述
         d7_workload = ws4['D7'].value or 19.0
+        try:
+            d7_workload = float(d7_workload)
+        except (TypeError, ValueError):
+            print(f"⚠️  附件4 D7 不是数字（{d7_workload}），按 19 人天计算")
+            d7_workload = 19.0
         
         if not a4_content:
             print("附件4的A4单元格为空")
@@ -1362,13 +1989,19 @@ def update_wbs_document() -> None:
             return
         
         # AI匹配功能点
-        matches = match_functions_with_ai(requirement_items, function_codes, d7_workload)
+        BACKFILL.resolve(10)
+        try:
+            matches = match_functions_with_ai(requirement_items, function_codes, d7_workload)
+        except Exception as e:
+            BACKFILL.mark(10, "附件2 WBS 功能点匹配未生成", str(e))
+            raise
         
         if not matches:
             print("AI匹配失败，程序终止")
             return
         
         print(f"匹配到 {len(matches)} 个功能点")
+        matches = normalize_match_workloads(matches, d7_workload)
         
         # 更新WBS文档
         path2 = find_attachment_by_number(2)
@@ -1376,7 +2009,7 @@ def update_wbs_document() -> None:
             print("未找到附件2 WBS文件")
             return
         
-        wb2 = load_workbook(path2)
+        wb2 = open_workbook(path2)
         ws2 = wb2.active
         
         # 取消所有合并的单元格
@@ -1463,7 +2096,7 @@ def update_wbs_document() -> None:
             cell = ws2.cell(total_row, col)
             cell.border = thin_border
         
-        wb2.save(path2)
+        save_workbook(wb2, path2)
         
         print(f"已更新 {os.path.basename(path2)}:")
         print(f"  - 原始匹配: {len(matches)} 个功能点")
@@ -1492,8 +2125,8 @@ def update_wbs_document() -> None:
         raise
 
 
-def enhance_cosmic_data_groups_and_attributes(trigger_event: str, function_process: str, subprocess_desc: str, data_movement_type: str, existing_data_group: str = "", existing_data_attributes: str = "") -> tuple:
-    """基于COSMIC背景，调用大模型生成或完善数据组和数据属性"""
+def _ai_cosmic_data_group_and_attributes(trigger_event: str, function_process: str, subprocess_desc: str, data_movement_type: str, existing_data_group: str = "", existing_data_attributes: str = "") -> Optional[Tuple[str, str]]:
+    """调用大模型生成数据组和数据属性，失败返回 None（由调用方决定回退值）"""
     
     prompt = f"""作为COSMIC软件度量专家，基于以下信息，为子过程生成合适的数据组和数据属性。
 
@@ -1524,25 +2157,8 @@ COSMIC背景知识：
 
 只返回数据组和数据属性，不要其他内容。"""
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-    }
-    
-    data = {
-        "model": "deepseek-chat",
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.3
-    }
-    
     try:
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        content = result['choices'][0]['message']['content'].strip()
+        content = LLM_CLIENT.chat(prompt, temperature=0.3, timeout=30)
         
         # 解析返回内容
         lines = content.split('\n')
@@ -1558,16 +2174,44 @@ COSMIC背景知识：
         
         return data_group, data_attributes
         
-    except requests.exceptions.Timeout:
-        print(f"⚠️  API调用超时，使用默认值")
-        return existing_data_group or "默认数据组", existing_data_attributes or "默认属性"
     except Exception as e:
-        print(f"⚠️  调用AI生成数据组和属性失败：{e}")
-        return existing_data_group or "默认数据组", existing_data_attributes or "默认属性"
+        if is_timeout_error(e):
+            print(f"⚠️  API调用超时，使用默认值")
+        else:
+            print(f"⚠️  调用AI生成数据组和属性失败：{e}")
+        return None
+
 
+def enhance_cosmic_data_groups_and_attributes(trigger_event: str, function_process: str, subprocess_desc: str, data_movement_type: str, existing_data_group: str = "", existing_data_attributes: str = "") -> tuple:
+    """基于COSMIC背景，调用大模型生成或完善数据组和数据属性"""
+    result = _ai_cosmic_data_group_and_attributes(trigger_event, function_process, subprocess_desc,
+                                                  data_movement_type, existing_data_group, existing_data_attributes)
+    if result is None:
+        return existing_data_group or DEFAULT_DATA_GROUP, existing_data_attributes or DEFAULT_DATA_ATTRIBUTES
+    return result
+
+
+def cosmic_request_key(trigger_event: str, function_process: str, subprocess_desc: str, data_movement_type: str,
+                       existing_data_group: str = "", existing_data_attributes: str = "") -> Tuple[str, ...]:
+    """
+    子过程合并请求的键：F-I 列输入加上现有的 J/K（提示词中包含现有值，J/K 不同的行结果也不同）。
+    去除首尾空白、合并连续空白，数据移动类型不区分大小写
+    """
+    def normalize(value) -> str:
+        return " ".join(str(value or "").split())
 
-def step12_enhance_cosmic_data_groups_and_attributes() -> None:
-    """第十二步：基于COSMIC背景完善数据组和数据属性"""
+    return (normalize(trigger_event), normalize(function_process),
+            normalize(subprocess_desc), normalize(data_movement_type).upper(),
+            normalize(existing_data_group), normalize(existing_data_attributes))
+
+
+# 大模型不可用时填入的默认值；再次生成时视为空，不作为“现有数据组/属性”传给大模型
+DEFAULT_DATA_GROUP = "默认数据组"
+DEFAULT_DATA_ATTRIBUTES = "默认属性"
+
+
+def step12_enhance_cosmic_data_groups_and_attributes(only_rows: Optional[Set[int]] = None) -> None:
+    """第十二步：基于COSMIC背景完善数据组和数据属性；only_rows 不为 None 时只处理这些行（补全模式）"""
     print_step("第十二步：基于COSMIC背景完善数据组和数据属性")
     
     path3 = find_attachment_by_number(3)
@@ -1576,7 +2220,7 @@ def step12_enhance_cosmic_data_groups_and_attributes() -> None:
         return
     
     try:
-        wb3 = load_workbook(path3)
+        wb3 = open_workbook(path3)
         
         # 查找COSMIC功能点拆分表工作表
         sheet_name = "COSMIC功能点拆分表"
@@ -1587,112 +2231,426 @@ def step12_enhance_cosmic_data_groups_and_attributes() -> None:
         ws = wb3[sheet_name]
         print(f"✅ 找到{sheet_name}工作表")
         
+        # 上次运行记录在附件3 文档属性中的行指纹：输入和 J/K 都没变的行不再调用大模型
+        state = RowState.from_workbook(wb3)
+        seen_fingerprints = set()
+        # 早期版本保存在附件3 隐藏工作表中的状态：迁移到文档属性，并删除该工作表
+        legacy_state = pop_legacy_state_sheet(wb3)
+        # 上次运行生成了但没能保存进附件3 的结果（试运行不读写检查点）
+        checkpoint = Step12Checkpoint.load(
+            None if DRY_RUN_STORE is not None else os.path.join(DATA_DIR, CHECKPOINT_FILE))
+        if len(checkpoint):
+            print(f"🔁 从检查点恢复上次未保存的 {len(checkpoint)} 条生成结果")
+        
         # 统计处理的行数
         processed_count = 0
         enhanced_count = 0
+        skipped_count = 0
+        unchanged_count = 0
+        resumed_count = 0
+        # 本次运行内合并相同的请求：逐行顺序处理，不存在并发的相同请求，用字典记住已有结果即可
+        shared_results: Dict[Tuple[str, ...], Optional[Tuple[str, str]]] = {}
+        shared_count = 0
         
-        # 从第4行开始处理数据
-        for row in range(4, ws.max_row + 1):
-            # 获取相关列的数据
-            trigger_event = ws.cell(row, 6).value or ""      # F列 - 触发事件
-            function_process = ws.cell(row, 7).value or ""   # G列 - 功能过程  
-            subprocess_desc = ws.cell(row, 8).value or ""    # H列 - 子过程描述
-            data_movement_type = ws.cell(row, 9).value or "" # I列 - 数据移动类型
-            existing_data_group = ws.cell(row, 10).value or ""     # J列 - 数据组
-            existing_data_attributes = ws.cell(row, 11).value or "" # K列 - 数据属性
+        try:
+            # 从第4行开始处理数据
+            for row in range(4, ws.max_row + 1):
+                if only_rows is not None and row not in only_rows:
+                    continue
+                # 获取相关列的数据
+                trigger_event = ws.cell(row, 6).value or ""      # F列 - 触发事件
+                function_process = ws.cell(row, 7).value or ""   # G列 - 功能过程  
+                subprocess_desc = ws.cell(row, 8).value or ""    # H列 - 子过程描述
+                data_movement_type = ws.cell(row, 9).value or "" # I列 - 数据移动类型
+                existing_data_group = ws.cell(row, 10).value or ""     # J列 - 数据组
+                existing_data_attributes = ws.cell(row, 11).value or "" # K列 - 数据属性
+                if existing_data_group == DEFAULT_DATA_GROUP:
+                    existing_data_group = ""
+                if existing_data_attributes == DEFAULT_DATA_ATTRIBUTES:
+                    existing_data_attributes = ""
             
-            # 只处理有子过程描述和数据移动类型的行
-            if subprocess_desc.strip() and data_movement_type.strip():
-                processed_count += 1
-                print(f"\n处理第{row}行:")
-                print(f"  子过程描述: {subprocess_desc[:50]}...")
-                print(f"  数据移动类型: {data_movement_type}")
+                # 只处理有子过程描述和数据移动类型的行
+                if subprocess_desc.strip() and data_movement_type.strip():
+                    key = cosmic_request_key(trigger_event, function_process, subprocess_desc, data_movement_type,
+                                             existing_data_group, existing_data_attributes)
+                    # 同一个指纹既标识该行当前内容（是否为上次生成的结果），也标识本次的请求（检查点）
+                    fingerprint = row_fingerprint(key)
+                    seen_fingerprints.add(fingerprint)
+                    if (legacy_state is not None and legacy_state.get(row_fingerprint(key[:4]))
+                            == (str(existing_data_group), str(existing_data_attributes))):
+                        state.record(fingerprint)
+                    if state.is_current(fingerprint):
+                        unchanged_count += 1
+                        continue
+                
+                    processed_count += 1
+                    print(f"\n处理第{row}行:")
+                    print(f"  子过程描述: {subprocess_desc[:50]}...")
+                    print(f"  数据移动类型: {data_movement_type}")
                 
-                # 调用AI生成或完善数据组和数据属性
-                new_data_group, new_data_attributes = enhance_cosmic_data_groups_and_attributes(
-                    trigger_event, function_process, subprocess_desc, data_movement_type,
-                    existing_data_group, existing_data_attributes
-                )
+                    # 检查点中已有结果时直接套用，否则调用AI生成或完善数据组和数据属性（相同请求共用一次调用）
+                    result = checkpoint.get(fingerprint)
+                    if result is not None:
+                        resumed_count += 1
+                    elif key in shared_results:
+                        result = shared_results[key]
+                        shared_count += 1
+                    else:
+                        result = shared_results[key] = _ai_cosmic_data_group_and_attributes(
+                            trigger_event, function_process, subprocess_desc, data_movement_type,
+                            existing_data_group, existing_data_attributes
+                        )
+                        if result is not None:
+                            checkpoint.add(fingerprint, *result)
+                    if result is None:
+                        new_data_group = existing_data_group or DEFAULT_DATA_GROUP
+                        new_data_attributes = existing_data_attributes or DEFAULT_DATA_ATTRIBUTES
+                        BACKFILL.mark(12, f"附件3 {sheet_name} 第{row}行（{subprocess_desc[:30]}）", "大模型调用失败，使用默认值或保留原值", row)
+                        skipped_count += 1
+                    else:
+                        new_data_group, new_data_attributes = result
+                        BACKFILL.resolve(12, row)
+                        generated = row_fingerprint(cosmic_request_key(
+                            trigger_event, function_process, subprocess_desc, data_movement_type,
+                            new_data_group, new_data_attributes))
+                        state.record(generated)
+                        seen_fingerprints.add(generated)
                 
-                # 检查是否有改进
-                if (new_data_group != existing_data_group or 
-                    new_data_attributes != existing_data_attributes):
+                    # 检查是否有改进
+                    if (new_data_group != existing_data_group or 
+                        new_data_attributes != existing_data_attributes):
                     
-                    # 更新数据
-                    ws.cell(row, 10).value = new_data_group      # J列 - 数据组
-                    ws.cell(row, 11).value = new_data_attributes # K列 - 数据属性
+                        # 更新数据
+                        ws.cell(row, 10).value = new_data_group      # J列 - 数据组
+                        ws.cell(row, 11).value = new_data_attributes # K列 - 数据属性
                     
-                    enhanced_count += 1
-                    print(f"  ✅ 已完善数据组: {new_data_group}")
-                    print(f"  ✅ 已完善数据属性: {new_data_attributes[:50]}...")
-                else:
-                    print(f"  ✓ 数据组和属性已完善，无需修改")
-        
-        # 保存文件
-        if enhanced_count > 0:
-            wb3.save(path3)
-            print(f"\n✅ 已保存附件3，共处理 {processed_count} 行，完善 {enhanced_count} 行")
+                        enhanced_count += 1
+                        print(f"  ✅ 已完善数据组: {new_data_group}")
+                        print(f"  ✅ 已完善数据属性: {new_data_attributes[:50]}...")
+                    else:
+                        print(f"  ✓ 数据组和属性已完善，无需修改")
+        
+        except BaseException:
+            # 中断或出错时先保住已生成的结果
+            checkpoint.save()
+            raise
+        checkpoint.save()
+
+        if resumed_count:
+            print(f"\n🔁 {resumed_count} 行套用了检查点中的结果，未重新调用大模型")
+        if unchanged_count:
+            print(f"\n⏭️  {unchanged_count} 行输入与上次生成时相同，已跳过")
+        if shared_count:
+            print(f"\n🔗 {shared_count} 行与相同请求共用结果，实际调用大模型 {len(shared_results)} 次")
+        if skipped_count:
+            print(f"\n⚠️  {skipped_count} 行未能调用大模型，已登记待补全")
+
+        # 补全模式只看了部分行，不清理其余行的指纹
+        if only_rows is None:
+            state.prune(seen_fingerprints)
+
+        # 保存文件（行状态有变化或删除了旧版状态工作表时也需要保存）
+        if enhanced_count > 0 or state.dirty or legacy_state is not None:
+            state.write(wb3)
+            if wait_saved(save_workbook(wb3, path3)):
+                checkpoint.clear()
+                print(f"\n✅ 已保存附件3，共处理 {processed_count} 行，完善 {enhanced_count} 行")
+            else:
+                print(f"\n💡 附件3未能保存，生成结果已保留在检查点 {CHECKPOINT_FILE}，下次运行第十二步时直接套用")
         else:
-            print(f"\n✓ 所有 {processed_count} 行数据组和属性都已完善，无需修改")
+            checkpoint.clear()
+            print(f"\n✓ 所有 {processed_count + unchanged_count} 行数据组和属性都已完善，无需修改")
         
         print("✅ 第十二步完成：COSMIC数据组和数据属性已完善")
         
-    except PermissionError:
-        print("⚠️  附件3文件被占用，无法保存。请关闭Excel文档后重试")
     except Exception as e:
         print(f"第十二步执行失败：{e}")
         import traceback
         traceback.print_exc()
 
 
-def main() -> None:
-    print_step("输入变量：统一替换的需求名")
-    requirement_name = input("请输入需求名字（用于重命名与单元格填充）：").strip()
-    if not requirement_name:
-        print("未输入需求名字，程序结束。")
-        return
+def _pipeline_total(ctx: dict) -> float:
+    """第四步的工作量总和；单独执行第五、六步时按需计算"""
+    if "total" not in ctx:
+        ctx["total"] = sum_attachment5_col_L_from_L2()
+    return ctx["total"]
+
+
+# 流水线步骤：(步骤号, 名称, 执行函数)。执行函数接收上下文 dict（需求名、工作量总和等）
+PIPELINE_STEPS: List[Tuple[int, str, Callable[[dict], object]]] = [
+    (0, "初始化附件1和附件2", lambda ctx: initialize_attachments()),
+    (1, "批量重命名", lambda ctx: batch_rename(ctx["requirement_name"])),
+    (2, "附件3 sheet2 A3/B3", lambda ctx: write_attachment3_sheet2_cells(ctx["requirement_name"])),
+    (3, "附件4 B2", lambda ctx: write_attachment4_cells(ctx["requirement_name"])),
+    (4, "计算附件5 L列总和", _pipeline_total),
+    (5, "附件4 D7 = 总和", lambda ctx: write_attachment4_with_sum(_pipeline_total(ctx))),
+    (6, "附件3 sheet2 F3 = 总和", lambda ctx: write_attachment3_sheet2_F3_with_sum(_pipeline_total(ctx))),
+    (7, "附件4 C6 = 今天日期", lambda ctx: write_attachment4_C6_with_today()),
+    (8, "附件4 B7 = 附件3 sheet2 E3", lambda ctx: write_attachment4_B7_from_attachment3_E3()),
+    (9, "附件4 A4 = 附件5 H和I列内容概述", lambda ctx: summarize_requirement_content_and_update_h4()),
+    (10, "更新WBS文档", lambda ctx: update_wbs_document()),
+    (11, "生成项目文档并更新附件1", lambda ctx: step11_generate_and_update_project_docs()),
+    (12, "完善COSMIC数据组和数据属性",
+     lambda ctx: step12_enhance_cosmic_data_groups_and_attributes(BACKFILL.rows(12) if ctx["backfill"] else None)),
+]
+
+ALL_STEPS = [number for number, _label, _fn in PIPELINE_STEPS]
+
+# 需要需求名字的步骤
+STEPS_NEEDING_NAME = {1, 2, 3}
+
+# 需要调用大模型（依赖 config.py 中的接口配置）的步骤
+STEPS_NEEDING_LLM = {9, 10, 11, 12}
+
+
+def parse_step_selection(text: str) -> List[int]:
+    """解析步骤选择，例如 "4-8"、"2,5,9-12"；返回排序后的步骤号列表"""
+    selected = set()
+    for part in str(text).replace("，", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+            if start > end:
+                raise ValueError(f"步骤范围起点大于终点：{part}")
+            selected.update(range(start, end + 1))
+        else:
+            selected.add(int(part))
+    if not selected:
+        raise ValueError(f"未选择任何步骤：{text!r}")
+    unknown = selected - set(ALL_STEPS)
+    if unknown:
+        raise ValueError(f"未知的步骤：{sorted(unknown)}，可选 {ALL_STEPS[0]}-{ALL_STEPS[-1]}")
+    return sorted(selected)
 
-    # 0) 初始化附件1和附件2，清理之前的生成内容
-    initialize_attachment1()
-    initialize_attachment2()
 
-    # 1) 批量重命名
-    batch_rename(requirement_name)
+def step_label(number: int) -> str:
+    return next(f"{n} {label}" for n, label, _fn in PIPELINE_STEPS if n == number)
 
-    # 2) 附件3 sheet2 A3/B3
-    write_attachment3_sheet2_cells(requirement_name)
 
-    # 3) 附件4 B2
-    write_attachment4_cells(requirement_name)
+def prewarm_manual_summary() -> str:
+    # 预热线程与前面的步骤并行，其中的大模型调用仍记到第十一步名下
+    with step_scope(step_label(11), thread_only=True):
+        return get_manual_summary()
 
-    # 4) 计算附件5 L列总和
-    total = sum_attachment5_col_L_from_L2()
 
-    # 5) 附件4 D7 = total
-    write_attachment4_with_sum(total)
+def start_prewarm(steps: Optional[List[int]] = None) -> None:
+    """在后台提前准备第十步的功能点码值、第十一步的手册摘要，并建立到接口主机的连接"""
+    selected = set(steps if steps is not None else ALL_STEPS)
+    if 10 in selected:
+        PREWARMER.start("function_codes", load_function_codes)
+    if CONFIG_LOADED and 11 in selected:
+        PREWARMER.start("manual_summary", prewarm_manual_summary)
+    if CONFIG_LOADED and selected & STEPS_NEEDING_LLM:
+        PREWARMER.start("connection", LLM_CLIENT.warm_up)
 
-    # 6) 附件3 sheet2 F3 = total
-    write_attachment3_sheet2_F3_with_sum(total)
 
-    # 7) 附件4 C6 = 今天日期
-    write_attachment4_C6_with_today()
+def run_steps(requirement_name: str, steps: Optional[List[int]] = None, backfill: bool = False) -> dict:
+    """
+    按顺序执行选中的步骤（默认全部），返回上下文（包含工作量总和等中间结果）。
+    backfill 为 True 时第十二步只重新生成登记为待补全的行。
+    """
+    global BACKFILL, TEMPLATES
+    ctx: dict = {"requirement_name": requirement_name, "backfill": backfill}
+    BACKFILL = BackfillRegistry.load(os.path.join(DATA_DIR, BACKFILL_FILE))
+    TEMPLATES = TemplateStore(os.path.join(DATA_DIR, TEMPLATE_DIR), read_only=DRY_RUN_STORE is not None)
+    TEMPLATES.begin_run({number: find_attachment_by_number(number) for number in (1, 2)})
+    clear_document_sessions()
+    try:
+        for number, label, fn in PIPELINE_STEPS:
+            if steps is not None and number not in steps:
+                continue
+            run_step(step_label(number), fn, ctx)
+    finally:
+        clear_document_sessions()
+        BACKFILL.print_summary()
+        if DRY_RUN_STORE is None:
+            BACKFILL.save()
+
+    # 等待后台保存全部落盘
+    ctx["saved"] = SAVE_SERVICE.flush_and_report()
+    if ctx["saved"] and DRY_RUN_STORE is None:
+        TEMPLATES.end_run({number: find_attachment_by_number(number) for number in (1, 2)})
+    if ctx["saved"] and DRY_RUN_STORE is None and PORTFOLIO_INDEX is not None:
+        update_portfolio_index()
+    return ctx
+
+
+def run_pipeline(requirement_name: Optional[str] = None, steps: Optional[List[int]] = None,
+                 backfill: bool = False) -> None:
+    needs_name = STEPS_NEEDING_NAME & set(steps if steps is not None else ALL_STEPS)
+    if needs_name:
+        if requirement_name is None:
+            print_step("输入变量：统一替换的需求名")
+            requirement_name = input("请输入需求名字（用于重命名与单元格填充）：").strip()
+        requirement_name = requirement_name.strip()
+        if not requirement_name:
+            print("未输入需求名字，程序结束。")
+            return
+
+    ctx = run_steps(requirement_name or "", steps, backfill)
+    if not ctx["saved"]:
+        print("⚠️  部分文件保存失败，请检查后重新运行")
+        return
 
-    # 8) 附件4 B7 = 附件3 sheet2 E3
-    write_attachment4_B7_from_attachment3_E3()
+    print_step("全部步骤完成" if steps is None else f"所选步骤完成：{', '.join(str(n) for n in steps)}")
 
-    # 9) 附件4 A4 = 附件5 H和I列内容概述
-    summarize_requirement_content_and_update_h4()
 
-    # 10) 更新WBS文档
-    update_wbs_document()
+SUBCOMMANDS = ("run", "serve", "watch", "report", "index")
 
-    # 11) 生成项目文档并更新附件1
-    step11_generate_and_update_project_docs()
 
-    # 12) 完善COSMIC数据组和数据属性
-    step12_enhance_cosmic_data_groups_and_attributes()
+def _parse_date(text: str) -> date:
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD：{text}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="附件批量处理程序")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="执行流水线（默认全部步骤）")
+    run_parser.add_argument("--steps", help="只执行选中的步骤，例如 4-8 或 2,5,9-12（步骤 0-12）")
+    run_parser.add_argument("--name", help="需求名字；所选步骤需要且未提供时交互输入")
+    run_parser.add_argument("--data-dir", help="附件目录，默认使用 config.py 中的 DATA_DIR")
+    run_parser.add_argument("--dry-run", action="store_true",
+                            help="试运行：所有读写只作用于内存副本，结束时输出单元格/段落差异，磁盘文件不变")
+    run_parser.add_argument("--memory-profile", action="store_true",
+                            help="统计每个步骤的峰值/净内存分配、主要分配位置及每次加载文件前后的 RSS")
+    run_parser.add_argument("--memory-json", help="将内存统计保存为 JSON 文件（隐含 --memory-profile）")
+    run_parser.add_argument("--startup-profile", action="store_true", help="输出启动与按需导入依赖的耗时")
+    run_parser.add_argument("--backfill", action="store_true",
+                            help="只重新生成上次因大模型不可用而使用默认值或未生成的内容（见附件目录下的 llm_backfill.json）")
+    run_parser.add_argument("--hedge", action="store_true",
+                            help="大模型请求超过所属步骤历史 p95 仍未返回时再发一次相同请求，取先返回的结果")
+    run_parser.add_argument("--hedge-budget", type=float, default=0.05,
+                            help="对冲请求最多占大模型调用次数的比例（另允许 2 次），默认 0.05")
+
+    serve_parser = subparsers.add_parser("serve", help="常驻服务模式，通过本机 HTTP 接口接收作业")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="服务监听地址，默认 127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765, help="服务监听端口，默认 8765")
+
+    watch_parser = subparsers.add_parser("watch", help="监视附件变化，只重新执行受影响的步骤")
+    watch_parser.add_argument("--data-dir", help="附件目录，默认使用 config.py 中的 DATA_DIR")
+    watch_parser.add_argument("--interval", type=float, default=1.0, help="轮询间隔（秒），默认 1")
+    watch_parser.add_argument("--debounce", type=float, default=2.0,
+                              help="文件停止变化多少秒后才处理（防抖），默认 2")
+
+    report_parser = subparsers.add_parser("report", help="按步骤汇总大模型调用的耗时与 token 用量")
+    report_parser.add_argument("--since", type=_parse_date, help="起始日期 YYYY-MM-DD，默认 7 天前")
+    report_parser.add_argument("--until", type=_parse_date, help="结束日期 YYYY-MM-DD（含当天），默认今天")
+    report_parser.add_argument("--db", default=TELEMETRY_DB, help="遥测库路径，默认为程序目录下的 llm_telemetry.db")
+
+    index_parser = subparsers.add_parser("index", help="批量索引已有附件目录的功能点与工作量到跨需求包索引库")
+    index_parser.add_argument("paths", nargs="*", help="要索引的目录（递归查找附件目录），默认使用 DATA_DIR")
+    index_parser.add_argument("--db", default=PORTFOLIO_DB, help="索引库路径，默认为程序目录下的 portfolio_index.db")
+    index_parser.add_argument("--force", action="store_true", help="附件未变化的目录也重新索引")
+    index_parser.add_argument("--summary", action="store_true", help="索引后按一级模块汇总工作量")
+    index_parser.add_argument("--since", type=_parse_date, help="汇总起始日期 YYYY-MM-DD，默认本季度第一天")
+    index_parser.add_argument("--until", type=_parse_date, help="汇总结束日期 YYYY-MM-DD（含当天），默认今天")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # 兼容旧用法：不带子命令时等同于 run
+    if not argv or argv[0] not in SUBCOMMANDS and argv[0] not in ("-h", "--help"):
+        argv.insert(0, "run")
+    return parser.parse_args(argv)
+
+
+def require_config(steps: Optional[List[int]]) -> bool:
+    """所选步骤需要调用大模型但缺少 config.py 时提示并返回 False"""
+    needs_llm = STEPS_NEEDING_LLM & set(steps if steps is not None else ALL_STEPS)
+    if needs_llm and not CONFIG_LOADED:
+        print("错误：未找到配置文件 config.py")
+        print("请复制 config_template.py 为 config.py 并填入正确的配置信息")
+        print(f"（步骤 {', '.join(str(n) for n in sorted(needs_llm))} 需要调用大模型）")
+        return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    global DATA_DIR, DRY_RUN_STORE, MEMORY_PROFILER, PORTFOLIO_INDEX
+
+    main_uptime = process_uptime()
+    main_start = time.perf_counter()
+    args = parse_args(argv)
+
+    if args.command == "report":
+        until = args.until or date.today()
+        print_report(TelemetryStore(args.db), args.since or until - timedelta(days=7), until)
+        return
 
-    print_step("全部步骤完成")
+    if args.command == "index":
+        index = PortfolioIndex(args.db)
+        index_directories(index, args.paths or [DATA_DIR], args.force)
+        if args.summary:
+            until = args.until or date.today()
+            quarter_start = date(until.year, (until.month - 1) // 3 * 3 + 1, 1)
+            print_workload_by_module(index, args.since or quarter_start, until)
+        return
+
+    LLM_CLIENT.telemetry = TelemetryStore(TELEMETRY_DB)
+    PORTFOLIO_INDEX = PortfolioIndex(PORTFOLIO_DB)
+    if args.command == "serve":
+        from service import serve
+
+        serve(sys.modules[__name__], args.host, args.port)
+        return
+    if args.command == "watch":
+        from watch import watch
+
+        if args.data_dir:
+            DATA_DIR = args.data_dir
+        watch(sys.modules[__name__], args.interval, args.debounce)
+        return
+
+    try:
+        steps = parse_step_selection(args.steps) if args.steps else None
+    except ValueError as e:
+        print(f"错误：{e}")
+        exit(2)
+    if not require_config(steps):
+        exit(1)
+
+    if args.data_dir:
+        DATA_DIR = args.data_dir
+    if args.backfill:
+        pending = BackfillRegistry.load(os.path.join(DATA_DIR, BACKFILL_FILE)).steps()
+        steps = [step for step in pending if steps is None or step in steps]
+        if not steps:
+            print("✅ 没有待补全的内容")
+            return
+        print(f"📝 补全模式：重新执行步骤 {', '.join(str(n) for n in steps)}")
+    if args.dry_run:
+        DRY_RUN_STORE = DryRunStore()
+        print("🧪 试运行模式：不会修改磁盘上的任何附件")
+    if args.memory_profile or args.memory_json:
+        MEMORY_PROFILER = MemoryProfiler()
+    if args.hedge:
+        LLM_CLIENT.hedge_budget = HedgeBudget(args.hedge_budget)
+    if args.startup_profile:
+        print_startup_report(MODULE_IMPORT_SECONDS, main_uptime, time.perf_counter() - main_start)
+
+    start_prewarm(steps)
+    try:
+        run_pipeline(args.name, steps, args.backfill)
+    finally:
+        PREWARMER.shutdown()
+        if LLM_CLIENT.hedge_budget is not None:
+            budget = LLM_CLIENT.hedge_budget
+            print(f"⏱️  对冲请求 {budget.hedges} 次 / 大模型调用 {budget.calls} 次")
+        if DRY_RUN_STORE is not None:
+            DRY_RUN_STORE.print_report()
+        if MEMORY_PROFILER is not None:
+            MEMORY_PROFILER.print_table()
+            if args.memory_json:
+                MEMORY_PROFILER.save_json(args.memory_json)
+        if args.startup_profile:
+            print_startup_report(MODULE_IMPORT_SECONDS, main_uptime, None)
+
+
+MODULE_IMPORT_SECONDS = time.perf_counter() - _MODULE_IMPORT_START
 
 
 if __name__ == "__main__":
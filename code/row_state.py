@@ -0,0 +1,177 @@
+"""
+第十二步的行状态：每行“F-I 列输入 + 程序写入的 J/K 值”的指纹保存在附件3 的自定义文档属性（docProps/custom.xml）中，
+随附件3 一起复制，也不会出现在任何工作表里。再次运行时，当前内容的指纹已记录的行说明输入未变、
+J/K 仍是上次生成的值，直接跳过；新增或修改过（包括手工改过 J/K）的行才调用大模型。
+在 Excel 的“文件 > 信息 > 属性 > 高级属性 > 自定义”中删除 step12_state 开头的属性即可全部重新生成。
+
+运行过程中的生成结果还会定期写入附件目录下的检查点文件；附件3 保存失败（文件被占用）或进程中断时，
+下次运行先套用检查点中的结果再继续，已付费的调用不会重做。附件3 保存成功后删除检查点。
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from save_service import atomic_write
+from startup_profile import lazy_import
+
+STATE_PROPERTY = "step12_state"
+_FINGERPRINT_LENGTH = 32
+# 每个属性值放 7 个指纹（224 个字符），不超过 Excel 对属性值长度的限制
+_CHUNK_LENGTH = _FINGERPRINT_LENGTH * 7
+# 早期版本把状态保存在附件3 的这个隐藏工作表中，读取一次后删除
+LEGACY_STATE_SHEET = "_step12_state"
+
+CHECKPOINT_FILE = "step12_checkpoint.json"
+# 新结果累计到该行数或距上次写入超过该秒数时写一次检查点
+CHECKPOINT_EVERY_ROWS = 20
+CHECKPOINT_EVERY_SECONDS = 30.0
+
+
+def row_fingerprint(inputs: Iterable[str]) -> str:
+    """一行内容（调用方先规范化）的指纹"""
+    return hashlib.sha256("\x1f".join(inputs).encode("utf-8")).hexdigest()[:_FINGERPRINT_LENGTH]
+
+
+def pop_legacy_state_sheet(wb) -> Optional[Dict[str, Tuple[str, str]]]:
+    """
+    读取并删除早期版本的隐藏状态工作表：F-I 列输入的指纹 -> (数据组, 数据属性)。
+    没有该工作表时返回 None；删除后需保存工作簿。
+    """
+    if LEGACY_STATE_SHEET not in wb.sheetnames:
+        return None
+    entries = {}
+    for values in wb[LEGACY_STATE_SHEET].iter_rows(min_row=2, values_only=True):
+        if values and values[0]:
+            values = tuple(values) + ("",) * 2
+            entries[str(values[0])] = (str(values[1] or ""), str(values[2] or ""))
+    wb.remove(wb[LEGACY_STATE_SHEET])
+    return entries
+
+
+class RowState:
+    """
+    已生成行的指纹集合，保存在附件3 的自定义文档属性中：STATE_PROPERTY 记录指纹个数，
+    指纹按顺序拼接后分段存入 STATE_PROPERTY_0001、_0002……（Excel 只保留 255 个字符以内的属性值）。
+    """
+
+    def __init__(self, fingerprints: Iterable[str] = ()) -> None:
+        self._fingerprints: Set[str] = set(fingerprints)
+        self.dirty = False
+
+    @classmethod
+    def from_workbook(cls, wb) -> "RowState":
+        """读取工作簿中的状态；没有或不完整（被其他程序截断、改动过）时返回空状态"""
+        props = {prop.name: prop.value for prop in wb.custom_doc_props.props}
+        if STATE_PROPERTY not in props:
+            return cls()
+        chunks = sorted((name for name in props if name.startswith(STATE_PROPERTY + "_")),
+                        key=lambda name: name[len(STATE_PROPERTY) + 1:].zfill(8))
+        data = "".join(str(props[name] or "") for name in chunks)
+        try:
+            count = int(props[STATE_PROPERTY])
+        except (TypeError, ValueError):
+            count = -1
+        if count * _FINGERPRINT_LENGTH != len(data):
+            print("⚠️  附件3 中第十二步的行状态不完整，忽略，所有行重新生成")
+            return cls()
+        return cls(data[i:i + _FINGERPRINT_LENGTH] for i in range(0, len(data), _FINGERPRINT_LENGTH))
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def is_current(self, fingerprint: str) -> bool:
+        """该行当前内容正是上次生成后的样子"""
+        return fingerprint in self._fingerprints
+
+    def record(self, fingerprint: str) -> None:
+        if fingerprint not in self._fingerprints:
+            self._fingerprints.add(fingerprint)
+            self.dirty = True
+
+    def prune(self, keep: Set[str]) -> None:
+        """去掉表中已不存在的行的指纹"""
+        stale = self._fingerprints - keep
+        self._fingerprints -= stale
+        self.dirty = self.dirty or bool(stale)
+
+    def write(self, wb) -> None:
+        """替换工作簿中的状态属性（其他自定义属性保留），随工作簿一起保存"""
+        StringProperty = lazy_import("openpyxl.packaging.custom").StringProperty
+        props = [prop for prop in wb.custom_doc_props.props
+                 if prop.name != STATE_PROPERTY and not prop.name.startswith(STATE_PROPERTY + "_")]
+        data = "".join(sorted(self._fingerprints))
+        props.append(StringProperty(name=STATE_PROPERTY, value=str(len(self._fingerprints))))
+        for number, i in enumerate(range(0, len(data), _CHUNK_LENGTH), 1):
+            props.append(StringProperty(name=f"{STATE_PROPERTY}_{number:04d}", value=data[i:i + _CHUNK_LENGTH]))
+        wb.custom_doc_props.props = props
+        self.dirty = False
+
+
+class Step12Checkpoint:
+    """尚未保存进附件3 的生成结果：请求指纹（F-I 列与现有 J/K）-> (数据组, 数据属性)；path 为 None 时只在内存中（试运行）"""
+
+    def __init__(self, path: Optional[str] = None, every_rows: int = CHECKPOINT_EVERY_ROWS,
+                 every_seconds: float = CHECKPOINT_EVERY_SECONDS) -> None:
+        self.path = path
+        self.every_rows = every_rows
+        self.every_seconds = every_seconds
+        self._results: Dict[str, Tuple[str, str]] = {}
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "Step12Checkpoint":
+        checkpoint = cls(path)
+        if path is None:
+            return checkpoint
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for fingerprint, (data_group, data_attributes) in json.load(f)["results"].items():
+                    checkpoint._results[fingerprint] = (data_group, data_attributes)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️  读取第十二步检查点失败，忽略：{e}")
+        return checkpoint
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, fingerprint: str) -> Optional[Tuple[str, str]]:
+        return self._results.get(fingerprint)
+
+    def add(self, fingerprint: str, data_group: str, data_attributes: str) -> None:
+        self._results[fingerprint] = (data_group, data_attributes)
+        self._unsaved += 1
+        if self._unsaved >= self.every_rows or time.monotonic() - self._saved_at >= self.every_seconds:
+            self.save()
+
+    def save(self) -> None:
+        """写入检查点（原子替换）；失败只提示，不影响本次运行"""
+        if self.path is None or not self._unsaved:
+            return
+        data = json.dumps({"updated_at": datetime.now().isoformat(timespec="seconds"), "results": self._results},
+                          ensure_ascii=False).encode("utf-8")
+        try:
+            atomic_write(self.path, lambda f: f.write(data))
+        except OSError as e:
+            print(f"⚠️  保存第十二步检查点失败：{e}")
+            return
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def clear(self) -> None:
+        """附件3 已保存，删除检查点"""
+        self._results.clear()
+        self._unsaved = 0
+        if self.path is None:
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️  删除第十二步检查点失败：{e}")
@@ -0,0 +1,159 @@
+import atexit
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+
+Writer = Callable[[BinaryIO], None]
+
+
+def _current_umask() -> int:
+    # 只能通过设置来读取 umask；在导入时读取一次，避免运行中与其他线程创建文件相互干扰
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp 创建的临时文件权限为 0600，新文件改用与 open() 相同的默认权限
+_NEW_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def _fsync_directory(directory: str) -> None:
+    """同步目录项，保证重命名在崩溃后仍然可见（Windows 不支持，直接跳过）"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, writer: Writer) -> None:
+    """
+    先写入同目录下的临时文件，fsync 后原子替换目标文件。
+    临时文件以 "." 开头，不会被 parse_attachment_filename 识别为附件。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, _NEW_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+
+
+class SaveService:
+    """
+    后台保存服务：所有保存请求进入同一个写线程，按提交顺序执行，
+    因此同一文件的多次保存严格有序；调用方在重新加载文件前需调用 wait_for。
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[str, Writer, Future]]]" = queue.Queue()
+        self._pending: Dict[str, List[Future]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="save-service", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            path, writer, future = item
+            try:
+                atomic_write(path, writer)
+                future.set_result(path)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, path: str, writer: Writer) -> Future:
+        """提交一次保存；writer 在后台线程中接收临时文件对象并写入完整内容"""
+        key = os.path.abspath(path)
+        future: Future = Future()
+        with self._lock:
+            self._pending.setdefault(key, []).append(future)
+            self._ensure_thread()
+        self._queue.put((path, writer, future))
+        return future
+
+    def _take_pending(self, key: Optional[str] = None) -> List[Tuple[str, Future]]:
+        with self._lock:
+            keys = [key] if key is not None else list(self._pending)
+            taken = []
+            for k in keys:
+                for future in self._pending.pop(k, []):
+                    taken.append((k, future))
+            return taken
+
+    def wait_for(self, path: str) -> None:
+        """等待该文件所有未完成的保存；若有保存失败则抛出第一个异常"""
+        first_error: Optional[BaseException] = None
+        for _key, future in self._take_pending(os.path.abspath(path)):
+            error = future.exception()
+            if error is not None and first_error is None:
+                first_error = error
+        if first_error is not None:
+            raise first_error
+
+    def settle(self, path: str) -> Optional[BaseException]:
+        """等待该文件所有未完成的保存，返回第一个异常；与 wait_for 不同，失败仍留给 flush_and_report 报告"""
+        with self._lock:
+            futures = list(self._pending.get(os.path.abspath(path), []))
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                return error
+        return None
+
+    def flush(self) -> List[Tuple[str, BaseException]]:
+        """等待全部保存完成，返回失败列表 [(路径, 异常)]"""
+        errors = []
+        for key, future in self._take_pending():
+            error = future.exception()
+            if error is not None:
+                errors.append((key, error))
+        return errors
+
+    def flush_and_report(self) -> bool:
+        """等待全部保存完成并打印失败信息，全部成功返回 True"""
+        errors = self.flush()
+        for path, error in errors:
+            if isinstance(error, PermissionError):
+                print(f"⚠️  文件被占用，保存失败：{os.path.basename(path)}。请关闭Excel/Word后重试")
+            else:
+                print(f"⚠️  保存失败：{os.path.basename(path)} - {error}")
+        return not errors
+
+
+SAVE_SERVICE = SaveService()
+atexit.register(SAVE_SERVICE.flush_and_report)
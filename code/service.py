@@ -0,0 +1,259 @@
+"""
+常驻服务模式：进程启动时预热（导入依赖、功能点码值、手册摘要、HTTP 连接池、
+大模型响应缓存），之后通过本机 HTTP 接口接收作业，单个作业不再承担冷启动开销。
+
+接口：
+    GET  /health          服务状态与预热信息
+    POST /jobs            提交作业 {"folder": ..., "requirement_name": ..., "steps": "4-8", "dry_run": false}
+    GET  /jobs            作业列表
+    GET  /jobs/<id>       作业状态、结果和输出日志
+"""
+import io
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from startup_profile import lazy_import
+
+_local = threading.local()
+
+
+class _JobAwareStdout:
+    """作业线程的输出写入该作业的日志，其他线程（HTTP 处理、预热等）照常输出到原 stdout"""
+
+    def __init__(self, target) -> None:
+        self._target = target
+
+    def write(self, text: str) -> int:
+        log = getattr(_local, "log", None)
+        return (log if log is not None else self._target).write(text)
+
+    def flush(self) -> None:
+        if getattr(_local, "log", None) is None:
+            self._target.flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._target, name)
+
+
+class Job:
+    def __init__(self, folder: str, requirement_name: str, steps: Optional[List[int]], dry_run: bool) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.folder = folder
+        self.requirement_name = requirement_name
+        self.steps = steps
+        self.dry_run = dry_run
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.log = io.StringIO()
+
+    def to_dict(self, with_log: bool = False) -> dict:
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "folder": self.folder,
+            "requirement_name": self.requirement_name,
+            "steps": self.steps,
+            "dry_run": self.dry_run,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_s": (self.finished_at - self.started_at) if self.started_at and self.finished_at else None,
+            "result": self.result,
+            "error": self.error,
+        }
+        if with_log:
+            data["log"] = self.log.getvalue()
+        return data
+
+
+class JobRunner:
+    """
+    作业队列：单个工作线程按提交顺序执行作业。
+    流水线使用模块级的 DATA_DIR 等全局状态，因此作业串行执行。
+    """
+
+    def __init__(self, pipeline) -> None:
+        self.pipeline = pipeline
+        self.jobs: Dict[str, Job] = {}
+        self._queue: "queue.Queue[Job]" = queue.Queue()
+        self._lock = threading.Lock()
+        # 只替换一次 sys.stdout，按线程分流；不用 redirect_stdout，以免把其他线程的输出也收进作业日志
+        self._stdout = sys.stdout
+        sys.stdout = _JobAwareStdout(sys.stdout)
+        self._worker = threading.Thread(target=self._run, name="job-runner", daemon=True)
+        self._worker.start()
+
+    def submit(self, folder: str, requirement_name: str, steps: Optional[List[int]], dry_run: bool = False) -> Job:
+        job = Job(folder, requirement_name, steps, dry_run)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """恢复 stdout"""
+        if self._stdout is not None:
+            sys.stdout = self._stdout
+            self._stdout = None
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            self._execute(job)
+
+    def _execute(self, job: Job) -> None:
+        pa = self.pipeline
+        job.status = "running"
+        job.started_at = time.time()
+        previous_data_dir = pa.DATA_DIR
+        _local.log = job.log
+        try:
+            pa.DATA_DIR = job.folder
+            if job.dry_run:
+                pa.DRY_RUN_STORE = pa.DryRunStore()
+            ctx = pa.run_steps(job.requirement_name, job.steps)
+            result = {"total": ctx.get("total"), "saved": ctx.get("saved")}
+            if job.dry_run:
+                result["diff"] = pa.DRY_RUN_STORE.diff()
+            job.result = json.loads(json.dumps(result, ensure_ascii=False, default=str))
+            job.status = "succeeded" if result["saved"] is not False else "failed"
+            if job.status == "failed":
+                job.error = "部分文件保存失败"
+        except BaseException as e:
+            job.log.write(traceback.format_exc())
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            _local.log = None
+            pa.DATA_DIR = previous_data_dir
+            pa.DRY_RUN_STORE = None
+            job.finished_at = time.time()
+
+
+def warm_up(pipeline) -> dict:
+    """
+    预热：导入依赖、手册摘要、备用功能点码值、HTTP 连接，并开启大模型响应缓存。
+    缓存只保存低温度（抽取、匹配类）请求的回复，按最近使用淘汰，条数有上限（见 LLMClient）。
+    """
+    info: dict = {}
+    start = time.perf_counter()
+    for module in ("openpyxl", "docx", "xlrd", "requests"):
+        try:
+            lazy_import(module)
+            info[module] = True
+        except ImportError:
+            info[module] = False
+    pipeline.LLM_CLIENT.cache_enabled = True
+    info["manual_summary_chars"] = len(pipeline.get_manual_summary())
+    info["catalogue_codes"] = len(pipeline.load_catalogue_function_codes())
+    info["connection_warmed"] = pipeline.LLM_CLIENT.warm_up()
+    info["seconds"] = round(time.perf_counter() - start, 3)
+    return info
+
+
+def _make_handler(runner: JobRunner, warm_info: dict):
+    pipeline = runner.pipeline
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            path = self.path.rstrip("/")
+            if path == "/health":
+                self._send_json(200, {
+                    "status": "ok",
+                    "warm": warm_info,
+                    "pending_jobs": runner.pending(),
+                    "llm_cache_entries": pipeline.LLM_CLIENT.cache_size(),
+                })
+            elif path == "/jobs":
+                self._send_json(200, [job.to_dict() for job in runner.list()])
+            elif path.startswith("/jobs/"):
+                job = runner.get(path[len("/jobs/"):])
+                if job is None:
+                    self._send_json(404, {"error": "作业不存在"})
+                else:
+                    self._send_json(200, job.to_dict(with_log=True))
+            else:
+                self._send_json(404, {"error": "未知接口"})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != "/jobs":
+                self._send_json(404, {"error": "未知接口"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                folder = request["folder"]
+                requirement_name = str(request.get("requirement_name") or "").strip()
+                steps = request.get("steps")
+                if isinstance(steps, list):
+                    steps = pipeline.parse_step_selection(",".join(str(step) for step in steps))
+                elif steps:
+                    steps = pipeline.parse_step_selection(steps)
+                else:
+                    steps = None
+            except (KeyError, ValueError, TypeError) as e:
+                self._send_json(400, {"error": f"请求参数错误：{e}"})
+                return
+            needs_name = pipeline.STEPS_NEEDING_NAME & set(steps or pipeline.ALL_STEPS)
+            if needs_name and not requirement_name:
+                self._send_json(400, {"error": f"步骤 {sorted(needs_name)} 需要 requirement_name"})
+                return
+            needs_llm = pipeline.STEPS_NEEDING_LLM & set(steps or pipeline.ALL_STEPS)
+            if needs_llm and not pipeline.CONFIG_LOADED:
+                self._send_json(400, {"error": f"步骤 {sorted(needs_llm)} 需要 config.py 中的大模型接口配置"})
+                return
+            job = runner.submit(folder, requirement_name, steps, bool(request.get("dry_run")))
+            self._send_json(202, job.to_dict())
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return Handler
+
+
+def serve(pipeline, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """启动常驻服务；pipeline 为已加载的 process_attachments 模块"""
+    print("🔥 正在预热缓存...")
+    warm_info = warm_up(pipeline)
+    print(f"✅ 预热完成：{json.dumps(warm_info, ensure_ascii=False)}")
+    runner = JobRunner(pipeline)
+    server = ThreadingHTTPServer((host, port), _make_handler(runner, warm_info))
+    print(f"🚀 服务已启动：http://{host}:{port}（POST /jobs 提交作业，GET /jobs/<id> 查询结果）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服务停止")
+    finally:
+        server.server_close()
+        pipeline.SAVE_SERVICE.flush_and_report()
+        runner.close()
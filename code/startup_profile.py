@@ -0,0 +1,48 @@
+import importlib
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+
+# 按需导入的重量级依赖及其首次导入耗时（秒）
+IMPORT_TIMINGS: Dict[str, float] = {}
+
+
+def lazy_import(name: str):
+    """首次使用时才导入模块，并记录导入耗时；ImportError 原样抛出"""
+    loaded = name in sys.modules
+    start = time.perf_counter()
+    # 始终经过 import_module：其他线程正在导入时会等待其完成，而不是拿到未初始化完的模块
+    module = importlib.import_module(name)
+    if not loaded and name not in IMPORT_TIMINGS:
+        IMPORT_TIMINGS[name] = time.perf_counter() - start
+    return module
+
+
+def process_uptime() -> Optional[float]:
+    """进程已运行的秒数（含解释器启动），仅 Linux 可用，精度约 10ms"""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
+
+def print_startup_report(module_import_seconds: float, main_uptime: Optional[float],
+                         first_step_seconds: Optional[float]) -> None:
+    print("==== 启动耗时 ====")
+    if main_uptime is not None:
+        print(f"进程启动到 main()：{main_uptime * 1000:.0f} ms（含解释器启动和模块导入）")
+    print(f"主程序模块导入：{module_import_seconds * 1000:.1f} ms")
+    if first_step_seconds is not None:
+        print(f"main() 到首个步骤开始：{first_step_seconds * 1000:.1f} ms")
+    if IMPORT_TIMINGS:
+        for name, seconds in sorted(IMPORT_TIMINGS.items(), key=lambda item: -item[1]):
+            print(f"按需导入 {name}：{seconds * 1000:.1f} ms")
+    else:
+        print("未导入任何重量级依赖")
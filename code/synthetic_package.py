@@ -0,0 +1,263 @@
+"""
+合成附件包生成器：按可配置的规模伪造一套附件1-5及功能点码值表，
+用于基准测试和大包场景验证，不依赖真实业务数据。
+
+用法：
+    python synthetic_package.py /tmp/synthetic_pkg --cosmic-rows 10000 --ams-rows 50000
+"""
+import argparse
+import os
+import random
+import struct
+import zlib
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+
+LEVEL1_NAMES = ["市场洞察", "任务策划", "任务执行", "任务后评估", "任务调度", "客户管控"]
+MOVEMENT_TYPES = ["E", "R", "X", "W"]
+SECTION_TITLES = [("1.1", "总体描述"), ("1.2", "项目建设目标"), ("1.3", "项目建设必要性"), ("2.3", "存在问题")]
+GENERATED_PREFIXES = ["项目背景和概述：", "主要功能模块：", "具体目标和预期效果：", "现有系统的不足：", "用户使用痛点："]
+WORK_VERBS = ["新增", "优化", "重构", "调整", "修复", "下线"]
+WORK_OBJECTS = ["任务流转页面", "工单查询接口", "摸排审批流程", "企业画像展示", "建筑视角清单", "审核管理TAB", "标签筛选逻辑"]
+
+
+def build_catalogue(size: int) -> List[Tuple[str, str, str]]:
+    """生成 size 个三级功能点码值（一级 -> 二级 -> 三级）"""
+    codes = []
+    level2_per_level1 = max(1, size // (len(LEVEL1_NAMES) * 10))
+    index = 0
+    while len(codes) < size:
+        level1 = LEVEL1_NAMES[index % len(LEVEL1_NAMES)]
+        level2 = f"{level1}子模块{(index // len(LEVEL1_NAMES)) % level2_per_level1 + 1}"
+        codes.append((level1, level2, f"功能点{index + 1:05d}"))
+        index += 1
+    codes.sort()
+    return codes
+
+
+def make_png(width: int, height: int, rng: random.Random) -> bytes:
+    """生成一张随机像素的 PNG（随机数据压缩率低，用来模拟真实截图的体积）"""
+    raw = b"".join(b"\x00" + bytes(rng.getrandbits(8) for _ in range(width * 3)) for _ in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def write_attachment1(path: str, requirement_name: str, paragraphs: int, images: int, rng: random.Random) -> None:
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document()
+    doc.add_paragraph(f"{requirement_name}分析")
+    for section_num, section_name in SECTION_TITLES:
+        doc.add_paragraph(f"{section_num} {section_name}\t5")
+    image_every = max(1, paragraphs // images) if images else 0
+    png = [make_png(160, 120, rng) for _ in range(min(images, 5))]
+    body_per_section = max(1, paragraphs // len(SECTION_TITLES))
+    written = 0
+    for section_num, section_name in SECTION_TITLES:
+        doc.add_heading(f"{section_name}（添加标识）", level=2)
+        # 模拟上一次运行遗留的生成内容
+        for i, prefix in enumerate(GENERATED_PREFIXES[:3], 1):
+            doc.add_paragraph(f"{i}. {prefix}这是之前自动生成的{section_name}内容，需要在初始化时清理。")
+        for _ in range(body_per_section):
+            doc.add_paragraph(f"{rng.choice(WORK_VERBS)}{rng.choice(WORK_OBJECTS)}，保证{section_name}相关业务正常运行。")
+            written += 1
+            if image_every and written % image_every == 0 and written // image_every <= images:
+                doc.add_picture(BytesIO(png[(written // image_every) % len(png)]), width=Inches(2))
+    doc.save(path)
+
+
+def write_attachment2(path: str) -> None:
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "WBS工作量分解表"
+    headers = ["编号", "一级需求名称/一级功能模块名称", "二级需求名称/二级功能模块名称",
+               "三级需求名称/三级功能模块名称", "功能描述", "预估工作量（人天）"]
+    for col, header in enumerate(headers, 1):
+        ws.cell(1, col).value = header
+    wb.save(path)
+
+
+def write_attachment3(path: str, requirement_name: str, rows: int, codes: List[Tuple[str, str, str]],
+                      rng: random.Random) -> None:
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    notes = wb.active
+    notes.title = "填写注意事项"
+    notes["A1"] = "填写注意事项"
+
+    info = wb.create_sheet("项目基本信息")
+    for col, header in enumerate(["IT需求工单", "项目名称", "厂家", "项目所属IT系统分类", "送审功能点", "送审人天"], 1):
+        info.cell(1, col).value = header
+    info["A3"] = requirement_name
+    info["B3"] = requirement_name
+    info["E3"] = "=COUNTA(COSMIC功能点拆分表!K:K)"
+
+    arch = wb.create_sheet("系统功能架构图")
+    arch["A1"] = "1、建设目标（必填）"
+    arch["A4"] = "2、建设必要性（必填）"
+
+    ws = wb.create_sheet("COSMIC功能点拆分表")
+    ws["A1"], ws["F1"], ws["L1"] = "度量策略阶段", "映射阶段", "度量阶段"
+    for col, header in zip("ABEFGHIJKL", ["客户需求", "功能用户需求", "功能用户", "触发事件", "功能过程",
+                                          "子过程描述", "数据移动类型", "数据组", "数据属性", "CFP"]):
+        ws[f"{col}2"] = header
+    ws["B3"], ws["C3"], ws["D3"] = "一级模块", "二级模块", "三级模块"
+
+    rows_per_code = max(1, rows // max(1, len(codes)))
+    previous = ("", "", "")
+    for offset in range(rows):
+        row = offset + 4
+        level1, level2, level3 = codes[min(offset // rows_per_code, len(codes) - 1)]
+        # 与真实表一致：一二级只在变化时填写，其余行留空由读取方向下继承
+        if level1 != previous[0]:
+            ws.cell(row, 2).value = level1
+        if (level1, level2) != previous[:2]:
+            ws.cell(row, 3).value = level2
+        if (level1, level2, level3) != previous:
+            ws.cell(row, 4).value = level3
+        previous = (level1, level2, level3)
+        movement = MOVEMENT_TYPES[offset % len(MOVEMENT_TYPES)]
+        ws.cell(row, 6).value = f"用户操作{level3}"
+        ws.cell(row, 7).value = f"处理{level3}"
+        # 模板化的子过程描述：大量行在不同功能间重复
+        ws.cell(row, 8).value = f"{rng.choice(WORK_VERBS)}{rng.choice(WORK_OBJECTS)}数据"
+        ws.cell(row, 9).value = movement
+        ws.cell(row, 10).value = f"{level3}数据组"
+        ws.cell(row, 11).value = "编号、名称、状态、更新时间"
+        ws.cell(row, 12).value = 1
+
+    settings = wb.create_sheet("settings")
+    settings["A1"], settings["B1"] = "key", "val"
+    wb.save(path)
+
+
+def write_attachment4(path: str, requirement_name: str) -> None:
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "工作量送审表"
+    ws["A2"], ws["B2"] = "项目名称", requirement_name
+    ws["A4"] = "内容概述："
+    ws["A6"] = "送审时间"
+    ws["A7"], ws["C7"] = "送审功能点", "送审人天"
+    wb.save(path)
+
+
+AMS_HEADERS = ["业务场景", "用户故事", "功能描述", "业务规则", "支撑产品", "类别", "开发单元",
+               "开发单元说明", "工作项内容", "复杂程度", "修改/新增", "工作量(请填入数字，单位：天)",
+               "负责人ID", "负责人", "备注"]
+
+
+def _ams_row(index: int, rng: random.Random) -> List[object]:
+    text = f"{rng.choice(WORK_VERBS)}{rng.choice(WORK_OBJECTS)}（第{index % 500 + 1}项）"
+    workload = rng.choice([0.5, 1.0, 1.5, 2.0, 3.0])
+    if index % 97 == 0:
+        workload = ""  # 模拟空单元格
+    return ["场景", "用户故事", text, text, "政企经营沙盘", "前台相关", "前台界面", text, text + "，输出页面",
+            "中", "新增", workload, f"user{index % 50}", "负责人", ""]
+
+
+def write_attachment5(path: str, rows: int, rng: random.Random) -> str:
+    """优先写 .xls（与真实附件一致）；未安装 xlwt 时改写 .xlsx 并返回实际路径"""
+    try:
+        import xlwt  # type: ignore
+    except Exception:
+        xlwt = None
+
+    if xlwt is not None:
+        book = xlwt.Workbook()
+        sheet = book.add_sheet("ams")
+        for col, header in enumerate(AMS_HEADERS):
+            sheet.write(0, col, header)
+        for index in range(rows):
+            for col, value in enumerate(_ams_row(index, rng)):
+                sheet.write(index + 1, col, value)
+        book.save(path)
+        return path
+
+    from openpyxl import Workbook
+
+    print("ℹ️  未安装 xlwt，附件5改为生成 .xlsx")
+    path = os.path.splitext(path)[0] + ".xlsx"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("ams")
+    ws.append(AMS_HEADERS)
+    for index in range(rows):
+        ws.append(_ams_row(index, rng))
+    wb.save(path)
+    return path
+
+
+def write_catalogue(path: str, codes: List[Tuple[str, str, str]]) -> None:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("功能点")
+    ws.append(["一级功能点", "二级功能点", "三级功能点"])
+    previous = ("", "", "")
+    for level1, level2, level3 in codes:
+        ws.append([level1 if level1 != previous[0] else None,
+                   level2 if (level1, level2) != previous[:2] else None,
+                   level3])
+        previous = (level1, level2, level3)
+    wb.save(path)
+
+
+def generate_package(out_dir: str, requirement_name: str = "合成压测需求", cosmic_rows: int = 10000,
+                     ams_rows: int = 50000, doc_paragraphs: int = 2000, doc_images: int = 20,
+                     catalogue_size: int = 5000, seed: int = 0) -> Dict[str, str]:
+    """在 out_dir 下生成一套附件，返回 {名称: 路径}"""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    codes = build_catalogue(catalogue_size)
+
+    def attachment(number: int, attribute: str, ext: str) -> str:
+        return os.path.join(out_dir, f"附件{number}-{requirement_name}@{attribute}{ext}")
+
+    paths = {
+        "附件1": attachment(1, "需求规格说明书", ".docx"),
+        "附件2": attachment(2, "WBS工作量分解表", ".xlsx"),
+        "附件3": attachment(3, "COSMIC工作量评估基础表", ".xlsx"),
+        "附件4": attachment(4, "工作量送审表", ".xlsx"),
+        "附件5": attachment(5, "ams工作量", ".xls"),
+        "功能点码值": os.path.join(out_dir, "一二三级功能点.xlsx"),
+    }
+    write_attachment1(paths["附件1"], requirement_name, doc_paragraphs, doc_images, rng)
+    write_attachment2(paths["附件2"])
+    write_attachment3(paths["附件3"], requirement_name, cosmic_rows, codes, rng)
+    write_attachment4(paths["附件4"], requirement_name)
+    paths["附件5"] = write_attachment5(paths["附件5"], ams_rows, rng)
+    write_catalogue(paths["功能点码值"], codes)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成合成附件包")
+    parser.add_argument("out_dir", help="输出目录")
+    parser.add_argument("--name", default="合成压测需求", help="需求名字")
+    parser.add_argument("--cosmic-rows", type=int, default=10000, help="COSMIC功能点拆分表数据行数")
+    parser.add_argument("--ams-rows", type=int, default=50000, help="附件5 AMS 工作项行数")
+    parser.add_argument("--doc-paragraphs", type=int, default=2000, help="附件1正文段落数")
+    parser.add_argument("--doc-images", type=int, default=20, help="附件1嵌入图片数")
+    parser.add_argument("--catalogue-size", type=int, default=5000, help="功能点码值条数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    paths = generate_package(args.out_dir, args.name, args.cosmic_rows, args.ams_rows,
+                             args.doc_paragraphs, args.doc_images, args.catalogue_size, args.seed)
+    for name, path in paths.items():
+        print(f"✅ {name}: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+大模型调用遥测：每次调用记录所属步骤、模型、提示词哈希、耗时、HTTP 状态码、重试次数、是否命中缓存，
+以及响应 usage 中的提示/补全/缓存命中 token 数，写入本地 SQLite。
+
+`report` 子命令按步骤汇总一段日期内的 p50/p95 耗时和 token 用量，用来判断优化投入在哪一步最划算。
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from startup_profile import lazy_import
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    step TEXT NOT NULL,
+    model TEXT,
+    prompt_hash TEXT,
+    latency_ms REAL,
+    http_status INTEGER,
+    retries INTEGER NOT NULL DEFAULT 0,
+    cache_hit INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cached_tokens INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS llm_calls_created_at ON llm_calls (created_at);
+"""
+
+_COLUMNS = ("created_at", "step", "model", "prompt_hash", "latency_ms", "http_status", "retries",
+            "cache_hit", "prompt_tokens", "completion_tokens", "cached_tokens", "error")
+
+# 不在任何步骤内的调用记到该名下
+NO_STEP = "(步骤外)"
+
+_local = threading.local()
+_current_step: Optional[str] = None
+
+
+@contextmanager
+def step_scope(step: str, thread_only: bool = False) -> Iterator[None]:
+    """
+    之后的大模型调用记到 step 名下。默认对所有线程生效（步骤内线程池发起的调用也算该步骤）；
+    thread_only=True 只对当前线程生效，用于与步骤并行执行的预热任务。
+    """
+    global _current_step
+    if thread_only:
+        previous, _local.step = getattr(_local, "step", None), step
+    else:
+        previous, _current_step = _current_step, step
+    try:
+        yield
+    finally:
+        if thread_only:
+            _local.step = previous
+        else:
+            _current_step = previous
+
+
+def current_step() -> str:
+    return getattr(_local, "step", None) or _current_step or NO_STEP
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def usage_tokens(usage: Optional[dict]) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """从 usage 中取 (提示, 补全, 缓存命中) token 数；兼容 DeepSeek 与 OpenAI 的缓存字段"""
+    if not usage:
+        return None, None, None
+    cached = usage.get("prompt_cache_hit_tokens")
+    if cached is None:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    return usage.get("prompt_tokens"), usage.get("completion_tokens"), cached
+
+
+class TelemetryStore:
+    """SQLite 中的调用记录；写入失败只提示一次，不影响大模型调用本身"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._disabled = False
+
+    def _connection(self):
+        if self._conn is None:
+            sqlite3 = lazy_import("sqlite3")
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def record(self, step: str, model: str, prompt: str, latency_ms: float, http_status: Optional[int] = None,
+               retries: int = 0, cache_hit: bool = False, usage: Optional[dict] = None,
+               error: Optional[str] = None) -> None:
+        if self._disabled:
+            return
+        prompt_tokens, completion_tokens, cached_tokens = usage_tokens(usage)
+        values = (datetime.now().isoformat(timespec="milliseconds"), step, model, prompt_hash(prompt),
+                  round(latency_ms, 1), http_status, retries, int(cache_hit),
+                  prompt_tokens, completion_tokens, cached_tokens, error)
+        with self._lock:
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.execute(f"INSERT INTO llm_calls ({', '.join(_COLUMNS)}) "
+                                 f"VALUES ({', '.join('?' * len(_COLUMNS))})", values)
+            except Exception as e:
+                self._disabled = True
+                print(f"⚠️  写入调用遥测失败，本次运行不再记录：{e}")
+
+    def rows(self, since: date, until: date) -> List[Dict]:
+        """[since, until] 日期范围内（含两端）的调用记录"""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM llm_calls WHERE created_at >= ? AND created_at < ? ORDER BY id",
+                (since.isoformat(), (until + timedelta(days=1)).isoformat()))
+            return [dict(zip(_COLUMNS, row)) for row in cursor]
+
+    def recent_latencies(self, per_step: int) -> Dict[str, List[float]]:
+        """每个步骤最近 per_step 次成功的远程调用耗时（毫秒），读取失败时返回空"""
+        try:
+            with self._lock:
+                cursor = self._connection().execute(
+                    "SELECT step, latency_ms FROM ("
+                    " SELECT step, latency_ms, ROW_NUMBER() OVER (PARTITION BY step ORDER BY id DESC) AS n"
+                    " FROM llm_calls WHERE error IS NULL AND cache_hit = 0 AND latency_ms IS NOT NULL"
+                    ") WHERE n <= ? ORDER BY n DESC", (per_step,))
+                rows = cursor.fetchall()
+        except Exception as e:
+            print(f"⚠️  读取历史调用耗时失败：{e}")
+            return {}
+        latencies: Dict[str, List[float]] = {}
+        for step, latency_ms in rows:
+            latencies.setdefault(step, []).append(latency_ms)
+        return latencies
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """最近秩法百分位数，values 为空时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def _step_sort_key(step: str) -> Tuple[int, str]:
+    number = step.split(" ", 1)[0]
+    return (int(number), step) if number.isdigit() else (1 << 30, step)
+
+
+def summarize(rows: List[Dict]) -> List[Dict]:
+    """按步骤汇总；耗时百分位只含成功的远程调用（不含命中本地缓存和失败的调用），token 百分位为每次调用的提示+补全 token"""
+    by_step: Dict[str, List[Dict]] = {}
+    for row in rows:
+        by_step.setdefault(row["step"], []).append(row)
+
+    summary = []
+    for step in sorted(by_step, key=_step_sort_key):
+        calls = by_step[step]
+        remote = [row for row in calls if not row["cache_hit"]]
+        # 与 recent_latencies 一致只统计成功的调用：熔断的立即失败（约 0ms）和超时都会扭曲百分位
+        latencies = [row["latency_ms"] for row in remote if row["error"] is None and row["latency_ms"] is not None]
+        totals = [(row["prompt_tokens"] or 0) + (row["completion_tokens"] or 0)
+                  for row in remote if row["prompt_tokens"] is not None or row["completion_tokens"] is not None]
+        summary.append({
+            "step": step,
+            "calls": len(calls),
+            "cache_hits": len(calls) - len(remote),
+            "errors": sum(1 for row in calls if row["error"]),
+            "retries": sum(row["retries"] or 0 for row in calls),
+            "latency_p50_ms": percentile(latencies, 50),
+            "latency_p95_ms": percentile(latencies, 95),
+            "tokens_p50": percentile(totals, 50),
+            "tokens_p95": percentile(totals, 95),
+            "prompt_tokens": sum(row["prompt_tokens"] or 0 for row in calls),
+            "completion_tokens": sum(row["completion_tokens"] or 0 for row in calls),
+            "cached_tokens": sum(row["cached_tokens"] or 0 for row in calls),
+        })
+    return summary
+
+
+def _seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value / 1000:.2f}"
+
+
+def _count(value: Optional[float]) -> str:
+    return "-" if value is None else f"{int(value)}"
+
+
+def print_report(store: TelemetryStore, since: date, until: date) -> None:
+    rows = store.rows(since, until)
+    print(f"📊 大模型调用统计 {since.isoformat()} ~ {until.isoformat()}（{store.path}）")
+    if not rows:
+        print("   该时间段内没有调用记录")
+        return
+    header = ("步骤", "调用", "缓存", "失败", "重试", "耗时p50(s)", "耗时p95(s)",
+              "tokens/次 p50", "tokens/次 p95", "提示tokens", "补全tokens", "缓存命中tokens")
+    table = [header]
+    for item in summarize(rows):
+        table.append((item["step"], str(item["calls"]), str(item["cache_hits"]), str(item["errors"]),
+                      str(item["retries"]), _seconds(item["latency_p50_ms"]), _seconds(item["latency_p95_ms"]),
+                      _count(item["tokens_p50"]), _count(item["tokens_p95"]), str(item["prompt_tokens"]),
+                      str(item["completion_tokens"]), str(item["cached_tokens"])))
+    widths = [max(_display_width(row[i]) for row in table) for i in range(len(header))]
+    for row in table:
+        print("  ".join(cell + " " * (width - _display_width(cell)) for cell, width in zip(row, widths)).rstrip())
+
+
+def _display_width(text: str) -> int:
+    """终端显示宽度：中文等全角字符占两列"""
+    return sum(2 if ord(char) > 0x2E7F else 1 for char in text)
@@ -0,0 +1,132 @@
+"""
+附件模板库：附件目录下的 .templates 中保存附件1-4 的原始骨架，第〇步直接用模板覆盖输出文件，
+不再逐段扫描删除上次生成的内容、逐格清空附件2。
+
+- 附件1、2：清理后的干净版本作为模板。只有当前文件仍是上次运行结束时程序写出的版本
+  （大小和修改时间与记录一致）时才用模板覆盖；文件被手工修改或替换过时，照旧清理，并用清理结果更新模板。
+- 附件3、4 含有人工填写的输入，不覆盖；只在文件缺失时从模板补回。
+
+复制时优先使用写时复制（Linux 上的 FICLONE，文件系统不支持时退回普通复制），耗时与文档内容无关。
+"""
+import json
+import os
+import shutil
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from save_service import atomic_write
+
+TEMPLATE_DIR = ".templates"
+_MANIFEST = "manifest.json"
+# linux/fs.h: FICLONE = _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+
+def clone_into(f: BinaryIO, source: str) -> None:
+    """把 source 的内容写入已打开的文件 f：能写时复制就共享数据块，否则逐块复制"""
+    with open(source, "rb") as src:
+        try:
+            import fcntl
+
+            f.flush()
+            fcntl.ioctl(f.fileno(), _FICLONE, src.fileno())
+            f.seek(0, os.SEEK_END)
+            return
+        except (ImportError, OSError, AttributeError):
+            pass
+        shutil.copyfileobj(src, f, 1024 * 1024)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class TemplateStore:
+    """
+    一个附件目录的模板库。manifest 记录每个附件的模板文件名（附件x@属性.扩展名）
+    以及上次运行结束时输出文件的签名；read_only 为 True 时只读取已有模板（试运行）。
+    """
+
+    def __init__(self, directory: str, read_only: bool = False) -> None:
+        self.directory = directory
+        self.read_only = read_only
+        self._templates: Dict[str, str] = {}
+        self._outputs: Dict[str, Tuple[int, int]] = {}
+        # 本次运行中仍由程序掌握内容的附件（开始时签名与记录一致，或第〇步刚从模板恢复/清理过）
+        self._custody: Dict[int, bool] = {}
+        try:
+            with open(os.path.join(directory, _MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            self._templates = dict(manifest.get("templates", {}))
+            self._outputs = {key: tuple(value) for key, value in manifest.get("outputs", {}).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️  读取模板库记录失败，忽略：{e}")
+
+    def template_path(self, number: int) -> Optional[str]:
+        name = self._templates.get(str(number))
+        if name is None:
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+    def template_attribute(self, number: int) -> Optional[Tuple[str, str]]:
+        """模板对应的 (属性, 扩展名)，用于补回缺失的附件时拼出文件名"""
+        name = self._templates.get(str(number))
+        if name is None:
+            return None
+        base, ext = os.path.splitext(name)
+        return base.split("@", 1)[1] if "@" in base else "", ext
+
+    def begin_run(self, paths: Dict[int, Optional[str]]) -> None:
+        """记录哪些输出文件自上次运行结束后没被动过"""
+        self._custody = {number: path is not None and self._outputs.get(str(number)) == file_signature(path)
+                         for number, path in paths.items()}
+
+    def can_restore(self, number: int) -> bool:
+        return self._custody.get(number, False) and self.template_path(number) is not None
+
+    def take_custody(self, number: int) -> None:
+        self._custody[number] = True
+
+    def capture(self, number: int, source: str, attribute: str) -> None:
+        """把 source 保存为附件 number 的模板"""
+        if self.read_only:
+            return
+        name = f"附件{number}@{attribute}{os.path.splitext(source)[1]}"
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(os.path.join(self.directory, name), lambda f: clone_into(f, source))
+        previous = self._templates.get(str(number))
+        self._templates[str(number)] = name
+        if previous and previous != name:
+            try:
+                os.remove(os.path.join(self.directory, previous))
+            except OSError:
+                pass
+        self._save_manifest()
+
+    def end_run(self, paths: Dict[int, Optional[str]]) -> None:
+        """运行成功结束：记录仍由程序掌握的输出文件的签名，其余的作废"""
+        if self.read_only:
+            return
+        for number, path in paths.items():
+            signature = file_signature(path) if path is not None and self._custody.get(number) else None
+            if signature is None:
+                self._outputs.pop(str(number), None)
+            else:
+                self._outputs[str(number)] = signature
+        if self._templates or self._outputs:
+            self._save_manifest()
+
+    def _save_manifest(self) -> None:
+        data = json.dumps({"templates": self._templates, "outputs": self._outputs},
+                          ensure_ascii=False, indent=2).encode("utf-8")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            atomic_write(os.path.join(self.directory, _MANIFEST), lambda f: f.write(data))
+        except OSError as e:
+            print(f"⚠️  保存模板库记录失败：{e}")
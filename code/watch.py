@@ -0,0 +1,163 @@
+"""
+监视模式：轮询 DATA_DIR 中附件的 stat（修改时间、大小），stat 变化且文件稳定（防抖）后，
+再对相关区域计算内容哈希，只有内容真的变化才重新执行依赖它的步骤，结果立即落盘。
+
+    附件5 L列               -> 步骤 4-6（工作量总和写入附件4 D7、附件3 F3）
+    附件3 COSMIC功能点拆分表 -> 步骤 8（附件3 E3 写入附件4 B7）
+
+步骤自己写回的文件（如第六步写附件3 sheet2）只改变 stat，不改变被监视区域的哈希，因此不会循环触发。
+"""
+import hashlib
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from startup_profile import lazy_import
+
+
+def _hash_rows(rows: Iterable[Iterable[object]]) -> str:
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(repr(tuple(row)).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _attachment5_column_values(path: str, column_index: int) -> List[object]:
+    """附件5 第一个工作表指定列（0 起）从第 2 行开始的值"""
+    if os.path.splitext(path)[1].lower() == ".xls":
+        sheet = lazy_import("xlrd").open_workbook(path).sheet_by_index(0)
+        if column_index >= sheet.ncols:
+            return []
+        return sheet.col_values(column_index, start_rowx=1)
+    wb = lazy_import("openpyxl").load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        return [row[0] for row in ws.iter_rows(min_row=2, min_col=column_index + 1,
+                                               max_col=column_index + 1, values_only=True)]
+    finally:
+        wb.close()
+
+
+def hash_attachment5_col_L(path: str) -> str:
+    return _hash_rows([value] for value in _attachment5_column_values(path, 11))
+
+
+def hash_attachment3_cosmic_sheet(path: str) -> str:
+    wb = lazy_import("openpyxl").load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet_name in wb.sheetnames:
+            if "COSMIC功能点拆分表" in sheet_name:
+                return _hash_rows(wb[sheet_name].iter_rows(values_only=True))
+        return ""
+    finally:
+        wb.close()
+
+
+# 监视规则：(附件编号, 区域说明, 区域哈希函数, 依赖该区域的步骤)
+WATCH_RULES: List[Tuple[int, str, Callable[[str], str], List[int]]] = [
+    (5, "L列", hash_attachment5_col_L, [4, 5, 6]),
+    (3, "COSMIC功能点拆分表", hash_attachment3_cosmic_sheet, [8]),
+]
+
+
+def _stat_signature(path: Optional[str]) -> Optional[Tuple[str, int, int]]:
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+class AttachmentWatcher:
+    """
+    记录每个被监视附件的 stat 与各区域哈希；poll() 返回需要重新执行的步骤，
+    尚在写入中的文件（防抖时间内 stat 仍在变化）或读取失败的文件留到下一轮。
+    """
+
+    def __init__(self, pipeline, debounce: float = 2.0) -> None:
+        self.pipeline = pipeline
+        self.debounce = debounce
+        self._stats: Dict[int, Optional[Tuple[str, int, int]]] = {}
+        self._hashes: Dict[Tuple[int, str], str] = {}
+        self._dirty: Dict[int, float] = {}
+
+    def _numbers(self) -> Set[int]:
+        return {number for number, _region, _fn, _steps in WATCH_RULES}
+
+    def _hash_regions(self, number: int, path: str) -> Dict[Tuple[int, str], str]:
+        return {(number, region): fn(path) for rule_number, region, fn, _steps in WATCH_RULES
+                if rule_number == number}
+
+    def snapshot(self) -> None:
+        """以当前文件内容为基准（启动时调用）"""
+        self._dirty.clear()
+        for number in self._numbers():
+            path = self.pipeline.find_attachment_by_number(number)
+            self._stats[number] = _stat_signature(path)
+            if not path:
+                continue
+            try:
+                self._hashes.update(self._hash_regions(number, path))
+            except Exception as e:
+                print(f"⚠️  读取附件{number}失败，稍后重试：{e}")
+                self._dirty[number] = time.monotonic()
+
+    def poll(self) -> List[Tuple[int, str, List[int]]]:
+        """返回内容已变化的 (附件编号, 区域说明, 依赖步骤)"""
+        now = time.monotonic()
+        for number in self._numbers():
+            signature = _stat_signature(self.pipeline.find_attachment_by_number(number))
+            if signature != self._stats.get(number):
+                self._stats[number] = signature
+                self._dirty[number] = now
+
+        changes: List[Tuple[int, str, List[int]]] = []
+        for number, changed_at in list(self._dirty.items()):
+            if now - changed_at < self.debounce:
+                continue
+            signature = self._stats.get(number)
+            if signature is None:
+                del self._dirty[number]
+                continue
+            try:
+                hashes = self._hash_regions(number, signature[0])
+            except Exception as e:
+                # 文件可能仍被其他程序占用或正在保存，下一轮再读
+                print(f"⚠️  读取附件{number}失败，稍后重试：{e}")
+                self._dirty[number] = now
+                continue
+            del self._dirty[number]
+            for rule_number, region, _fn, steps in WATCH_RULES:
+                key = (rule_number, region)
+                if rule_number == number and hashes.get(key) != self._hashes.get(key):
+                    changes.append((number, region, steps))
+            self._hashes.update(hashes)
+        return changes
+
+
+def watch(pipeline, interval: float = 1.0, debounce: float = 2.0) -> None:
+    """持续监视 pipeline.DATA_DIR，附件内容变化时只重新执行受影响的步骤"""
+    watcher = AttachmentWatcher(pipeline, debounce)
+    watcher.snapshot()
+    print(f"👀 正在监视 {os.path.abspath(pipeline.DATA_DIR)}（轮询 {interval}s，防抖 {debounce}s，Ctrl+C 退出）")
+    for number, region, _fn, steps in WATCH_RULES:
+        print(f"   附件{number} {region} -> 步骤 {', '.join(str(step) for step in steps)}")
+    try:
+        while True:
+            time.sleep(interval)
+            changes = watcher.poll()
+            if not changes:
+                continue
+            steps = sorted({step for _number, _region, rule_steps in changes for step in rule_steps})
+            for number, region, _steps in changes:
+                print(f"🔄 附件{number} {region} 已变化")
+            ctx = pipeline.run_steps("", steps)
+            if ctx["saved"]:
+                print(f"✅ 已重新执行步骤 {', '.join(str(step) for step in steps)} 并写回")
+    except KeyboardInterrupt:
+        print("\n停止监视")
+    finally:
+        pipeline.SAVE_SERVICE.flush_and_report()
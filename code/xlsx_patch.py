@@ -0,0 +1,213 @@
+"""
+直接改写 xlsx 中个别单元格：只重写目标工作表的 XML（以及 workbook.xml 的 calcPr，让 Excel 打开时重新计算），
+其余成员按原始压缩字节复制。不经过 openpyxl，因此不会丢失 openpyxl 不支持的图表、数据验证等内容。
+
+遇到无法安全处理的情况（目标单元格含公式、行没有行号、带命名空间前缀的 XML 等）抛出 XlsxPatchUnsupported，
+由调用方回退到 openpyxl。
+"""
+import io
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from zip_patch import rewrite_zip
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_CELL_REF = re.compile(r"^([A-Z]{1,3})([1-9][0-9]*)$")
+_ROW = re.compile(r"<row\b([^>]*?)(/>|>(.*?)</row>)", re.S)
+_CELL = re.compile(r"<c\b([^>]*?)(/>|>(.*?)</c>)", re.S)
+_ATTR_R = re.compile(r'\br="([^"]*)"')
+_ATTR_S = re.compile(r'\bs="([^"]*)"')
+
+# CT_Workbook 中位于 calcPr 之后的元素，插入 calcPr 时放在它们之前
+_AFTER_CALC_PR = ("oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes",
+                  "webPublishing", "fileRecoveryPr", "webPublishObjects", "extLst")
+
+
+class XlsxPatchUnsupported(Exception):
+    """无法直接改写，需要回退到 openpyxl"""
+
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    match = _CELL_REF.match(ref)
+    if not match:
+        raise XlsxPatchUnsupported(f"无效的单元格地址：{ref}")
+    column = 0
+    for char in match.group(1):
+        column = column * 26 + ord(char) - 64
+    return column, int(match.group(2))
+
+
+def _column_letter(column: int) -> str:
+    letters = ""
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell_xml(ref: str, value: object, style: Optional[str]) -> str:
+    attrs = f'r="{ref}"' + (f' s="{style}"' if style is not None else "")
+    if value is None:
+        return f"<c {attrs}/>"
+    if isinstance(value, bool):
+        return f'<c {attrs} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c {attrs}><v>{value!r}</v></c>"
+    text = str(value)
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c {attrs} t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def _resolve_sheet(zf: zipfile.ZipFile, sheet: Optional[int]) -> Tuple[str, str]:
+    """返回 (工作表名, 工作表 XML 成员名)；sheet 为 None 或超出范围时取活动工作表"""
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    sheets = workbook.findall(f"{{{_NS_MAIN}}}sheets/{{{_NS_MAIN}}}sheet")
+    if not sheets:
+        raise XlsxPatchUnsupported("workbook.xml 中没有工作表")
+    if sheet is None or not 0 <= sheet < len(sheets):
+        view = workbook.find(f"{{{_NS_MAIN}}}bookViews/{{{_NS_MAIN}}}workbookView")
+        sheet = int(view.get("activeTab", 0)) if view is not None else 0
+        sheet = min(sheet, len(sheets) - 1)
+    element = sheets[sheet]
+    rel_id = element.get(f"{{{_NS_REL}}}id")
+
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.findall(f"{{{_NS_PKG_REL}}}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target", "")
+            member = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            if not rel.get("Type", "").endswith("/worksheet"):
+                raise XlsxPatchUnsupported(f"{element.get('name')} 不是普通工作表")
+            return element.get("name"), member
+    raise XlsxPatchUnsupported(f"找不到工作表关系：{rel_id}")
+
+
+def _patch_row(row_xml_body: str, cells: List[Tuple[int, str, object]]) -> str:
+    """在一行的内容中替换或按列顺序插入单元格"""
+    for column, ref, value in cells:
+        existing = None
+        insert_at = len(row_xml_body)
+        for match in _CELL.finditer(row_xml_body):
+            ref_match = _ATTR_R.search(match.group(1))
+            if not ref_match:
+                raise XlsxPatchUnsupported("单元格缺少 r 属性")
+            other_column, _row = _split_ref(ref_match.group(1))
+            if other_column == column:
+                existing = match
+                break
+            if other_column > column:
+                insert_at = match.start()
+                break
+        if existing is not None:
+            if existing.group(3) and "<f" in existing.group(3):
+                raise XlsxPatchUnsupported(f"{ref} 含公式")
+            style = _ATTR_S.search(existing.group(1))
+            new_cell = _cell_xml(ref, value, style.group(1) if style else None)
+            row_xml_body = row_xml_body[:existing.start()] + new_cell + row_xml_body[existing.end():]
+        else:
+            row_xml_body = row_xml_body[:insert_at] + _cell_xml(ref, value, None) + row_xml_body[insert_at:]
+    return row_xml_body
+
+
+def _patch_sheet_xml(xml: str, cells: Dict[str, object]) -> str:
+    if not re.search(r"<worksheet\b", xml):
+        raise XlsxPatchUnsupported("工作表 XML 使用了命名空间前缀")
+    by_row: Dict[int, List[Tuple[int, str, object]]] = {}
+    for ref, value in cells.items():
+        column, row = _split_ref(ref)
+        by_row.setdefault(row, []).append((column, ref, value))
+
+    empty = re.search(r"<sheetData\s*/>", xml)
+    if empty:
+        xml = xml[:empty.start()] + "<sheetData></sheetData>" + xml[empty.end():]
+    start = xml.find("<sheetData")
+    start = xml.find(">", start) + 1
+    end = xml.find("</sheetData>", start)
+    if start <= 0 or end < 0:
+        raise XlsxPatchUnsupported("找不到 sheetData")
+
+    data = xml[start:end]
+    pieces: List[str] = []
+    position = 0
+    for match in _ROW.finditer(data):
+        ref_match = _ATTR_R.search(match.group(1))
+        if not ref_match:
+            raise XlsxPatchUnsupported("行缺少 r 属性")
+        row = int(ref_match.group(1))
+        # 插入排在当前行之前、原来不存在的行
+        for missing in sorted(r for r in by_row if r < row):
+            pieces.append(data[position:match.start()])
+            position = match.start()
+            pieces.append(f'<row r="{missing}">{_patch_row("", by_row.pop(missing))}</row>')
+        if row in by_row:
+            attrs = match.group(1).rstrip("/").rstrip()
+            body = _patch_row(match.group(3) or "", by_row.pop(row))
+            pieces.append(data[position:match.start()])
+            pieces.append(f"<row{attrs}>{body}</row>")
+            position = match.end()
+    pieces.append(data[position:])
+    for missing in sorted(by_row):
+        pieces.append(f'<row r="{missing}">{_patch_row("", by_row[missing])}</row>')
+    xml = xml[:start] + "".join(pieces) + xml[end:]
+    return _expand_dimension(xml, cells)
+
+
+def _expand_dimension(xml: str, cells: Dict[str, object]) -> str:
+    match = re.search(r'<dimension\b[^>]*\bref="([^"]*)"', xml)
+    if not match:
+        return xml
+    refs = match.group(1).split(":")
+    try:
+        bounds = [_split_ref(ref) for ref in refs]
+    except XlsxPatchUnsupported:
+        return xml
+    points = bounds + [_split_ref(ref) for ref in cells]
+    min_col, min_row = min(p[0] for p in points), min(p[1] for p in points)
+    max_col, max_row = max(p[0] for p in points), max(p[1] for p in points)
+    ref = f"{_column_letter(min_col)}{min_row}"
+    if (max_col, max_row) != (min_col, min_row):
+        ref += f":{_column_letter(max_col)}{max_row}"
+    return xml[:match.start(1)] + ref + xml[match.end(1):]
+
+
+def _force_full_calc(xml: str) -> str:
+    """设置 fullCalcOnLoad，引用被改单元格的公式在 Excel 打开时重新计算"""
+    match = re.search(r"<calcPr\b([^>]*?)(/?)>", xml)
+    if match:
+        attrs = re.sub(r'\s*\bfullCalcOnLoad="[^"]*"', "", match.group(1))
+        return xml[:match.start()] + f'<calcPr{attrs} fullCalcOnLoad="1"{match.group(2)}>' + xml[match.end():]
+    for name in _AFTER_CALC_PR:
+        position = xml.find(f"<{name}")
+        if position >= 0:
+            break
+    else:
+        position = xml.find("</workbook>")
+    if position < 0:
+        raise XlsxPatchUnsupported("workbook.xml 使用了命名空间前缀")
+    return xml[:position] + '<calcPr fullCalcOnLoad="1"/>' + xml[position:]
+
+
+def patch_xlsx_cells(source: bytes, cells: Dict[str, object], sheet: Optional[int] = None) -> Tuple[bytes, str]:
+    """
+    改写 source（xlsx 文件内容）中一个工作表的单元格，返回 (新文件内容, 工作表名)。
+    sheet 为工作表序号（0 起），None 或超出范围时使用活动工作表。
+    """
+    with zipfile.ZipFile(io.BytesIO(source)) as zf:
+        name, member = _resolve_sheet(zf, sheet)
+        sheet_xml = zf.read(member).decode("utf-8")
+        workbook_xml = zf.read("xl/workbook.xml").decode("utf-8")
+
+    replacements = {
+        member: _patch_sheet_xml(sheet_xml, cells).encode("utf-8"),
+        "xl/workbook.xml": _force_full_calc(workbook_xml).encode("utf-8"),
+    }
+    output = io.BytesIO()
+    rewrite_zip(io.BytesIO(source), output, replacements)
+    return output.getvalue(), name
@@ -0,0 +1,134 @@
+"""
+按成员改写 zip 包（docx/xlsx）：未修改的成员按原始压缩字节直接复制（不解压、不重新压缩），
+只有被替换的成员重新压缩。保存时间因此取决于被改写部分的大小，而不是图片等大文件的大小。
+"""
+import struct
+import time
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+
+# 流式压缩替换内容时每次读取的字节数
+_CHUNK_SIZE = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+
+_UTF8_FLAG = 0x800
+_DATA_DESCRIPTOR_FLAG = 0x08
+
+
+def _dos_datetime(date_time: Tuple[int, int, int, int, int, int]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def iter_raw_members(zf: zipfile.ZipFile, src: BinaryIO) -> Iterator[Tuple[zipfile.ZipInfo, bytes]]:
+    """按原顺序返回每个成员的 ZipInfo 与原始压缩字节"""
+    for info in zf.infolist():
+        if info.flag_bits & 0x01:
+            raise ValueError(f"不支持加密成员：{info.filename}")
+        src.seek(info.header_offset)
+        header = src.read(_LOCAL_HEADER.size)
+        fields = _LOCAL_HEADER.unpack(header)
+        if fields[0] != b"PK\x03\x04":
+            raise ValueError(f"本地文件头损坏：{info.filename}")
+        name_len, extra_len = fields[9], fields[10]
+        src.seek(info.header_offset + _LOCAL_HEADER.size + name_len + extra_len)
+        yield info, src.read(info.compress_size)
+
+
+def rewrite_zip(src: BinaryIO, dst: BinaryIO, replacements: Dict[str, Union[bytes, BinaryIO]]) -> None:
+    """
+    将 src 复制到 dst，replacements 中的成员替换为新内容（deflate 压缩），其余成员原样复制压缩字节。
+    替换内容可以是 bytes，也可以是文件对象（分块压缩，dst 需支持 seek，用于回填本地文件头）。
+    replacements 中 src 不存在的成员追加到末尾。
+    """
+    central: List[bytes] = []
+    offset = 0
+    pending = dict(replacements)
+    now = time.localtime()[:6]
+
+    def write_member(name: str, flags: int, method: int, date_time, crc: int, data: bytes, size: int,
+                     extract_version: int, made_by: int, internal_attr: int, external_attr: int) -> None:
+        nonlocal offset
+        encoded = name.encode("utf-8")
+        if not encoded.isascii():
+            flags |= _UTF8_FLAG
+        dos_time, dos_date = _dos_datetime(date_time)
+        if offset > 0xFFFFFFFF or len(data) > 0xFFFFFFFF or size > 0xFFFFFFFF:
+            raise ValueError("不支持 ZIP64")
+        dst.write(_LOCAL_HEADER.pack(b"PK\x03\x04", extract_version, flags, method, dos_time, dos_date,
+                                     crc, len(data), size, len(encoded), 0))
+        dst.write(encoded)
+        dst.write(data)
+        central.append(_CENTRAL_HEADER.pack(b"PK\x01\x02", made_by, extract_version, flags, method, dos_time,
+                                            dos_date, crc, len(data), size, len(encoded), 0, 0, 0,
+                                            internal_attr, external_attr, offset) + encoded)
+        offset += _LOCAL_HEADER.size + len(encoded) + len(data)
+
+    def write_replacement(name: str, content: Union[bytes, BinaryIO], info: zipfile.ZipInfo = None) -> None:
+        made_by = (info.create_system << 8 | info.create_version) if info else 20
+        internal_attr = info.internal_attr if info else 0
+        external_attr = info.external_attr if info else 0
+        if isinstance(content, (bytes, bytearray)):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+            data = compressor.compress(content) + compressor.flush()
+            write_member(name, 0, zipfile.ZIP_DEFLATED, now, zlib.crc32(content), data, len(content), 20,
+                         made_by, internal_attr, external_attr)
+            return
+        write_streamed_member(name, content, made_by, internal_attr, external_attr)
+
+    def write_streamed_member(name: str, content: BinaryIO, made_by: int, internal_attr: int, external_attr: int) -> None:
+        """先写占位的本地文件头，分块压缩写入数据后回填 CRC 和大小"""
+        nonlocal offset
+        encoded = name.encode("utf-8")
+        flags = 0 if encoded.isascii() else _UTF8_FLAG
+        dos_time, dos_date = _dos_datetime(now)
+        header_offset = offset
+        dst.write(_LOCAL_HEADER.pack(b"PK\x03\x04", 20, flags, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+                                     0, 0, 0, len(encoded), 0))
+        dst.write(encoded)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        crc = size = compressed = 0
+        while True:
+            chunk = content.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            compressed += len(data)
+            dst.write(data)
+        data = compressor.flush()
+        compressed += len(data)
+        dst.write(data)
+        if header_offset > 0xFFFFFFFF or size > 0xFFFFFFFF or compressed > 0xFFFFFFFF:
+            raise ValueError("不支持 ZIP64")
+        end = dst.tell()
+        dst.seek(end - compressed - len(encoded) - _LOCAL_HEADER.size)
+        dst.write(_LOCAL_HEADER.pack(b"PK\x03\x04", 20, flags, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+                                     crc, compressed, size, len(encoded), 0))
+        dst.seek(end)
+        central.append(_CENTRAL_HEADER.pack(b"PK\x01\x02", made_by, 20, flags, zipfile.ZIP_DEFLATED, dos_time,
+                                            dos_date, crc, compressed, size, len(encoded), 0, 0, 0,
+                                            internal_attr, external_attr, header_offset) + encoded)
+        offset += _LOCAL_HEADER.size + len(encoded) + compressed
+
+    with zipfile.ZipFile(src) as zf:
+        for info, raw in iter_raw_members(zf, src):
+            if info.filename in pending:
+                write_replacement(info.filename, pending.pop(info.filename), info)
+                continue
+            # 大小已写入本地文件头，去掉数据描述符标志
+            write_member(info.filename, info.flag_bits & ~_DATA_DESCRIPTOR_FLAG & ~_UTF8_FLAG,
+                         info.compress_type, info.date_time, info.CRC, raw, info.file_size,
+                         info.extract_version, info.create_system << 8 | info.create_version,
+                         info.internal_attr, info.external_attr)
+    for name, content in pending.items():
+        write_replacement(name, content)
+
+    directory = b"".join(central)
+    dst.write(directory)
+    dst.write(_END_RECORD.pack(b"PK\x05\x06", 0, 0, len(central), len(central), len(directory), offset, 0))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 程序模块都在 code/ 下，按脚本方式互相导入
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "code"))
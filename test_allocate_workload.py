@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from process_attachments import allocate_workload
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sum_is_preserved_in_whole_steps(seed):
+    rng = random.Random(seed)
+    weights = [rng.choice([0, rng.uniform(0.1, 20)]) for _ in range(rng.randint(1, 30))]
+    total = rng.randint(len(weights), 200) * 0.5
+    result = allocate_workload(weights, total)
+    assert len(result) == len(weights)
+    assert sum(result) == pytest.approx(total)
+    assert all((value / 0.5).is_integer() for value in result)
+    assert min(result) >= 0.5
+
+
+def test_minimum_per_row():
+    assert allocate_workload([100, 1, 1], 10) == [9.0, 0.5, 0.5]
+    assert allocate_workload([5, 0, None, float("nan")], 4) == [2.5, 0.5, 0.5, 0.5]
+
+
+def test_total_too_small_for_minimum_allocates_proportionally():
+    assert allocate_workload([1, 1, 1, 1], 1.5) == [0.5, 0.5, 0.5, 0.0]
+
+
+def test_ties_go_to_earlier_rows():
+    assert allocate_workload([1, 1, 1], 10) == [3.5, 3.5, 3.0]
+    assert allocate_workload([2, 1, 1], 2.5) == [1.5, 0.5, 0.5]
+
+
+def test_larger_weight_wins_equal_remainders():
+    # 按比例为 1.5 和 4.5 个单位，小数部分相同，剩下的 1 个单位给权重大的一行
+    assert allocate_workload([1, 3], 3) == [0.5, 2.5]
+    assert allocate_workload([3, 1], 3) == [2.5, 0.5]
+
+
+def test_residual_below_step_goes_to_largest_row():
+    assert allocate_workload([1, 2], 10.3) == [3.5, 6.8]
+
+
+def test_zero_or_missing_weights():
+    assert allocate_workload([], 5) == []
+    assert allocate_workload([0, 0], 3) == [1.5, 1.5]
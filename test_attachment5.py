@@ -0,0 +1,118 @@
+import math
+import os
+import random
+
+import pytest
+from openpyxl import Workbook
+
+import attachment5
+import process_attachments as pa
+from attachment5 import Attachment5Columns
+
+numpy = pytest.importorskip("numpy")
+
+# (H 工作项, I 工作内容, L 工作量)：含空值、0、文本数字、非数字、首尾空白
+ROWS = [
+    ("接口开发", "查询接口", 2),
+    (" 接口开发 ", "查询接口", "3.5"),
+    ("接口开发", "导出接口", None),
+    ("页面开发", "", 1.0),
+    ("页面开发", None, "待定"),
+    (None, "联调", 4),
+    (0, "联调", 0),
+    ("测试", "回归测试", 40),
+    ("测试", "回归测试", ""),
+    ("测试", "冒烟测试", 0.5),
+]
+
+
+def build(rows, monkeypatch=None):
+    """monkeypatch 不为 None 时按未安装 NumPy 的方式构建"""
+    if monkeypatch is not None:
+        monkeypatch.setattr(attachment5, "_numpy", lambda: None)
+    h, i, l = zip(*rows)
+    return Attachment5Columns(list(h), list(i), list(l))
+
+
+def random_rows(count, seed=0):
+    rng = random.Random(seed)
+    values = [None, "", "abc", "1.25", 0, 0.5, 1, 2, 3.75, 8, 120]
+    return [(rng.choice([None, "模块A", "模块B", " 模块C", "模块D"]),
+             rng.choice([None, "", "内容1", "内容2", "内容3"]),
+             rng.choice(values) if rng.random() < 0.3 else round(rng.uniform(0, 20), 2))
+            for _ in range(count)]
+
+
+def as_tuples(groups):
+    return [(g.name, g.total, g.count, g.p50, g.p95) for g in groups]
+
+
+def assert_same(numpy_columns, python_columns):
+    assert list(numpy_columns.valid) == list(python_columns.valid)
+    assert numpy_columns.total() == pytest.approx(python_columns.total())
+    for column in ("H", "I"):
+        assert numpy_columns.labels(column) == python_columns.labels(column)
+        expected = as_tuples(python_columns.group_by(column))
+        actual = as_tuples(numpy_columns.group_by(column))
+        assert [(name, count) for name, _total, count, _p50, _p95 in actual] == \
+               [(name, count) for name, _total, count, _p50, _p95 in expected]
+        for (_name, *numbers), (_expected_name, *expected_numbers) in zip(actual, expected):
+            assert numbers == pytest.approx(expected_numbers)
+    assert numpy_columns.describe() == pytest.approx(python_columns.describe())
+    assert numpy_columns.outliers() == python_columns.outliers()
+
+
+def test_numpy_and_python_paths_agree_on_edge_cases(monkeypatch):
+    with_numpy = build(ROWS)
+    assert with_numpy.np is not None
+    without_numpy = build(ROWS, monkeypatch)
+    assert without_numpy.np is None
+    assert_same(with_numpy, without_numpy)
+
+
+def test_numpy_and_python_paths_agree_on_random_rows(monkeypatch):
+    rows = random_rows(2000)
+    assert_same(build(rows), build(rows, monkeypatch))
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_group_stats_and_mask(use_numpy, monkeypatch):
+    columns = build(ROWS, None if use_numpy else monkeypatch)
+    assert list(columns.valid) == [True, True, False, True, False, True, True, True, False, True]
+    assert columns.total() == 51.0
+    assert as_tuples(columns.group_by("H")) == [
+        ("测试", 40.5, 2, 20.25, 38.025),
+        ("接口开发", 5.5, 2, 2.75, 3.425),
+        ("页面开发", 1.0, 1, 1.0, 1.0),
+    ]
+    assert [(g.name, g.total, g.count) for g in columns.group_by("I")] == [
+        ("回归测试", 40.0, 1), ("查询接口", 5.5, 2), ("联调", 4.0, 2), ("冒烟测试", 0.5, 1)]
+    assert columns.labels("H") == ["接口开发", "接口开发", "接口开发", "页面开发", "页面开发", "测试", "测试", "测试"]
+    assert columns.outliers() == [(9, 40.0, "测试")]
+    with pytest.raises(ValueError):
+        columns.group_by("L")
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_step4_total_matches_cell_by_cell_sum(use_numpy, tmp_path, monkeypatch):
+    if not use_numpy:
+        monkeypatch.setattr(attachment5, "_numpy", lambda: None)
+    monkeypatch.setattr(pa, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(pa, "_ATTACHMENT5_CACHE", {})
+    rows = random_rows(500, seed=1)
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["表头"] * 12)
+    for h, i, l in rows:
+        ws.append([None] * 7 + [h, i, None, None, l])
+    wb.save(os.path.join(tmp_path, "附件5-测试需求@AMS工作量.xlsx"))
+
+    expected = 0.0
+    for _h, _i, value in rows:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            continue
+        if not math.isnan(number):
+            expected += number
+    assert pa.sum_attachment5_col_L_from_L2() == pytest.approx(expected)
@@ -0,0 +1,30 @@
+from datetime import date
+
+import benchmark_steps
+from synthetic_package import generate_package
+from telemetry import TelemetryStore
+
+
+def test_benchmark_runs_every_step_with_stub_session(tmp_path, monkeypatch):
+    """小规模合成包上跑一轮基准：所有步骤都要走通，大模型调用全部由桩应答成功"""
+    package_dir = tmp_path / "package"
+    package_dir.mkdir()
+    generate_package(str(package_dir), cosmic_rows=30, ams_rows=50, doc_paragraphs=20, doc_images=1,
+                     catalogue_size=30)
+    pa = benchmark_steps._import_pipeline()
+    # run_benchmark 会替换这些全局状态，测试结束后还原
+    monkeypatch.setattr(pa, "DATA_DIR", pa.DATA_DIR)
+    monkeypatch.setattr(pa.LLM_CLIENT, "_session", None)
+    monkeypatch.setattr(pa, "BACKFILL", pa.BackfillRegistry())
+    telemetry = TelemetryStore(str(tmp_path / "telemetry.db"))
+    monkeypatch.setattr(pa.LLM_CLIENT, "telemetry", telemetry)
+
+    results = benchmark_steps.run_benchmark(str(package_dir), repeat=1)
+
+    assert list(results) == [name for name, _ in benchmark_steps.build_steps(pa)]
+    assert all(result["runs"] == 1 for result in results.values())
+    rows = telemetry.rows(date.today(), date.today())
+    telemetry.close()
+    assert rows
+    assert [row["error"] for row in rows if row["error"]] == []
+    assert pa.BACKFILL.entries() == []
@@ -0,0 +1,81 @@
+import io
+import os
+import subprocess
+import sys
+import zipfile
+
+from docx import Document
+
+from docx_stream import document_xml_size, stream_document_xml, stream_patch_docx
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code")
+
+
+def make_docx():
+    doc = Document()
+    doc.add_paragraph("1.1 总体描述")
+    doc.add_paragraph("总体描述（添加标识）")
+    doc.add_paragraph("上次生成的内容")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "表格左"
+    table.cell(0, 1).text = "表格右"
+    doc.add_paragraph("结尾段落")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def patch(source, on_paragraph):
+    dst = io.BytesIO()
+    stats = stream_patch_docx(io.BytesIO(source), dst, on_paragraph)
+    return dst.getvalue(), stats
+
+
+def test_delete_and_insert_round_trip():
+    source = make_docx()
+
+    def on_paragraph(text):
+        if text == "上次生成的内容":
+            return False, []
+        if text == "总体描述（添加标识）":
+            return True, ["新内容一", " 前后有空格 "]
+        return True, []
+
+    data, stats = patch(source, on_paragraph)
+    assert stats == {"paragraphs": 4, "removed": 1, "inserted": 2}
+    doc = Document(io.BytesIO(data))
+    assert [p.text for p in doc.paragraphs] == [
+        "1.1 总体描述", "总体描述（添加标识）", "新内容一", " 前后有空格 ", "结尾段落"]
+    # 表格不是段落，原样保留
+    assert [cell.text for cell in doc.tables[0].rows[0].cells] == ["表格左", "表格右"]
+
+
+def test_other_members_are_copied_unchanged():
+    source = make_docx()
+    data, _stats = patch(source, lambda text: (True, []))
+    with zipfile.ZipFile(io.BytesIO(source)) as before, zipfile.ZipFile(io.BytesIO(data)) as after:
+        assert before.namelist() == after.namelist()
+        for name in before.namelist():
+            if name != "word/document.xml":
+                assert before.read(name) == after.read(name)
+    assert [p.text for p in Document(io.BytesIO(data)).paragraphs] == \
+           [p.text for p in Document(io.BytesIO(source)).paragraphs]
+
+
+def test_stream_document_xml_keeps_root_namespaces():
+    with zipfile.ZipFile(io.BytesIO(make_docx())) as zf:
+        xml = zf.read("word/document.xml")
+        size = document_xml_size(io.BytesIO(make_docx()))
+    assert size == len(xml)
+    out = io.BytesIO()
+    stream_document_xml(io.BytesIO(xml), out, lambda text: (True, []))
+    root_tag = out.getvalue().split(b">", 2)[1]
+    assert b'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"' in root_tag
+
+
+def test_pipeline_import_does_not_load_stream_or_patch_modules():
+    """docx_stream/xlsx_patch 会连带导入 urllib.request，启动时不应加载"""
+    code = ("import sys, process_attachments; "
+            "print(sorted(m for m in ('docx_stream', 'xlsx_patch', 'urllib.request') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=CODE_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,250 @@
+import threading
+import time
+
+import pytest
+
+import llm_client
+from llm_client import AdaptiveTimeouts, CircuitBreaker, CircuitOpenError, HedgeBudget, LLMClient, LLMError
+from telemetry import current_step
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, content):
+        self._content = content
+        self.closed = False
+
+    def json(self):
+        return {"choices": [{"message": {"content": self._content}}]}
+
+    def close(self):
+        self.closed = True
+
+
+class _CountingSession:
+    """每次请求返回不同的内容，便于区分是否命中缓存"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, url, headers=None, json=None, timeout=None, **kwargs):
+        self.calls += 1
+        return _Response(f"回复{self.calls}")
+
+
+def _client():
+    client = LLMClient("http://localhost/test", "key")
+    client.session = _CountingSession()
+    client.cache_enabled = True
+    return client
+
+
+def test_cache_only_low_temperature_requests():
+    client = _client()
+    assert client.chat("抽取", temperature=0.3) == client.chat("抽取", temperature=0.3)
+    assert client.chat("生成", temperature=0.7) != client.chat("生成", temperature=0.7)
+    assert client.cache_size() == 1
+    assert client.session.calls == 3
+
+
+def test_cache_evicts_least_recently_used():
+    client = _client()
+    client.cache_max_entries = 2
+    first = client.chat("a", temperature=0)
+    client.chat("b", temperature=0)
+    assert client.chat("a", temperature=0) == first
+    client.chat("c", temperature=0)
+    assert client.cache_size() == 2
+    assert client.chat("a", temperature=0) == first
+    calls = client.session.calls
+    client.chat("b", temperature=0)
+    assert client.session.calls == calls + 1
+
+
+def test_adaptive_timeout_needs_enough_samples():
+    timeouts = AdaptiveTimeouts(min_samples=3, multiplier=3.0, floor=10.0)
+    timeouts.observe("9", 1.0)
+    timeouts.observe("9", 1.0)
+    assert timeouts.timeout("9", 30) == 30
+    assert timeouts.hedge_delay("9") is None
+
+
+@pytest.mark.parametrize("latency, expected", [
+    (1.0, 10.0),    # p95 × 3 = 3s，不低于 floor
+    (5.0, 15.0),
+    (20.0, 30.0),   # p95 × 3 = 60s，不超过调用处给定的超时
+])
+def test_adaptive_timeout_floor_and_cap(latency, expected):
+    timeouts = AdaptiveTimeouts(min_samples=3, multiplier=3.0, floor=10.0)
+    timeouts.load({"12": [latency * 1000] * 3})
+    assert timeouts.timeout("12", 30) == expected
+    assert timeouts.hedge_delay("12") == latency
+    assert timeouts.timeout("其他步骤", 30) == 30
+
+
+def test_adaptive_timeout_keeps_recent_window():
+    timeouts = AdaptiveTimeouts(window=3, min_samples=3, multiplier=1.0, floor=0.0)
+    for seconds in (50.0, 1.0, 1.0, 1.0):
+        timeouts.observe("9", seconds)
+    assert timeouts.p95("9") == 1.0
+
+
+def test_hedge_budget():
+    budget = HedgeBudget(ratio=0.1, burst=1)
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    for _ in range(10):
+        budget.count_call()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+
+class _SlowFirstSession:
+    """第一个请求等到 release 才返回，之后的请求立即返回"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.responses = []
+        self.streamed = []
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, json=None, timeout=None, stream=False):
+        with self._lock:
+            first = not self.responses
+            response = _Response("慢" if first else "快")
+            self.responses.append(response)
+            self.streamed.append(stream)
+        if first:
+            self.release.wait(5)
+        return response
+
+
+def test_hedge_wins_and_cancels_the_slow_request():
+    client = LLMClient("http://localhost/test", "key")
+    client.session = session = _SlowFirstSession()
+    client.hedge_budget = HedgeBudget(ratio=1.0, burst=1)
+    client.latency = AdaptiveTimeouts(min_samples=1, floor=0.0)
+    client.latency.observe(current_step(), 0.05)
+    try:
+        assert client.chat("提示词") == "快"
+    finally:
+        session.release.set()
+    assert client.hedge_budget.hedges == 1
+    assert session.streamed == [True, True]
+    deadline = time.monotonic() + 5
+    while not session.responses[0].closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 落败的请求响应到达后直接关闭，不读取响应体
+    assert session.responses[0].closed
+
+
+def test_each_thread_gets_its_own_session():
+    pytest.importorskip("requests")
+    client = LLMClient("http://localhost/test", "key")
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(client.session))
+    thread.start()
+    thread.join()
+    assert client.session is client.session
+    assert sessions[0] is not client.session
+    assert sessions[0].get_adapter("https://x") is client.session.get_adapter("https://x")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_client.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_breaker_half_open_allows_one_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 10
+    assert not breaker.allow()
+    clock.now += 20
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize("error, counted", [
+    (LLMError("服务端错误", 503), True),
+    (LLMError("限流", 429), True),
+    (LLMError("请求错误", 400), False),
+    (ConnectionError("断开"), True),
+])
+def test_breaker_counts_only_endpoint_failures(error, counted):
+    assert CircuitBreaker.is_failure(error) is counted
+
+
+class _FailingSession:
+    def __init__(self, status):
+        self.status = status
+        self.calls = 0
+
+    def post(self, url, headers=None, json=None, timeout=None, **kwargs):
+        self.calls += 1
+        response = _Response("")
+        response.status_code = self.status
+        return response
+
+
+def test_chat_fails_fast_while_open(clock):
+    client = LLMClient("http://localhost/test", "key")
+    client.session = session = _FailingSession(503)
+    for _ in range(3):
+        with pytest.raises(LLMError):
+            client.chat("提示词")
+    with pytest.raises(CircuitOpenError):
+        client.chat("提示词")
+    assert session.calls == 3
+
+    # 400 说明接口可达，不触发熔断
+    client = LLMClient("http://localhost/test", "key")
+    client.session = session = _FailingSession(400)
+    for _ in range(5):
+        with pytest.raises(LLMError):
+            client.chat("提示词")
+    assert session.calls == 5
+    assert client.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,54 @@
+import pytest
+
+import near_duplicates
+from near_duplicates import cluster_near_duplicates, normalize_text, shingles
+
+
+def test_normalize_strips_numbering_and_punctuation_but_keeps_digits():
+    assert normalize_text("1. 新增 工单查询接口V2！") == "新增工单查询接口v2"
+    assert normalize_text("（3）优化接口") == "优化接口"
+
+
+def test_near_duplicates_are_merged_with_counts():
+    items = ["1. 新增任务流转页面", "2、新增任务流转页面。", "新增任务流转页面的", "优化企业画像展示"]
+    assert cluster_near_duplicates(items) == [("1. 新增任务流转页面", 3), ("优化企业画像展示", 1)]
+
+
+def test_items_differing_only_by_numbers_stay_distinct():
+    items = ["新增工单查询接口1", "新增工单查询接口2", "新增工单查询接口1。"]
+    assert cluster_near_duplicates(items) == [("新增工单查询接口1", 2), ("新增工单查询接口2", 1)]
+
+
+def _pair_with_jaccard(common, only_a, only_b):
+    """构造 shingle 集合恰好为 common 个共同、各自独有 only_a/only_b 个的两段文本"""
+    shared = "".join(chr(0x4E00 + i) for i in range(common + 1))
+    a = shared + "".join(chr(0x5E00 + i) for i in range(only_a))
+    b = shared + "".join(chr(0x6E00 + i) for i in range(only_b))
+    return a, b
+
+
+@pytest.mark.parametrize("threshold, size_a, size_b", [
+    (0.7, 10, 7),
+    # 0.56 × 25 的浮点结果为 14.000000000000002，按浮点比较会滤掉恰好达到阈值的一对
+    (0.56, 25, 14),
+])
+def test_pair_exactly_at_threshold_is_merged(threshold, size_a, size_b):
+    a, b = _pair_with_jaccard(size_b, size_a - size_b, 0)
+    sa, sb = shingles(a), shingles(b)
+    assert (len(sa), len(sb), len(sa & sb)) == (size_a, size_b, size_b)
+    assert cluster_near_duplicates([a, b], threshold) == [(a, 2)]
+    # 较短的先成为代表时，长度过滤的下限为 threshold × |A|
+    assert cluster_near_duplicates([b, a], threshold) == [(b, 2)]
+
+
+def test_pair_below_threshold_is_not_merged():
+    a, b = _pair_with_jaccard(6, 3, 0)
+    assert [count for _text, count in cluster_near_duplicates([a, b])] == [1, 1]
+
+
+def test_lsh_path_keeps_number_rule(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(near_duplicates, "LSH_MIN_ITEMS", 1)
+    items = ["新增任务流转页面", "新增任务流转页面。", "新增工单查询接口1", "新增工单查询接口2"]
+    assert cluster_near_duplicates(items) == [("新增任务流转页面", 2), ("新增工单查询接口1", 1),
+                                              ("新增工单查询接口2", 1)]
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+from openpyxl import Workbook
+
+from portfolio_index import COSMIC_SHEET, PortfolioIndex
+
+
+def set_mtime(paths, when):
+    timestamp = when.timestamp()
+    for path in paths:
+        os.utime(path, (timestamp, timestamp))
+
+
+def write_package(directory, wbs_rows, cosmic_rows, totals=(10, 3)):
+    """返回 {附件编号: 路径}；wbs_rows: [(一级, 二级, 三级, 描述, 工作量)]，cosmic_rows: [(一级, H 子过程)]"""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["序号", "一级", "二级", "三级", "描述", "工作量"])
+    for number, row in enumerate(wbs_rows, 1):
+        ws.append([number, *row])
+    ws.append([None, "合计", None, None, None, sum(row[4] for row in wbs_rows)])
+    ws.append([None, "合计之后", "不计入", None, None, 99])
+    paths[2] = os.path.join(directory, "附件2-需求@WBS.xlsx")
+    wb.save(paths[2])
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = COSMIC_SHEET
+    for row, (level1, subprocess) in enumerate(cosmic_rows, 4):
+        ws.cell(row, 2).value = level1
+        ws.cell(row, 8).value = subprocess
+        ws.cell(row, 9).value = "R"
+    paths[3] = os.path.join(directory, "附件3-需求@COSMIC.xlsx")
+    wb.save(paths[3])
+
+    wb = Workbook()
+    wb.active["D7"] = totals[0]
+    wb.active["B7"] = totals[1]
+    paths[4] = os.path.join(directory, "附件4-需求@评估表.xlsx")
+    wb.save(paths[4])
+    return paths
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = PortfolioIndex(str(tmp_path / "portfolio.db"))
+    yield index
+    index.close()
+
+
+def count_rows(index, table):
+    with sqlite3.connect(index.path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_unchanged_version_is_skipped_and_force_replaces_rows(tmp_path, index):
+    paths = write_package(tmp_path / "a", [("营销", "客户", "查询", "查询客户", 4.0), ("营销", "客户", "导出", "导出", 6.0)],
+                          [("营销", "查询客户"), (None, "导出客户")])
+    set_mtime(paths.values(), datetime(2026, 7, 1, 9))
+    assert index.index_package("需求A", str(tmp_path / "a"), paths) == 4
+    assert index.index_package("需求A", str(tmp_path / "a"), paths) is None
+
+    assert index.index_package("需求A", str(tmp_path / "a"), paths, force=True) == 4
+    assert count_rows(index, "runs") == 1
+    assert count_rows(index, "wbs_rows") == 2
+    assert count_rows(index, "cosmic_rows") == 2
+    with sqlite3.connect(index.path) as conn:
+        # 空白的一级模块沿用上一行
+        assert conn.execute("SELECT level1 FROM cosmic_rows ORDER BY row").fetchall() == [("营销",), ("营销",)]
+        assert conn.execute("SELECT total_workload, function_points FROM runs").fetchone() == (10.0, 3.0)
+
+
+def test_workload_by_module_uses_latest_version_only(tmp_path, index):
+    old = write_package(tmp_path / "a", [("营销", "客户", "查询", "查询", 4.0)], [("营销", "查询")])
+    set_mtime(old.values(), datetime(2026, 7, 1, 9))
+    index.index_package("需求A", str(tmp_path / "a"), old)
+
+    # 同一需求更新后新增一个版本，旧版本保留但不参与汇总
+    new = write_package(tmp_path / "a", [("营销", "客户", "查询", "查询", 5.0), ("运营", "工单", "派单", "派单", 3.0)],
+                        [("营销", "查询")])
+    set_mtime(new.values(), datetime(2026, 8, 1, 9))
+    assert index.index_package("需求A", str(tmp_path / "a"), new) == 3
+
+    other = write_package(tmp_path / "b", [("营销", "渠道", "统计", "统计", 2.0)], [])
+    set_mtime(other.values(), datetime(2026, 7, 15, 9))
+    index.index_package("需求B", str(tmp_path / "b"), other)
+
+    outside = write_package(tmp_path / "c", [("营销", "渠道", "统计", "统计", 100.0)], [])
+    set_mtime(outside.values(), datetime(2026, 3, 1, 9))
+    index.index_package("需求C", str(tmp_path / "c"), outside)
+
+    assert count_rows(index, "runs") == 4
+    assert index.workload_by_module(date(2026, 7, 1), date(2026, 9, 30)) == [("营销", 2, 7.0), ("运营", 1, 3.0)]
+    assert index.workload_by_module(date(2026, 1, 1), date(2026, 6, 30)) == [("营销", 1, 100.0)]
+
+
+def test_package_without_attachments_is_not_indexed(tmp_path, index):
+    assert index.index_package("需求A", str(tmp_path), {}) is None
+    assert index.workload_by_module(date(2000, 1, 1), date(2100, 1, 1)) == []
@@ -0,0 +1,77 @@
+import json
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.packaging.custom import StringProperty
+
+from row_state import STATE_PROPERTY, RowState, Step12Checkpoint, row_fingerprint
+
+
+def test_checkpoint_writes_every_n_rows_and_round_trips(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = Step12Checkpoint(path, every_rows=2, every_seconds=3600)
+    checkpoint.add("a", "组a", "属性a")
+    assert not (tmp_path / "checkpoint.json").exists()
+    checkpoint.add("b", "组b", "属性b")
+    assert json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))["results"] == {
+        "a": ["组a", "属性a"], "b": ["组b", "属性b"]}
+
+    loaded = Step12Checkpoint.load(path)
+    assert loaded.get("a") == ("组a", "属性a")
+    assert loaded.get("c") is None
+    loaded.clear()
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_checkpoint_without_path_stays_in_memory(tmp_path):
+    checkpoint = Step12Checkpoint.load(None)
+    checkpoint.add("a", "组a", "属性a")
+    checkpoint.save()
+    checkpoint.clear()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_corrupt_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text("{", encoding="utf-8")
+    assert len(Step12Checkpoint.load(str(path))) == 0
+
+
+def test_row_state_round_trips_through_custom_properties(tmp_path):
+    wb = Workbook()
+    wb.custom_doc_props.append(StringProperty(name="审核人", value="张三"))
+    state = RowState()
+    fingerprints = [row_fingerprint([str(i)]) for i in range(20)]
+    for fingerprint in fingerprints:
+        state.record(fingerprint)
+    state.prune(set(fingerprints[1:]))
+    state.write(wb)
+    assert not state.dirty
+    path = tmp_path / "附件3.xlsx"
+    wb.save(path)
+
+    wb = load_workbook(path)
+    values = {prop.name: prop.value for prop in wb.custom_doc_props.props}
+    assert values["审核人"] == "张三"
+    assert values[STATE_PROPERTY] == "19"
+    assert all(len(value) <= 255 for value in values.values())
+    loaded = RowState.from_workbook(wb)
+    assert len(loaded) == 19
+    assert not loaded.is_current(fingerprints[0])
+    assert all(loaded.is_current(fingerprint) for fingerprint in fingerprints[1:])
+
+    # 再次写入时替换旧的分段，不留下多余的属性
+    loaded.prune(set(fingerprints[1:3]))
+    loaded.write(wb)
+    assert len([name for name in wb.custom_doc_props.names if name.startswith(STATE_PROPERTY)]) == 2
+
+
+def test_truncated_row_state_is_ignored():
+    wb = Workbook()
+    state = RowState()
+    for i in range(10):
+        state.record(row_fingerprint([str(i)]))
+    state.write(wb)
+    wb.custom_doc_props.props = [prop for prop in wb.custom_doc_props.props
+                                 if prop.name != STATE_PROPERTY + "_0002"]
+    assert len(RowState.from_workbook(wb)) == 0
+    assert len(RowState.from_workbook(Workbook())) == 0
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import process_attachments as pa
+import save_service
+from template_store import TEMPLATE_DIR, TemplateStore
+
+
+@pytest.fixture
+def attachment2(tmp_path, monkeypatch):
+    monkeypatch.setattr(pa, "DATA_DIR", str(tmp_path))
+    wb = Workbook()
+    wb.active.append(["序号", "一级功能点"])
+    wb.active.append([1, "旧内容"])
+    path = os.path.join(tmp_path, "附件2-测试需求@WBS工作量评估.xlsx")
+    wb.save(path)
+    return path
+
+
+def test_initialize_reports_success_only_after_save(attachment2, capsys):
+    assert pa.initialize_attachment2()
+    assert load_workbook(attachment2).active["B2"].value is None
+    assert "已清空" in capsys.readouterr().out
+
+
+def test_failed_save_is_not_reported_as_success(attachment2, monkeypatch, capsys):
+    def locked(path, writer):
+        raise PermissionError(13, "Permission denied", path)
+
+    monkeypatch.setattr(save_service, "atomic_write", locked)
+    assert not pa.initialize_attachment2()
+    out = capsys.readouterr().out
+    assert "已清空" not in out
+    assert "附件2未能保存" in out
+    # 失败仍留给保存服务在运行结束时统一报告
+    assert not pa.SAVE_SERVICE.flush_and_report()
+    assert "文件被占用，保存失败" in capsys.readouterr().out
+    assert load_workbook(attachment2).active["B2"].value == "旧内容"
+
+
+@pytest.fixture
+def templates(tmp_path, monkeypatch):
+    store = TemplateStore(os.path.join(tmp_path, TEMPLATE_DIR))
+    monkeypatch.setattr(pa, "TEMPLATES", store)
+    return store
+
+
+def test_initialize_captures_template_and_takes_custody(attachment2, templates):
+    pa.initialize_attachments()
+    assert templates.template_path(2) is not None
+    assert templates.can_restore(2)
+
+
+def test_failed_initialize_save_keeps_no_custody(attachment2, templates, monkeypatch, capsys):
+    def locked(path, writer):
+        raise PermissionError(13, "Permission denied", path)
+
+    monkeypatch.setattr(save_service, "atomic_write", locked)
+    pa.initialize_attachments()
+    assert templates.template_path(2) is None
+    assert not templates.can_restore(2)
+    assert not pa.SAVE_SERVICE.flush_and_report()
+    assert os.path.basename(attachment2) in capsys.readouterr().out
+
+
+def test_failed_template_capture_keeps_no_custody(attachment2, templates, monkeypatch):
+    # 旧模板（清理前的内容）还在：不能让下次运行用它覆盖附件2
+    templates.capture(2, attachment2, "WBS工作量评估")
+
+    def failing_capture(number, source, attribute):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(templates, "capture", failing_capture)
+    pa.initialize_attachments()
+    assert load_workbook(attachment2).active["B2"].value is None
+    assert not templates.can_restore(2)
@@ -0,0 +1,58 @@
+import os
+import stat
+
+from save_service import SaveService, atomic_write
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_uses_umask_default_mode(tmp_path):
+    """新建文件的权限与 open() 一致（0666 去掉 umask），而不是 mkstemp 的 0600"""
+    old_umask = os.umask(0o022)
+    os.umask(old_umask)
+    path = tmp_path / "新文件.xlsx"
+    atomic_write(str(path), lambda f: f.write(b"data"))
+    assert path.read_bytes() == b"data"
+    assert _mode(path) == 0o666 & ~old_umask
+
+
+def test_existing_file_keeps_its_mode(tmp_path):
+    path = tmp_path / "附件.docx"
+    path.write_bytes(b"old")
+    os.chmod(path, 0o640)
+    atomic_write(str(path), lambda f: f.write(b"new"))
+    assert path.read_bytes() == b"new"
+    assert _mode(path) == 0o640
+
+
+def test_failed_write_leaves_target_and_no_temp_file(tmp_path):
+    path = tmp_path / "附件.docx"
+    path.write_bytes(b"old")
+
+    def writer(f):
+        f.write(b"partial")
+        raise RuntimeError("boom")
+
+    try:
+        atomic_write(str(path), writer)
+    except RuntimeError:
+        pass
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["附件.docx"]
+
+
+def test_settle_waits_without_taking_the_failure(tmp_path):
+    service = SaveService()
+    path = str(tmp_path / "附件1.docx")
+
+    def failing(f):
+        raise OSError("disk full")
+
+    service.submit(path, failing)
+    assert isinstance(service.settle(path), OSError)
+    assert service.settle(str(tmp_path / "其他.docx")) is None
+    # 失败仍由 flush 报告
+    errors = service.flush()
+    assert [type(error) for _path, error in errors] == [OSError]
@@ -0,0 +1,36 @@
+import threading
+import time
+import types
+
+from service import JobRunner
+
+
+def _pipeline(run_steps):
+    pa = types.SimpleNamespace(DATA_DIR=".", DRY_RUN_STORE=None)
+    pa.run_steps = run_steps
+    return pa
+
+
+def test_job_log_only_captures_the_job_thread(capsys):
+    started, release = threading.Event(), threading.Event()
+
+    def run_steps(name, steps):
+        print("作业输出")
+        started.set()
+        release.wait(5)
+        return {"total": 1.0, "saved": True}
+
+    runner = JobRunner(_pipeline(run_steps))
+    try:
+        job = runner.submit("/tmp", "需求", None)
+        assert started.wait(5)
+        # 作业运行期间其他线程（如 HTTP 处理线程）的输出不进入作业日志
+        print("其他线程输出")
+        release.set()
+        while job.finished_at is None:
+            time.sleep(0.01)
+    finally:
+        runner.close()
+    assert job.status == "succeeded"
+    assert job.log.getvalue() == "作业输出\n"
+    assert "其他线程输出" in capsys.readouterr().out
@@ -0,0 +1,216 @@
+import os
+import shutil
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import process_attachments as pa
+import row_state
+
+SHEET = "COSMIC功能点拆分表"
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    monkeypatch.setattr(pa, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write_attachment3(directory, rows):
+    """rows: [(F, G, H, I, J, K)]，从第 4 行开始写入"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = SHEET
+    for row, values in enumerate(rows, 4):
+        for col, value in enumerate(values, 6):
+            ws.cell(row, col).value = value
+    path = os.path.join(directory, "附件3-测试需求@COSMIC工作量评估基础表.xlsx")
+    wb.save(path)
+    return path
+
+
+def read_jk(path):
+    wb = load_workbook(path)
+    ws = wb[SHEET]
+    return [(ws.cell(row, 10).value, ws.cell(row, 11).value) for row in range(4, ws.max_row + 1)]
+
+
+class FakeModel:
+    """替代大模型：记录每次请求，结果带上现有数据组以区分不同请求"""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, trigger_event, function_process, subprocess_desc, data_movement_type,
+                 existing_data_group="", existing_data_attributes=""):
+        self.requests.append((subprocess_desc, existing_data_group))
+        return f"{subprocess_desc}组{existing_data_group}", f"{subprocess_desc}属性"
+
+
+def run_step12(monkeypatch, model):
+    monkeypatch.setattr(pa, "_ai_cosmic_data_group_and_attributes", model)
+    pa.step12_enhance_cosmic_data_groups_and_attributes()
+    pa.SAVE_SERVICE.flush_and_report()
+
+
+def test_identical_requests_share_one_call(package, monkeypatch):
+    path = write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", None, None),
+        ("触发", "过程", " 查询工单 ", "r", None, None),
+    ])
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == [("查询工单", "")]
+    assert read_jk(path) == [("查询工单组", "查询工单属性")] * 2
+
+
+def test_rows_with_different_existing_values_are_not_shared(package, monkeypatch):
+    path = write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", None, None),
+        ("触发", "过程", "查询工单", "R", "工单", "编号"),
+    ])
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == [("查询工单", ""), ("查询工单", "工单")]
+    assert read_jk(path) == [("查询工单组", "查询工单属性"), ("查询工单组工单", "查询工单属性")]
+
+
+def set_cell(path, row, col, value):
+    wb = load_workbook(path)
+    wb[SHEET].cell(row, col).value = value
+    wb.save(path)
+
+
+def test_unchanged_rerun_makes_no_calls(package, monkeypatch):
+    path = write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", None, None),
+        ("触发", "过程", "新增工单", "W", None, None),
+    ])
+    run_step12(monkeypatch, FakeModel())
+    assert load_workbook(path).sheetnames == [SHEET]
+    mtime = os.stat(path).st_mtime_ns
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == []
+    assert read_jk(path) == [("查询工单组", "查询工单属性"), ("新增工单组", "新增工单属性")]
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_row_state_travels_with_attachment3(package, tmp_path, monkeypatch):
+    path = write_attachment3(package, [("触发", "过程", "查询工单", "R", None, None)])
+    run_step12(monkeypatch, FakeModel())
+    copy_dir = tmp_path / "副本"
+    copy_dir.mkdir()
+    copied = shutil.copy2(path, copy_dir)
+    set_cell(copied, 5, 8, "新增工单")
+    set_cell(copied, 5, 9, "W")
+    monkeypatch.setattr(pa, "DATA_DIR", str(copy_dir))
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == [("新增工单", "")]
+
+
+def test_edited_rows_are_regenerated(package, monkeypatch):
+    path = write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", None, None),
+        ("触发", "过程", "新增工单", "W", None, None),
+        ("触发", "过程", "删除工单", "W", None, None),
+    ])
+    run_step12(monkeypatch, FakeModel())
+    set_cell(path, 4, 8, "查询订单")  # 改了输入 H 列
+    set_cell(path, 5, 10, "手填组")  # 手工改了 J 列
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == [("查询订单", "查询工单组"), ("新增工单", "手填组")]
+    assert read_jk(path)[2] == ("删除工单组", "删除工单属性")
+
+
+def test_identical_inputs_with_different_values_both_stay_current(package, monkeypatch):
+    write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", None, None),
+        ("触发", "过程", "查询工单", "R", "工单", "编号"),
+    ])
+    run_step12(monkeypatch, FakeModel())
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == []
+
+
+def test_legacy_state_sheet_is_migrated_and_removed(package, monkeypatch):
+    path = write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", "旧组", "旧属性"),
+        ("触发", "过程", "新增工单", "W", "手填组", "手填属性"),
+    ])
+    wb = load_workbook(path)
+    legacy = wb.create_sheet(row_state.LEGACY_STATE_SHEET)
+    legacy.append(["fingerprint", "data_group", "data_attributes"])
+    for inputs, values in ((("触发", "过程", "查询工单", "R"), ("旧组", "旧属性")),
+                           (("触发", "过程", "新增工单", "W"), ("上次生成的组", "上次生成的属性"))):
+        key = pa.cosmic_request_key(*inputs)
+        legacy.append([row_state.row_fingerprint(key[:4]), *values])
+    legacy.sheet_state = "hidden"
+    wb.save(path)
+
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    # 第一行与旧状态一致，直接跳过；第二行的 J/K 被手工改过，重新生成
+    assert model.requests == [("新增工单", "手填组")]
+    wb = load_workbook(path)
+    assert wb.sheetnames == [SHEET]
+    assert row_state.STATE_PROPERTY in wb.custom_doc_props.names
+
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == []
+
+
+class InterruptingModel(FakeModel):
+    """第 calls 次请求时模拟 Ctrl+C"""
+
+    def __init__(self, calls):
+        super().__init__()
+        self.calls = calls
+
+    def __call__(self, *args, **kwargs):
+        if len(self.requests) + 1 == self.calls:
+            raise KeyboardInterrupt
+        return super().__call__(*args, **kwargs)
+
+
+def test_interrupted_run_resumes_from_checkpoint(package, monkeypatch):
+    path = write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", None, None),
+        ("触发", "过程", "新增工单", "W", None, None),
+        ("触发", "过程", "删除工单", "W", None, None),
+    ])
+    with pytest.raises(KeyboardInterrupt):
+        run_step12(monkeypatch, InterruptingModel(3))
+    checkpoint_path = os.path.join(package, row_state.CHECKPOINT_FILE)
+    assert len(row_state.Step12Checkpoint.load(checkpoint_path)) == 2
+    assert read_jk(path) == [(None, None)] * 3
+
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == [("删除工单", "")]
+    assert read_jk(path) == [("查询工单组", "查询工单属性"), ("新增工单组", "新增工单属性"),
+                             ("删除工单组", "删除工单属性")]
+    assert not os.path.exists(checkpoint_path)
+
+
+def test_stale_checkpoint_entries_are_not_applied(package, monkeypatch):
+    path = write_attachment3(package, [
+        ("触发", "过程", "查询工单", "R", None, None),
+        ("触发", "过程", "新增工单", "W", None, None),
+        ("触发", "过程", "删除工单", "W", None, None),
+    ])
+    with pytest.raises(KeyboardInterrupt):
+        run_step12(monkeypatch, InterruptingModel(3))
+    # 中断后改了第一行的输入、第二行的 J 列：检查点中的结果都不再对应这些请求
+    set_cell(path, 4, 8, "查询订单")
+    set_cell(path, 5, 10, "手填组")
+
+    model = FakeModel()
+    run_step12(monkeypatch, model)
+    assert model.requests == [("查询订单", ""), ("新增工单", "手填组"), ("删除工单", "")]
+    assert read_jk(path)[:2] == [("查询订单组", "查询订单属性"), ("新增工单组手填组", "新增工单属性")]
+    assert not os.path.exists(os.path.join(package, row_state.CHECKPOINT_FILE))
@@ -0,0 +1,35 @@
+import pytest
+
+from process_attachments import ALL_STEPS, parse_step_selection
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("4-8", [4, 5, 6, 7, 8]),
+    ("2,5,9-12", [2, 5, 9, 10, 11, 12]),
+    ("9-12，2", [2, 9, 10, 11, 12]),
+    (" 3 , 3-4 ", [3, 4]),
+    ("0", [0]),
+])
+def test_parses_lists_and_ranges(text, expected):
+    assert parse_step_selection(text) == expected
+
+
+def test_full_range_matches_all_steps():
+    assert parse_step_selection(f"{ALL_STEPS[0]}-{ALL_STEPS[-1]}") == ALL_STEPS
+
+
+@pytest.mark.parametrize("text, message", [
+    ("13", "未知的步骤"),
+    ("11-14", "未知的步骤"),
+    ("8-4", "起点大于终点"),
+    (",", "未选择任何步骤"),
+])
+def test_rejects_invalid_selection(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_step_selection(text)
+
+
+@pytest.mark.parametrize("text", ["a", "4-", "4-x", "1-2-3"])
+def test_rejects_malformed_numbers(text):
+    with pytest.raises(ValueError):
+        parse_step_selection(text)
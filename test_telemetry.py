@@ -0,0 +1,25 @@
+from telemetry import percentile, summarize
+
+
+def _row(step, latency_ms, error=None, cache_hit=0):
+    return {"step": step, "latency_ms": latency_ms, "error": error, "cache_hit": cache_hit, "retries": 0,
+            "prompt_tokens": None, "completion_tokens": None, "cached_tokens": None}
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_latency_percentiles_exclude_errors_and_cache_hits():
+    rows = [_row("12 完善数据组", ms) for ms in (1000, 1200, 1400)]
+    rows += [_row("12 完善数据组", 0.1, error="CircuitOpenError")] * 5
+    rows += [_row("12 完善数据组", 30000, error="ReadTimeout")]
+    rows += [_row("12 完善数据组", 0.0, cache_hit=1)] * 3
+    (summary,) = summarize(rows)
+    assert summary["calls"] == 12
+    assert summary["errors"] == 6
+    assert summary["cache_hits"] == 3
+    assert summary["latency_p50_ms"] == 1200
+    assert summary["latency_p95_ms"] == 1400
@@ -0,0 +1,104 @@
+import os
+import stat
+
+from template_store import TEMPLATE_DIR, TemplateStore, clone_into, file_signature
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def _umask():
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def test_clone_into_copies_content(tmp_path):
+    source = tmp_path / "源.docx"
+    source.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+    target = tmp_path / "目标.docx"
+    with open(target, "wb") as f:
+        clone_into(f, str(source))
+        assert f.tell() == source.stat().st_size
+    assert target.read_bytes() == source.read_bytes()
+
+
+def test_capture_persists_manifest_and_replaces_previous_template(tmp_path):
+    directory = str(tmp_path / TEMPLATE_DIR)
+    source = tmp_path / "附件1-需求@需求说明书.docx"
+    source.write_bytes(b"v1")
+    store = TemplateStore(directory)
+    store.capture(1, str(source), "需求说明书")
+    first = store.template_path(1)
+    assert open(first, "rb").read() == b"v1"
+
+    source.write_bytes(b"v2")
+    store.capture(1, str(source), "规格说明书")
+    assert not os.path.exists(first)
+
+    reloaded = TemplateStore(directory)
+    assert open(reloaded.template_path(1), "rb").read() == b"v2"
+    assert reloaded.template_attribute(1) == ("规格说明书", ".docx")
+    assert reloaded.template_path(2) is None
+    assert reloaded.template_attribute(2) is None
+
+
+def test_templates_and_manifest_use_umask_default_mode(tmp_path):
+    source = tmp_path / "附件2-需求@WBS.xlsx"
+    source.write_bytes(b"wbs")
+    store = TemplateStore(str(tmp_path / TEMPLATE_DIR))
+    store.capture(2, str(source), "WBS")
+    expected = 0o666 & ~_umask()
+    assert _mode(store.template_path(2)) == expected
+    assert _mode(tmp_path / TEMPLATE_DIR / "manifest.json") == expected
+
+
+def test_custody_follows_output_signature(tmp_path):
+    directory = str(tmp_path / TEMPLATE_DIR)
+    output = tmp_path / "附件1-需求@需求说明书.docx"
+    output.write_bytes(b"clean")
+    store = TemplateStore(directory)
+    store.capture(1, str(output), "需求说明书")
+    store.begin_run({1: str(output)})
+    assert not store.can_restore(1)  # 还没有上次运行的签名
+    store.take_custody(1)
+    store.end_run({1: str(output)})
+
+    store = TemplateStore(directory)
+    store.begin_run({1: str(output), 2: None})
+    assert store.can_restore(1)
+    assert not store.can_restore(2)
+    store.end_run({1: str(output), 2: None})
+
+    # 手工修改后签名不同，不能再用模板覆盖
+    output.write_bytes(b"edited by hand")
+    os.utime(output, ns=(0, file_signature(str(output))[1] + 10 ** 9))
+    store = TemplateStore(directory)
+    store.begin_run({1: str(output)})
+    assert not store.can_restore(1)
+    store.end_run({1: str(output)})
+    # 没有重新取得控制权时签名作废
+    store = TemplateStore(directory)
+    store.begin_run({1: str(output)})
+    assert not store.can_restore(1)
+
+
+def test_read_only_store_never_writes(tmp_path):
+    source = tmp_path / "附件1-需求@需求说明书.docx"
+    source.write_bytes(b"clean")
+    store = TemplateStore(str(tmp_path / TEMPLATE_DIR), read_only=True)
+    store.capture(1, str(source), "需求说明书")
+    store.begin_run({1: str(source)})
+    store.take_custody(1)
+    store.end_run({1: str(source)})
+    assert not (tmp_path / TEMPLATE_DIR).exists()
+    assert store.template_path(1) is None
+
+
+def test_corrupt_manifest_is_ignored(tmp_path):
+    directory = tmp_path / TEMPLATE_DIR
+    directory.mkdir()
+    (directory / "manifest.json").write_text("[", encoding="utf-8")
+    store = TemplateStore(str(directory))
+    assert store.template_path(1) is None
@@ -0,0 +1,141 @@
+import os
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import watch
+from watch import AttachmentWatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePipeline:
+    def __init__(self, paths):
+        self.paths = paths
+        self.DATA_DIR = os.path.dirname(next(iter(paths.values())))
+        self.runs = []
+        self.SAVE_SERVICE = self
+
+    def find_attachment_by_number(self, number):
+        return self.paths.get(number)
+
+    def run_steps(self, requirement_name, steps):
+        self.runs.append(steps)
+        return {"saved": True}
+
+    def flush_and_report(self):
+        return True
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def edit(path, sheet, ref, value):
+    wb = load_workbook(path)
+    (wb[sheet] if sheet else wb.worksheets[0])[ref] = value
+    wb.save(path)
+    bump_mtime(path)
+
+
+@pytest.fixture
+def package(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["表头"] * 12)
+    ws.append([None] * 7 + ["工作项", "内容", None, None, 2])
+    attachment5 = str(tmp_path / "附件5-需求@AMS.xlsx")
+    wb.save(attachment5)
+
+    wb = Workbook()
+    wb.active.title = "系统功能架构图"
+    cosmic = wb.create_sheet("COSMIC功能点拆分表")
+    cosmic["H4"] = "查询工单"
+    attachment3 = str(tmp_path / "附件3-需求@COSMIC.xlsx")
+    wb.save(attachment3)
+    return {3: attachment3, 5: attachment5}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(watch.time, "monotonic", clock)
+    return clock
+
+
+def test_stat_only_changes_trigger_nothing(package, clock):
+    watcher = AttachmentWatcher(FakePipeline(package), debounce=2.0)
+    watcher.snapshot()
+    bump_mtime(package[5])
+    edit(package[5], None, "K2", "其他列")  # 不在 L 列
+    edit(package[3], "系统功能架构图", "A1", "写回")  # 不在 COSMIC 表
+    clock.now += 5
+    assert watcher.poll() == []
+    clock.now += 5
+    assert watcher.poll() == []
+
+
+def test_l_column_edit_maps_to_steps_4_to_6_after_debounce(package, clock):
+    watcher = AttachmentWatcher(FakePipeline(package), debounce=2.0)
+    watcher.snapshot()
+    edit(package[5], None, "L2", 3)
+    assert watcher.poll() == []  # 刚发现变化，还在防抖
+    clock.now += 1.5
+    edit(package[5], None, "L2", 4)  # 仍在写入：重新计时
+    assert watcher.poll() == []
+    clock.now += 1.5
+    assert watcher.poll() == []
+    clock.now += 1
+    assert watcher.poll() == [(5, "L列", [4, 5, 6])]
+    clock.now += 5
+    assert watcher.poll() == []
+
+
+def test_cosmic_sheet_edit_maps_to_step_8(package, clock):
+    watcher = AttachmentWatcher(FakePipeline(package), debounce=0)
+    watcher.snapshot()
+    edit(package[3], "COSMIC功能点拆分表", "H5", "新增工单")
+    assert watcher.poll() == [(3, "COSMIC功能点拆分表", [8])]
+
+
+def test_unreadable_file_is_retried(package, clock, capsys):
+    watcher = AttachmentWatcher(FakePipeline(package), debounce=0)
+    watcher.snapshot()
+    with open(package[5], "rb") as f:
+        content = f.read()
+    with open(package[5], "wb") as f:
+        f.write(b"half written")
+    bump_mtime(package[5])
+    assert watcher.poll() == []
+    assert "读取附件5失败" in capsys.readouterr().out
+    # 写完后内容与基准相同：不触发
+    with open(package[5], "wb") as f:
+        f.write(content)
+    bump_mtime(package[5])
+    clock.now += 1
+    assert watcher.poll() == []
+
+
+def test_watch_runs_the_union_of_affected_steps(package, clock, monkeypatch):
+    pipeline = FakePipeline(package)
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+        if len(sleeps) == 1:
+            edit(package[5], None, "L2", 9)
+            edit(package[3], "COSMIC功能点拆分表", "H4", "改过")
+        elif len(sleeps) == 4:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(watch.time, "sleep", fake_sleep)
+    watch.watch(pipeline, interval=1.0, debounce=1.5)
+    assert pipeline.runs == [[4, 5, 6, 8]]
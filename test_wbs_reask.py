@@ -0,0 +1,50 @@
+import pytest
+
+import process_attachments as pa
+from backfill import BackfillRegistry
+
+CODES = [("市场洞察", "建筑视角", "建筑查询"), ("客户管控", "客户视角", "客户查询")]
+ITEMS = ["重构建筑查询页面", "调整客户查询规则"]
+
+
+class ScriptedChat:
+    """依次返回预设的回复；回复为异常时抛出"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    def __call__(self, prompt, **kwargs):
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+@pytest.fixture
+def backfill(monkeypatch):
+    registry = BackfillRegistry()
+    monkeypatch.setattr(pa, "BACKFILL", registry)
+    return registry
+
+
+def test_failed_attempt_followed_by_full_match_is_not_marked(backfill, monkeypatch):
+    reply = "\n".join(f"{i}|{'|'.join(code)}|{item}|2.0" for i, (code, item) in enumerate(zip(CODES, ITEMS), 1))
+    monkeypatch.setattr(pa.LLM_CLIENT, "chat", ScriptedChat(TimeoutError("timed out"), reply))
+    added = pa.reask_unmatched_items(ITEMS, [], CODES, 4.0)
+    assert [match[3] for match in added] == ITEMS
+    assert backfill.steps() == []
+
+
+def test_items_left_unmatched_after_failures_are_marked(backfill, monkeypatch):
+    reply = f"1|{'|'.join(CODES[0])}|{ITEMS[0]}|2.0"
+    monkeypatch.setattr(pa.LLM_CLIENT, "chat", ScriptedChat(TimeoutError("timed out"), reply))
+    added = pa.reask_unmatched_items(ITEMS, [], CODES, 4.0)
+    assert [match[3] for match in added] == [ITEMS[0]]
+    assert backfill.steps() == [10]
+    assert backfill.entries()[0]["reason"] == "timed out"
+
+
+def test_unmatched_without_call_failures_is_not_marked(backfill, monkeypatch):
+    monkeypatch.setattr(pa.LLM_CLIENT, "chat", ScriptedChat("无法匹配", "无法匹配"))
+    assert pa.reask_unmatched_items(ITEMS, [], CODES, 4.0) == []
+    assert backfill.steps() == []
@@ -0,0 +1,116 @@
+import io
+import zipfile
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+from xlsx_patch import XlsxPatchUnsupported, patch_xlsx_cells
+from zip_patch import iter_raw_members, rewrite_zip
+
+
+def _workbook_bytes():
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "送审表"
+    ws["A1"] = "需求名称"
+    ws["B2"] = "旧值"
+    ws["B2"].font = Font(bold=True)
+    ws["C3"] = 5
+    ws["D7"] = "=SUM(C1:C6)"
+    wb.create_sheet("第二页")["A1"] = "不改"
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def _raw_members(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {info.filename: raw for info, raw in iter_raw_members(zf, io.BytesIO(data))}
+
+
+def test_patched_cells_read_back_with_openpyxl():
+    source = _workbook_bytes()
+    patched, name = patch_xlsx_cells(source, {
+        "B2": "新值 ",        # 覆盖共享字符串单元格，保留样式，结尾空格不丢
+        "C3": 12.5,
+        "A10": "新行 <&>",    # 原来不存在的行
+        "B1": True,           # 插入到已有行的中间
+    })
+    assert name == "送审表"
+    wb = load_workbook(io.BytesIO(patched))
+    ws = wb["送审表"]
+    assert ws["A1"].value == "需求名称"
+    assert ws["B1"].value is True
+    assert ws["B2"].value == "新值 "
+    assert ws["B2"].font.bold
+    assert ws["C3"].value == 12.5
+    assert ws["A10"].value == "新行 <&>"
+    assert ws["D7"].value == "=SUM(C1:C6)"
+    assert wb["第二页"]["A1"].value == "不改"
+    assert wb.calculation.fullCalcOnLoad
+
+
+def test_inline_string_cells_can_be_patched_again():
+    once, _ = patch_xlsx_cells(_workbook_bytes(), {"B2": "第一次"})
+    twice, _ = patch_xlsx_cells(once, {"B2": "第二次", "C3": None})
+    ws = load_workbook(io.BytesIO(twice)).active
+    assert ws["B2"].value == "第二次"
+    assert ws["C3"].value is None
+
+
+def test_other_sheet_by_index():
+    patched, name = patch_xlsx_cells(_workbook_bytes(), {"A1": "已改"}, sheet=1)
+    wb = load_workbook(io.BytesIO(patched))
+    assert name == "第二页"
+    assert wb["第二页"]["A1"].value == "已改"
+    assert wb["送审表"]["A1"].value == "需求名称"
+
+
+def test_untouched_members_stay_byte_identical():
+    source = _workbook_bytes()
+    patched, _ = patch_xlsx_cells(source, {"B2": "新值"})
+    before, after = _raw_members(source), _raw_members(patched)
+    assert list(before) == list(after)
+    changed = {name for name in before if before[name] != after[name]}
+    # workbook.xml 只在 calcPr 变化时才不同（openpyxl 写出的文件已带 fullCalcOnLoad）
+    assert "xl/worksheets/sheet1.xml" in changed
+    assert changed <= {"xl/worksheets/sheet1.xml", "xl/workbook.xml"}
+
+
+@pytest.mark.parametrize("cells", [{"D7": 1}, {"B0": 1}, {"b2": 1}])
+def test_unsupported_writes_raise(cells):
+    with pytest.raises(XlsxPatchUnsupported):
+        patch_xlsx_cells(_workbook_bytes(), cells)
+
+
+def _zip_bytes(members):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as zf:
+        for name, data, method in members:
+            zf.writestr(name, data, compress_type=method)
+    return output.getvalue()
+
+
+def test_rewrite_zip_replaces_and_appends_members():
+    source = _zip_bytes([
+        ("word/document.xml", b"<old/>" * 100, zipfile.ZIP_DEFLATED),
+        ("word/media/图片1.png", bytes(range(256)) * 50, zipfile.ZIP_STORED),
+        ("[Content_Types].xml", b"<Types/>", zipfile.ZIP_DEFLATED),
+    ])
+    output = io.BytesIO()
+    rewrite_zip(io.BytesIO(source), output, {
+        "word/document.xml": b"<new/>",
+        "customXml/item1.xml": io.BytesIO(b"<streamed/>" * 1000),
+    })
+    data = output.getvalue()
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["word/document.xml", "word/media/图片1.png", "[Content_Types].xml",
+                                 "customXml/item1.xml"]
+        assert zf.read("word/document.xml") == b"<new/>"
+        assert zf.read("customXml/item1.xml") == b"<streamed/>" * 1000
+        assert zf.read("word/media/图片1.png") == bytes(range(256)) * 50
+    before, after = _raw_members(source), _raw_members(data)
+    for name in ("word/media/图片1.png", "[Content_Types].xml"):
+        assert after[name] == before[name]